@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Collision Model Inference Benchmark
+Compares sklearn predict_proba with the compiled forest for single pairs
+and large batches
+"""
+
+import sys
+import os
+import time
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from models.batch_collision import COMPILED_MAX_ROWS, BatchCollisionAvoidanceModel
+from models.training_data import generate_synthetic_pairs
+
+
+def best_of(func, repeats):
+    """Best wall time of several runs, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000.0
+
+
+def main():
+    """Run the inference benchmark"""
+    print("⏱️  Collision Model Inference Benchmark")
+    print("=" * 60)
+
+    model = BatchCollisionAvoidanceModel(artifact_dir=os.getenv('ATC_MODEL_DIR', tempfile.gettempdir()))
+    results = model.train()
+    compiled = model.compiled
+    print(f"🌲 Forest: {compiled.n_trees} trees, {compiled.n_nodes} nodes, depth {compiled.depth}")
+    print(f"   Test accuracy: {results['test_accuracy']:.4f}")
+
+    features, _ = generate_synthetic_pairs(10000, seed=1234)
+    expected = model.model.predict_proba(model.scaler.transform(features))[:, 1]
+    actual = compiled.predict_proba_positive(features)
+    print(f"✅ Max |sklearn - compiled| over 10k pairs: {np.abs(expected - actual).max():.2e}")
+
+    print("-" * 60)
+    print(f"{'Batch':>8} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>9}")
+    for size, repeats in ((1, 50), (10, 50), (100, 20), (1000, 10), (10000, 3)):
+        batch = features[:size]
+        sklearn_ms = best_of(lambda: model.model.predict_proba(model.scaler.transform(batch)), repeats)
+        compiled_ms = best_of(lambda: compiled.predict_proba_positive(batch), repeats)
+        print(f"{size:>8} {sklearn_ms:>12.3f} {compiled_ms:>12.3f} {sklearn_ms / compiled_ms:>8.1f}x")
+
+    print("-" * 60)
+    print(f"💡 Batches up to {COMPILED_MAX_ROWS} rows use the compiled forest, larger ones sklearn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Flight Stream Wire Format Benchmark
+Compares bytes and encode time per aircraft for JSON snapshots, JSON
+keyframes, binary frames and (if installed) MessagePack
+"""
+
+import sys
+import os
+import json
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from demo_data import generate_demo_flights
+from utils.delta_stream import DeltaEncoder, serialize
+from utils.flight_batch import FlightBatch
+from utils.wire_format import KEYFRAME, encode_frame, records_from_batch, records_from_dicts
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def best_of(func, repeats):
+    """Best wall time of several runs in seconds, with the last result"""
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def keyframe_json(flights):
+    encoder = DeltaEncoder()
+    encoder.encode(flights)
+    return serialize(encoder.keyframe())
+
+
+def main():
+    """Run the wire format benchmark"""
+    print("⏱️  Flight Stream Wire Format Benchmark")
+    print("=" * 60)
+
+    for count in (100, 1000, 10000):
+        flights = generate_demo_flights(count)['flights']
+        batch = FlightBatch.from_dicts(flights)
+        formats = [
+            ('JSON snapshot', lambda: json.dumps(flights)),
+            ('JSON keyframe', lambda: keyframe_json(flights)),
+            ('binary (dicts)', lambda: encode_frame(KEYFRAME, 1, 1, 0.0, records_from_dicts(flights))),
+            ('binary (batch)', lambda: encode_frame(KEYFRAME, 1, 1, 0.0, records_from_batch(batch))),
+        ]
+        if msgpack is not None:
+            formats.append(('MessagePack', lambda: msgpack.packb(flights)))
+
+        print(f"\n✈️  {count} aircraft")
+        print(f"{'Format':>16} {'bytes/aircraft':>15} {'µs/aircraft':>12}")
+        for name, encode in formats:
+            seconds, payload = best_of(encode, 5 if count < 10000 else 2)
+            print(f"{name:>16} {len(payload) / count:>15.1f} {seconds * 1e6 / count:>12.2f}")
+
+    if msgpack is None:
+        print("\n💡 Install msgpack to include MessagePack in the comparison")
+
+
+if __name__ == "__main__":
+    main()
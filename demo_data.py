@@ -8,25 +8,30 @@ import random
 import time
 from datetime import datetime, timedelta
 
+# Major airports with coordinates
+AIRPORTS = {
+    'JFK': {'lat': 40.6413, 'lon': -73.7781, 'name': 'John F. Kennedy International'},
+    'LAX': {'lat': 33.9425, 'lon': -118.4081, 'name': 'Los Angeles International'},
+    'ORD': {'lat': 41.9796, 'lon': -87.9045, 'name': 'Chicago O\'Hare International'},
+    'ATL': {'lat': 33.6407, 'lon': -84.4277, 'name': 'Hartsfield-Jackson Atlanta'},
+    'DFW': {'lat': 32.8968, 'lon': -97.0380, 'name': 'Dallas Fort Worth International'},
+    'DEN': {'lat': 39.8561, 'lon': -104.6737, 'name': 'Denver International'},
+    'LAS': {'lat': 36.0840, 'lon': -115.1537, 'name': 'McCarran International'},
+    'PHX': {'lat': 33.4342, 'lon': -112.0116, 'name': 'Phoenix Sky Harbor'},
+    'MIA': {'lat': 25.7959, 'lon': -80.2871, 'name': 'Miami International'},
+    'SEA': {'lat': 47.4502, 'lon': -122.3088, 'name': 'Seattle-Tacoma International'}
+}
+
+# Airlines
+AIRLINES = ['AA', 'DL', 'UA', 'WN', 'B6', 'AS', 'NK', 'F9', 'G4', 'SY']
+
+AIRCRAFT_TYPES = ['B738', 'A320', 'B777', 'A321', 'E175']
+
 def generate_demo_flights(count=12):
     """Generate realistic demo flight data"""
     
-    # Major airports with coordinates
-    airports = {
-        'JFK': {'lat': 40.6413, 'lon': -73.7781, 'name': 'John F. Kennedy International'},
-        'LAX': {'lat': 33.9425, 'lon': -118.4081, 'name': 'Los Angeles International'},
-        'ORD': {'lat': 41.9796, 'lon': -87.9045, 'name': 'Chicago O\'Hare International'},
-        'ATL': {'lat': 33.6407, 'lon': -84.4277, 'name': 'Hartsfield-Jackson Atlanta'},
-        'DFW': {'lat': 32.8968, 'lon': -97.0380, 'name': 'Dallas Fort Worth International'},
-        'DEN': {'lat': 39.8561, 'lon': -104.6737, 'name': 'Denver International'},
-        'LAS': {'lat': 36.0840, 'lon': -115.1537, 'name': 'McCarran International'},
-        'PHX': {'lat': 33.4342, 'lon': -112.0116, 'name': 'Phoenix Sky Harbor'},
-        'MIA': {'lat': 25.7959, 'lon': -80.2871, 'name': 'Miami International'},
-        'SEA': {'lat': 47.4502, 'lon': -122.3088, 'name': 'Seattle-Tacoma International'}
-    }
-    
-    # Airlines
-    airlines = ['AA', 'DL', 'UA', 'WN', 'B6', 'AS', 'NK', 'F9', 'G4', 'SY']
+    airports = AIRPORTS
+    airlines = AIRLINES
     
     flights = []
     airport_codes = list(airports.keys())
@@ -65,7 +70,7 @@ def generate_demo_flights(count=12):
             'source': 'Demo',
             'origin': origin,
             'destination': destination,
-            'aircraft_type': random.choice(['B738', 'A320', 'B777', 'A321', 'E175'])
+            'aircraft_type': random.choice(AIRCRAFT_TYPES)
         }
         
         flights.append(flight)
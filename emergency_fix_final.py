@@ -28,39 +28,11 @@ def apply_final_fixes():
     print("🔧 Fix 1: Adding robust weather data handling...")
     
     weather_fix = '''def safe_get_weather_data(weather_data):
-    """Safely get weather data regardless of format"""
-    if not weather_data:
-        return {}
-    
-    # If it's already a dictionary, return as-is
-    if isinstance(weather_data, dict):
-        return weather_data
-    
-    # If it's a list, convert to dictionary format
-    if isinstance(weather_data, list):
-        result = {}
-        for item in weather_data:
-            if isinstance(item, dict):
-                station = item.get('station', f'Station_{len(result)}')
-                result[station] = {
-                    'weather': {
-                        'main': {
-                            'temp': item.get('temperature', 20),
-                            'humidity': item.get('humidity', 50),
-                            'pressure': item.get('pressure', 1013)
-                        },
-                        'wind': {
-                            'speed': item.get('wind_speed', 10) / 3.6
-                        },
-                        'visibility': item.get('visibility', 10) * 1000,
-                        'weather': [{
-                            'description': item.get('conditions', 'clear sky')
-                        }]
-                    }
-                }
-        return result
-    
-    return {}
+    """Station records (utils.weather_schema.StationWeather) keyed by station, whatever the source format"""
+    from utils.weather_schema import decode_all
+    
+    # Already-decoded data from get_weather_data_multiple_sources passes straight through
+    return decode_all(weather_data)
 
 '''
     
@@ -79,39 +51,31 @@ def apply_final_fixes():
     
     weather_tab_replacement = r'''\1
             # Use safe weather data handling
+            from utils.weather_schema import hazards
             safe_weather = safe_get_weather_data(weather_data)
             
             if safe_weather:
-                for location, data in safe_weather.items():
+                for location, record in safe_weather.items():
                     with st.expander(f"📍 {location}"):
-                        weather_info = data.get('weather', {})
-                        
                         col1, col2, col3 = st.columns(3)
                         
                         with col1:
-                            temp = weather_info.get('main', {}).get('temp', 0)
-                            st.metric("Temperature", f"{temp}°C")
-                            
-                            humidity = weather_info.get('main', {}).get('humidity', 0)
-                            st.metric("Humidity", f"{humidity}%")
+                            st.metric("Temperature", f"{record.temperature or 0:.0f}°C")
+                            st.metric("Humidity", f"{record.humidity or 0:.0f}%")
                         
                         with col2:
-                            wind = weather_info.get('wind', {})
-                            wind_speed = wind.get('speed', 0) * 3.6  # Convert to km/h
-                            st.metric("Wind Speed", f"{wind_speed:.1f} km/h")
-                            
-                            pressure = weather_info.get('main', {}).get('pressure', 0)
-                            st.metric("Pressure", f"{pressure} hPa")
+                            st.metric("Wind Speed", f"{record.wind_speed or 0:.1f} km/h")
+                            st.metric("Pressure", f"{record.pressure or 0:.0f} hPa")
                         
                         with col3:
-                            visibility = weather_info.get('visibility', 0) / 1000
-                            st.metric("Visibility", f"{visibility:.1f} km")
+                            st.metric("Visibility", f"{record.visibility or 0:.1f} km")
                             
                             # Weather conditions
-                            conditions = weather_info.get('weather', [])
-                            if conditions:
-                                condition = conditions[0].get('description', 'Unknown')
-                                st.info(f"Conditions: {condition}")
+                            if record.conditions:
+                                st.info(f"Conditions: {record.conditions}")
+                            active = hazards(record)
+                            if active:
+                                st.warning(f"Hazards: {', '.join(active)}")
             \3'''
     
     content = re.sub(weather_tab_pattern, weather_tab_replacement, content, flags=re.DOTALL)
@@ -126,42 +90,20 @@ def apply_final_fixes():
                 flight_objects = []
                 
                 try:
-                    for i, flight_dict in enumerate(flights_data['flights'][:20]):
-                        if not isinstance(flight_dict, dict):
-                            continue
-                            
-                        # Check required fields
-                        required_fields = ['latitude', 'longitude', 'baro_altitude']
-                        if not all(field in flight_dict and flight_dict[field] is not None for field in required_fields):
-                            continue
-                        
-                        # Create comprehensive safe flight data
-                        safe_flight_data = {
-                            'icao24': str(flight_dict.get('icao24', f'demo_{i:06d}')),
-                            'callsign': str(flight_dict.get('callsign', f'DEMO{i:03d}')),
-                            'origin_country': str(flight_dict.get('origin_country', 'Unknown')),
-                            'time_position': int(flight_dict.get('time_position', int(time.time()))),
-                            'last_contact': int(flight_dict.get('last_contact', int(time.time()))),
-                            'longitude': float(flight_dict.get('longitude', 0.0)),
-                            'latitude': float(flight_dict.get('latitude', 0.0)),
-                            'baro_altitude': float(flight_dict.get('baro_altitude', 35000.0)),
-                            'on_ground': bool(flight_dict.get('on_ground', False)),
-                            'velocity': float(flight_dict.get('velocity', 450.0)),
-                            'true_track': float(flight_dict.get('true_track', 90.0)),
-                            'vertical_rate': float(flight_dict.get('vertical_rate', 0.0)),
-                            'sensors': list(flight_dict.get('sensors', [])),
-                            'geo_altitude': float(flight_dict.get('geo_altitude', flight_dict.get('baro_altitude', 35000.0))),
-                            'squawk': str(flight_dict.get('squawk', '0000')),
-                            'spi': bool(flight_dict.get('spi', False)),
-                            'position_source': int(flight_dict.get('position_source', 0))
-                        }
-                        
-                        flight_obj = FlightData(**safe_flight_data)
-                        flight_objects.append(flight_obj)
+                    from utils.flight_batch import FlightBatch
+                    from utils.flight_merge import merge_flights
+                    from utils.conflict_engine import VectorizedConflictDetector
+                    
+                    # One record per aircraft even when several sources report it,
+                    # in one columnar batch instead of a FlightData object per aircraft;
+                    # flights without latitude/longitude/baro_altitude are dropped
+                    flight_objects = FlightBatch.from_dicts(merge_flights(
+                        [flight_dict for flight_dict in flights_data['flights'] if isinstance(flight_dict, dict)]
+                    )).with_position()
                 
                     # Only run conflict detection if we have enough valid flights
                     if len(flight_objects) >= 2:
-                        detector = ConflictDetector()
+                        detector = VectorizedConflictDetector()
                         conflicts = detector.detect_all_conflicts(flight_objects)
                         
                 except ImportError as ie:
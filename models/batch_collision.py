@@ -0,0 +1,272 @@
+"""
+Batched Collision Avoidance Model
+Random Forest conflict classifier with the CollisionAvoidanceModel interface
+plus a batched inference path that scores every candidate pair in one call.
+"""
+
+import copy
+import time
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from utils.conflict_engine import LAT, LON, build_state_matrix
+from models.conflict_features import FEATURE_NAMES, extract_pair_features
+from models.forest_compiler import CompiledForest
+from models.model_store import artifact_key, load_artifact, save_artifact
+from models.training_data import GENERATOR_VERSION, generate_synthetic_pairs_parallel
+
+# Accuracy is reported on a random subsample of this size for very large runs
+MAX_SCORED_SAMPLES = 200_000
+
+# Batches up to this size are scored with the compiled forest
+COMPILED_MAX_ROWS = 2048
+
+
+class BatchCollisionAvoidanceModel:
+    """Conflict probability model that scores many aircraft pairs per call"""
+
+    def __init__(self, n_estimators: int = 100, max_depth: Optional[int] = 12, random_state: int = 42,
+                 n_samples: int = 10000, test_size: float = 0.2, artifact_dir: Optional[Path] = None,
+                 n_jobs: Optional[int] = -1, n_workers: Optional[int] = None, use_compiled: bool = True,
+                 weather_grid: Any = None):
+        self.model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                            random_state=random_state, n_jobs=n_jobs)
+        self.scaler = StandardScaler()
+        self.n_estimators = n_estimators
+        self.feature_names = FEATURE_NAMES
+        self.random_state = random_state
+        self.n_samples = n_samples
+        self.test_size = test_size
+        self.artifact_dir = artifact_dir
+        self.n_workers = n_workers
+        self.growth_steps: List[Tuple[int, int]] = []
+        self.use_compiled = use_compiled
+        self.weather_grid = weather_grid
+        self._compiled: Optional[CompiledForest] = None
+        self.metrics: Dict[str, Any] = {}
+        self.is_trained = False
+
+    def training_params(self) -> Dict[str, Any]:
+        """Everything that determines the fitted model; hashed into the artifact key"""
+        return {
+            'generator_version': GENERATOR_VERSION,
+            'n_samples': self.n_samples,
+            'test_size': self.test_size,
+            'random_state': self.random_state,
+            'n_estimators': self.n_estimators,
+            'max_depth': self.model.max_depth,
+            'features': list(self.feature_names),
+            'growth_steps': [list(step) for step in self.growth_steps],
+        }
+
+    @property
+    def artifact_key(self) -> str:
+        return artifact_key(self.training_params())
+
+    def load(self) -> bool:
+        """Adopt a saved artifact for the current parameters; returns False if none exists"""
+        artifact = load_artifact(self.artifact_key, self.artifact_dir)
+        if artifact is None:
+            return False
+
+        n_jobs = self.model.n_jobs
+        self.model = artifact['model']
+        self.model.n_jobs = n_jobs
+        self.scaler = artifact['scaler']
+        self.metrics = artifact['metrics']
+        self._compiled = None
+        self.is_trained = True
+        return True
+
+    def save(self) -> Path:
+        """Persist the fitted model and scaler under the parameter hash"""
+        if not self.is_trained:
+            raise RuntimeError("Model is not trained")
+        return save_artifact(self.artifact_key, {
+            'model': self.model,
+            'scaler': self.scaler,
+            'feature_names': list(self.feature_names),
+            'params': self.training_params(),
+            'metrics': self.metrics,
+        }, self.artifact_dir)
+
+    def ensure_trained(self):
+        """Load the saved artifact, training and saving one only on a cache miss"""
+        if not self.is_trained:
+            self.train()
+
+    def _score(self, features: np.ndarray, labels: np.ndarray) -> float:
+        """Accuracy on at most MAX_SCORED_SAMPLES rows so scoring stays bounded"""
+        if len(labels) > MAX_SCORED_SAMPLES:
+            rows = np.random.default_rng(self.random_state).choice(len(labels), MAX_SCORED_SAMPLES, replace=False)
+            features, labels = features[rows], labels[rows]
+        return float(self.model.score(self.scaler.transform(features), labels))
+
+    def train(self, n_samples: Optional[int] = None, test_size: Optional[float] = None,
+              force: bool = False) -> Dict[str, float]:
+        """
+        Train on synthetic encounters and report train/test accuracy and
+        throughput in samples per second.
+
+        Encounters are generated across a process pool of n_workers and the
+        forest is fitted with n_jobs. A previously saved model with identical
+        parameters is loaded instead of refitting unless force is set.
+        """
+        if n_samples is not None:
+            self.n_samples = n_samples
+        if test_size is not None:
+            self.test_size = test_size
+        self.growth_steps = []
+        if not force and self.load():
+            return dict(self.metrics, loaded=True)
+
+        started = time.perf_counter()
+        features, labels = generate_synthetic_pairs_parallel(self.n_samples, seed=self.random_state,
+                                                             n_workers=self.n_workers)
+        generated = time.perf_counter()
+
+        X_train, X_test, y_train, y_test = train_test_split(
+            features, labels, test_size=self.test_size, random_state=self.random_state, stratify=labels
+        )
+        self.model.set_params(warm_start=False, n_estimators=self.n_estimators)
+        self.scaler.fit(X_train)
+        self.model.fit(self.scaler.transform(X_train), y_train)
+        fitted = time.perf_counter()
+        self._compiled = None
+        self.is_trained = True
+
+        self.metrics = {
+            'train_accuracy': self._score(X_train, y_train),
+            'test_accuracy': self._score(X_test, y_test),
+            'n_samples': self.n_samples,
+            'n_estimators': self.model.n_estimators,
+            'generation_seconds': generated - started,
+            'fit_seconds': fitted - generated,
+            'samples_per_second': self.n_samples / (fitted - started),
+        }
+        self.save()
+        return dict(self.metrics, loaded=False)
+
+    def grow(self, n_samples: int, n_trees: int, force: bool = False) -> Dict[str, float]:
+        """
+        Warm-start growth: fit n_trees additional trees on n_samples fresh encounters.
+
+        Existing trees and the fitted scaler are kept, so a forest covering
+        millions of encounters can be built in bounded steps instead of one
+        fit over the whole dataset. Test accuracy is measured on a fresh
+        held-out set. A saved forest with the same growth history is loaded
+        instead of refitting unless force is set.
+        """
+        self.ensure_trained()
+        previous_steps = self.growth_steps
+        self.growth_steps = previous_steps + [(n_samples, n_trees)]
+        if not force and self.load():
+            return dict(self.metrics, loaded=True)
+        self.growth_steps = previous_steps
+
+        step_seed = [self.random_state, len(self.growth_steps) + 1]
+        started = time.perf_counter()
+        features, labels = generate_synthetic_pairs_parallel(n_samples, seed=step_seed, n_workers=self.n_workers)
+        test_size = max(int(n_samples * self.test_size), 1)
+        X_test, y_test = generate_synthetic_pairs_parallel(test_size, seed=step_seed + [0], n_workers=self.n_workers)
+        generated = time.perf_counter()
+
+        # Grow a copy so the artifact of the smaller forest, which may be cached
+        # in this process, is left untouched
+        self.model = copy.copy(self.model)
+        self.model.estimators_ = list(self.model.estimators_)
+        self.model.set_params(warm_start=True, n_estimators=self.model.n_estimators + n_trees)
+        self.model.fit(self.scaler.transform(features), labels)
+        fitted = time.perf_counter()
+        self._compiled = None
+        self.growth_steps.append((n_samples, n_trees))
+
+        self.metrics = {
+            'train_accuracy': self._score(features, labels),
+            'test_accuracy': self._score(X_test, y_test),
+            'n_samples': self.metrics.get('n_samples', self.n_samples) + n_samples,
+            'n_estimators': self.model.n_estimators,
+            'generation_seconds': generated - started,
+            'fit_seconds': fitted - generated,
+            'samples_per_second': n_samples / (fitted - started),
+        }
+        self.save()
+        return dict(self.metrics, loaded=False)
+
+    @property
+    def compiled(self) -> CompiledForest:
+        """Flattened copy of the fitted forest and scaler, compiled on first use"""
+        self.ensure_trained()
+        if self._compiled is None:
+            self._compiled = CompiledForest.from_sklearn(self.model, self.scaler)
+        return self._compiled
+
+    def _predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Conflict probability for each feature row.
+
+        Small batches go through the compiled forest, which avoids sklearn's
+        fixed per-call overhead; large batches are faster in sklearn.
+        """
+        if self.use_compiled and len(features) <= COMPILED_MAX_ROWS:
+            return self.compiled.predict_proba_positive(features)
+        return self.model.predict_proba(self.scaler.transform(features))[:, 1]
+
+    def predict_pairs(self, flights: Any, i: np.ndarray, j: np.ndarray, prefilter: bool = True,
+                      **context) -> Dict[str, np.ndarray]:
+        """
+        Score the pairs (i[k], j[k]) of a snapshot with a single predict_proba call.
+
+        flights may be a FlightBatch, a flight list or an N x 6 state matrix;
+        context holds the optional per-aircraft weather_factor,
+        traffic_density and aircraft_category arrays; without a weather_factor
+        it is sampled from weather_grid when one is set. With prefilter, pairs
+        the geometric detector already rules out (no LOW conflict inside the
+        lookahead) are not sent to the forest and get probability 0.
+        """
+        self.ensure_trained()
+
+        state = flights if isinstance(flights, np.ndarray) else build_state_matrix(flights)
+        if self.weather_grid is not None and context.get('weather_factor') is None:
+            context['weather_factor'] = self.weather_grid.weather_factor(state[:, LAT], state[:, LON])
+        features, geometry = extract_pair_features(state, i, j, **context)
+
+        probability = np.zeros(len(features), dtype=np.float64)
+        evaluated = geometry['severity'] > 0 if prefilter else np.ones(len(features), dtype=bool)
+        if evaluated.any():
+            probability[evaluated] = self._predict_proba(features[evaluated])
+
+        return {
+            'conflict_probability': probability,
+            'confidence': np.maximum(probability, 1.0 - probability),
+            'evaluated': evaluated,
+        }
+
+    def predict_conflicts_batch(self, pairs: Sequence[Tuple[Any, Any]], prefilter: bool = True,
+                                **context) -> Dict[str, np.ndarray]:
+        """Score a list of (flight1, flight2) pairs in one call"""
+        if not len(pairs):
+            empty = np.empty(0, dtype=np.float64)
+            return {'conflict_probability': empty, 'confidence': empty, 'evaluated': np.empty(0, dtype=bool)}
+
+        flights = [pair[0] for pair in pairs] + [pair[1] for pair in pairs]
+        rows = np.arange(len(pairs))
+        return self.predict_pairs(flights, rows, rows + len(pairs), prefilter=prefilter, **context)
+
+    def predict_conflict(self, flight1: Any, flight2: Any) -> Dict[str, Any]:
+        """Single-pair prediction with the CollisionAvoidanceModel result format"""
+        try:
+            result = self.predict_conflicts_batch([(flight1, flight2)], prefilter=False)
+        except Exception as e:
+            return {'conflict_probability': 0.0, 'confidence': 0.0, 'error': str(e)}
+
+        return {
+            'conflict_probability': float(result['conflict_probability'][0]),
+            'confidence': float(result['confidence'][0]),
+            'error': None,
+        }
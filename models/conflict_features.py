@@ -0,0 +1,84 @@
+"""
+Pair Feature Extraction for the Collision Avoidance Model
+Builds the 12-dimensional feature vector for many aircraft pairs at once.
+"""
+
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from utils.conflict_engine import ALT, LAT, LON, SPEED, TRACK, VRATE, evaluate_pairs
+from utils.geodesy import haversine_paired, nearest_airport
+from models.wake_turbulence import MEDIUM
+
+FEATURE_NAMES = (
+    'horizontal_separation',  # Distance between aircraft (NM)
+    'vertical_separation',    # Altitude difference (ft)
+    'relative_velocity',      # Speed differential (kt)
+    'approach_angle',         # Convergence angle (deg)
+    'time_to_closest',        # Predicted closest approach (min)
+    'altitude_rate_1',        # Aircraft 1 climb/descent rate (ft/min)
+    'altitude_rate_2',        # Aircraft 2 climb/descent rate (ft/min)
+    'weather_factor',         # Weather impact score
+    'traffic_density',        # Local traffic count
+    'airport_proximity',      # Distance to nearest airport (NM)
+    'flight_level',           # Flight level of the lower aircraft
+    'aircraft_type',          # Heaviest wake category of the pair
+)
+
+
+def _per_aircraft(values: Optional[np.ndarray], size: int, default: float) -> np.ndarray:
+    if values is None:
+        return np.full(size, default, dtype=np.float64)
+    return np.broadcast_to(np.asarray(values, dtype=np.float64), (size,))
+
+
+def extract_pair_features(state: np.ndarray, i: np.ndarray, j: np.ndarray,
+                          weather_factor: Optional[np.ndarray] = None,
+                          traffic_density: Optional[np.ndarray] = None,
+                          aircraft_category: Optional[np.ndarray] = None,
+                          lookahead_minutes: float = 10.0) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Feature matrix (P x 12) for the pairs (i[k], j[k]) of an N x 6 state matrix.
+
+    weather_factor, traffic_density and aircraft_category are optional
+    per-aircraft arrays (or scalars). Also returns the closest-approach
+    geometry computed on the way, so callers can screen pairs without
+    evaluating it twice.
+    """
+    state = np.nan_to_num(np.asarray(state, dtype=np.float64))
+    i = np.asarray(i, dtype=np.intp)
+    j = np.asarray(j, dtype=np.intp)
+    n = len(state)
+
+    t_cpa, min_separation, vertical_at_cpa, severity = evaluate_pairs(state, i, j, lookahead_minutes)
+    geometry = {'time_to_conflict': t_cpa, 'min_separation': min_separation,
+                'vertical_separation': vertical_at_cpa, 'severity': severity}
+
+    a, b = state[i], state[j]
+    track_a, track_b = np.radians(a[:, TRACK]), np.radians(b[:, TRACK])
+    rel_vx = b[:, SPEED] * np.sin(track_b) - a[:, SPEED] * np.sin(track_a)
+    rel_vy = b[:, SPEED] * np.cos(track_b) - a[:, SPEED] * np.cos(track_a)
+    angle = np.abs((b[:, TRACK] - a[:, TRACK] + 180.0) % 360.0 - 180.0)
+
+    weather = _per_aircraft(weather_factor, n, 1.0)
+    density = _per_aircraft(traffic_density, n, 0.0)
+    category = _per_aircraft(aircraft_category, n, MEDIUM)
+
+    _, airport_a = nearest_airport(a[:, LAT], a[:, LON])
+    _, airport_b = nearest_airport(b[:, LAT], b[:, LON])
+
+    features = np.column_stack((
+        haversine_paired(a[:, LAT], a[:, LON], b[:, LAT], b[:, LON]),
+        np.abs(b[:, ALT] - a[:, ALT]),
+        np.hypot(rel_vx, rel_vy),
+        angle,
+        t_cpa,
+        a[:, VRATE],
+        b[:, VRATE],
+        np.maximum(weather[i], weather[j]),
+        0.5 * (density[i] + density[j]),
+        np.minimum(airport_a, airport_b),
+        np.minimum(a[:, ALT], b[:, ALT]) / 100.0,
+        np.maximum(category[i], category[j]),
+    ))
+    return features, geometry
@@ -0,0 +1,112 @@
+"""
+Compiled Random Forest Inference
+Flattens a fitted RandomForestClassifier into contiguous NumPy node arrays
+and evaluates all trees for a batch of rows with vectorized traversal,
+avoiding sklearn's per-call overhead for the small batches scored each tick.
+"""
+
+import numpy as np
+from typing import Any, Optional
+
+# Upper bound on rows x trees evaluated at once, to bound temporary memory
+MAX_CELLS_PER_CHUNK = 1 << 22
+
+
+class CompiledForest:
+    """Flattened node arrays (feature, threshold, left, right, value) for a whole forest"""
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, depth: int,
+                 mean: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = depth
+        self.mean = mean
+        self.scale = scale
+
+        # Interleaved [left, right] children so one gather picks the branch
+        self.children = np.empty(2 * len(left), dtype=np.intp)
+        self.children[0::2] = left
+        self.children[1::2] = right
+
+    @classmethod
+    def from_sklearn(cls, forest: Any, scaler: Any = None, positive_class: int = 1) -> 'CompiledForest':
+        """
+        Compile a fitted RandomForestClassifier, optionally with the
+        StandardScaler applied to its inputs.
+        """
+        class_index = list(forest.classes_).index(positive_class)
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            count = tree.node_count
+            nodes = np.arange(count, dtype=np.int32)
+            leaf = tree.children_left == -1
+
+            # Leaves point at themselves so extra traversal steps are no-ops
+            features.append(np.where(leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(leaf, nodes, tree.children_left).astype(np.int32) + offset)
+            rights.append(np.where(leaf, nodes, tree.children_right).astype(np.int32) + offset)
+
+            counts = tree.value[:, 0, :]
+            values.append(counts[:, class_index] / counts.sum(axis=1))
+            roots.append(offset)
+
+            offset += count
+            depth = max(depth, tree.max_depth)
+
+        mean = scale = None
+        if scaler is not None:
+            mean = None if scaler.mean_ is None else np.asarray(scaler.mean_, dtype=np.float64)
+            scale = None if scaler.scale_ is None else np.asarray(scaler.scale_, dtype=np.float64)
+
+        return cls(np.concatenate(features), np.concatenate(thresholds), np.concatenate(lefts),
+                   np.concatenate(rights), np.concatenate(values), np.asarray(roots, dtype=np.int32),
+                   depth, mean, scale)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    def _prepare(self, X: np.ndarray) -> np.ndarray:
+        """Apply the scaler the same way StandardScaler does, then cast like sklearn trees"""
+        X = np.array(X, dtype=np.float64)
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        return X.astype(np.float32)
+
+    def predict_proba_positive(self, X: np.ndarray) -> np.ndarray:
+        """Positive-class probability per row, equal to forest.predict_proba(X)[:, 1]"""
+        X = self._prepare(np.atleast_2d(X))
+        result = np.empty(len(X), dtype=np.float64)
+        chunk = max(MAX_CELLS_PER_CHUNK // max(self.n_trees, 1), 1)
+
+        for start in range(0, len(X), chunk):
+            rows = X[start:start + chunk]
+            flat = rows.ravel()
+            row_base = (np.arange(len(rows), dtype=np.intp) * rows.shape[1])[:, None]
+            node = np.broadcast_to(self.roots.astype(np.intp), (len(rows), self.n_trees)).copy()
+            for _ in range(self.depth):
+                x = flat.take(row_base + self.feature.take(node))
+                node = self.children.take(2 * node + (x > self.threshold.take(node)))
+            result[start:start + chunk] = self.value.take(node).mean(axis=1)
+        return result
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Two-column probabilities in the [negative, positive] order"""
+        positive = self.predict_proba_positive(X)
+        return np.column_stack((1.0 - positive, positive))
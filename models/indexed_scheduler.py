@@ -0,0 +1,430 @@
+"""
+Indexed Runway Scheduler
+RunwayScheduler-compatible scheduling backed by per-runway sorted timelines
+and a heap of pending requests ordered by (priority, fuel level, preferred time).
+Single-flight changes are repaired locally; the full GA runs on a cadence.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from models.runway_timeline import RunwayTimeline
+from models.wake_turbulence import flight_wake_category
+
+# Emergency -> Urgent -> High -> Normal -> Low, most urgent first
+PRIORITY_RANKS = {'EMERGENCY': 0, 'URGENT': 1, 'HIGH': 2, 'NORMAL': 3, 'LOW': 4}
+
+# Delay cost multiplier per priority rank (Emergency -> Low)
+PRIORITY_WEIGHTS = (10.0, 5.0, 2.0, 1.0, 0.5)
+
+# Flights below this fuel percentage have their delay cost tripled
+LOW_FUEL_LEVEL = 20.0
+
+# Flights re-placed around a changed slot during local repair
+REPAIR_WINDOW = 8
+
+# Seconds between background GA re-sequencing runs
+RESEQUENCE_INTERVAL = 60.0
+
+
+def priority_rank(priority: Any) -> int:
+    """Sort rank of a Priority enum member, its name or its integer value"""
+    name = getattr(priority, 'name', priority)
+    if isinstance(name, str) and name.upper() in PRIORITY_RANKS:
+        return PRIORITY_RANKS[name.upper()]
+    return int(getattr(priority, 'value', priority))
+
+
+def delay_weight(priority: Any, fuel_level: float = 100.0) -> float:
+    """Cost of one minute of delay for a flight of this priority and fuel state"""
+    weight = PRIORITY_WEIGHTS[min(priority_rank(priority), len(PRIORITY_WEIGHTS) - 1)]
+    return weight * (3.0 if fuel_level < LOW_FUEL_LEVEL else 1.0)
+
+
+def flight_identifier(flight_data: Any) -> Hashable:
+    """icao24 (or callsign) of a FlightData object or flight dict"""
+    if isinstance(flight_data, dict):
+        return flight_data.get('icao24') or flight_data.get('callsign')
+    return getattr(flight_data, 'icao24', None) or getattr(flight_data, 'callsign', None)
+
+
+class IndexedRunwayScheduler:
+    """
+    Runway scheduler whose per-flight operations do not scan slot lists.
+
+    Each runway is a RunwayTimeline; pending requests wait in a heap so the
+    most urgent (priority, then lowest fuel, then earliest preferred time)
+    is always dispatched first. Status counters are maintained on every
+    change so get_system_status does not walk the schedule.
+
+    A new or changed flight only disturbs the slots near it: the flights
+    holding them are re-placed in priority order and by adjacent swaps, and
+    the result is kept if it lowers their weighted delay. Whole-schedule
+    optimization is left to resequence, run periodically.
+
+    Runways can carry a weather delay (see apply_weather): no slot on them
+    is given earlier than preferred time plus that delay.
+
+    resequence keeps one SequenceOptimizer (and its worker pool) across runs,
+    rebuilt only when the runways change; n_islands is passed to it.
+    """
+
+    def __init__(self, n_islands: Optional[int] = None):
+        self.runways: Dict[str, RunwayTimeline] = {}
+        self.assignments: Dict[Hashable, Dict[str, Any]] = {}
+        self.weather_delays: Dict[str, float] = {}
+
+        self._pending: List[Tuple[int, float, float, int, Hashable]] = []
+        # flight_id -> (sequence of its live heap entry, request); older entries are stale
+        self._pending_requests: Dict[Hashable, Tuple[int, Dict[str, Any]]] = {}
+        self._sequence = itertools.count()
+
+        self._total_delay_minutes = 0.0
+        self._scheduled_by_type: Dict[str, int] = {}
+
+        self._lock = threading.RLock()
+        self._revision = 0
+        self._last_resequence = 0.0
+        self._background: Optional[threading.Thread] = None
+        self._stop_background = threading.Event()
+
+        self.n_islands = n_islands
+        self._optimizer: Any = None
+        self._optimizer_runways: List[Tuple[str, int, float]] = []
+        # Held while the owned optimizer runs so it is never closed mid-run
+        self._optimizer_lock = threading.Lock()
+
+    def add_runway(self, name: str, capacity: int):
+        """Add a runway with a capacity in operations per hour"""
+        self.runways[name] = RunwayTimeline(name, capacity)
+
+    def set_weather_delays(self, delays: Dict[str, float]):
+        """Weather delay in minutes per runway name, applied to flights placed from now on"""
+        with self._lock:
+            self.weather_delays.update(delays)
+
+    def apply_weather(self, grid: Any, runway_positions: Dict[str, Tuple[float, float]]) -> Dict[str, float]:
+        """Sample a WeatherGrid at each runway's (lat, lon) in one call and set the delays"""
+        names = [name for name in runway_positions if name in self.runways]
+        latitudes = [runway_positions[name][0] for name in names]
+        longitudes = [runway_positions[name][1] for name in names]
+        delays = dict(zip(names, grid.delay_minutes(latitudes, longitudes).tolist())) if names else {}
+        self.set_weather_delays(delays)
+        return delays
+
+    def _request(self, flight_data: Any, flight_type: Any, preferred_time: datetime,
+                 priority: Any, fuel_level: float) -> Dict[str, Any]:
+        return {
+            'flight_id': flight_identifier(flight_data),
+            'flight_data': flight_data,
+            'flight_type': getattr(flight_type, 'value', flight_type),
+            'preferred_time': preferred_time,
+            'priority': priority,
+            'fuel_level': fuel_level,
+            'category': flight_wake_category(flight_data),
+        }
+
+    def queue_flight(self, flight_data: Any, flight_type: Any, preferred_time: datetime,
+                     priority: Any, fuel_level: float = 100.0) -> Hashable:
+        """Add a request to the pending heap without assigning a slot yet"""
+        request = self._request(flight_data, flight_type, preferred_time, priority, fuel_level)
+        flight_id = request['flight_id']
+        with self._lock:
+            if flight_id in self._pending_requests or flight_id in self.assignments:
+                raise KeyError(f"{flight_id} is already queued or scheduled")
+
+            sequence = next(self._sequence)
+            self._pending_requests[flight_id] = (sequence, request)
+            heapq.heappush(self._pending, (priority_rank(priority), fuel_level,
+                                           preferred_time.timestamp(), sequence, flight_id))
+        return flight_id
+
+    def dispatch(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Assign slots to pending requests in priority order"""
+        results = []
+        with self._lock:
+            while self._pending and (limit is None or len(results) < limit):
+                *_, sequence, flight_id = heapq.heappop(self._pending)
+                pending = self._pending_requests.get(flight_id)
+                if pending is None or pending[0] != sequence:
+                    continue  # cancelled, scheduled or queued again since this entry was pushed
+                del self._pending_requests[flight_id]
+                results.append(self._assign(pending[1]))
+        return results
+
+    def _assign(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.runways:
+            return {'success': False, 'flight_id': request['flight_id'], 'error': 'No runways available'}
+
+        assignment = dict(request)
+        self._place(assignment)
+        self.assignments[request['flight_id']] = assignment
+        self._scheduled_by_type[request['flight_type']] = self._scheduled_by_type.get(request['flight_type'], 0) + 1
+        self._revision += 1
+        return self._result(assignment)
+
+    def _place(self, assignment: Dict[str, Any]):
+        """Put a flight in the earliest feasible slot across runways and count its delay"""
+        preferred = assignment['preferred_time'].timestamp()
+        runway, slot = min(
+            ((timeline, timeline.earliest_slot(preferred + 60.0 * self.weather_delays.get(timeline.name, 0.0),
+                                               assignment['category']))
+             for timeline in self.runways.values()),
+            key=lambda option: option[1],
+        )
+        runway.insert(assignment['flight_id'], slot, assignment['category'])
+        assignment.update(runway=runway.name, scheduled_time=datetime.fromtimestamp(slot),
+                          delay_minutes=(slot - preferred) / 60.0)
+        self._total_delay_minutes += assignment['delay_minutes']
+
+    def _unplace(self, assignment: Dict[str, Any]):
+        self.runways[assignment['runway']].remove(assignment['flight_id'])
+        self._total_delay_minutes -= assignment['delay_minutes']
+
+    @staticmethod
+    def _result(assignment: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'success': True,
+            'flight_id': assignment['flight_id'],
+            'runway': assignment['runway'],
+            'scheduled_time': assignment['scheduled_time'],
+            'delay_minutes': assignment['delay_minutes'],
+        }
+
+    def schedule_flight(self, flight_data: Any, flight_type: Any, preferred_time: datetime,
+                        priority: Any, fuel_level: float = 100.0) -> Dict[str, Any]:
+        """Assign the earliest feasible slot across all runways, then repair around it"""
+        try:
+            with self._lock:
+                request = self._request(flight_data, flight_type, preferred_time, priority, fuel_level)
+                if request['flight_id'] in self.assignments:
+                    raise KeyError(f"{request['flight_id']} is already scheduled")
+                self._pending_requests.pop(request['flight_id'], None)
+                result = self._assign(request)
+                if result['success'] and result['delay_minutes'] > 0:
+                    self._repair(request['flight_id'])
+                    result = self._result(self.assignments[request['flight_id']])
+                return result
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def update_flight(self, flight_id: Hashable, priority: Any = None, fuel_level: Optional[float] = None,
+                      preferred_time: Optional[datetime] = None) -> Dict[str, Any]:
+        """Change a scheduled flight (priority escalation, fuel, new ETA) and repair its window"""
+        try:
+            with self._lock:
+                assignment = self.assignments.get(flight_id)
+                if assignment is None:
+                    raise KeyError(f"{flight_id} is not scheduled")
+                if priority is not None:
+                    assignment['priority'] = priority
+                if fuel_level is not None:
+                    assignment['fuel_level'] = fuel_level
+                if preferred_time is not None:
+                    assignment['preferred_time'] = preferred_time
+
+                self._unplace(assignment)
+                self._place(assignment)
+                self._repair(flight_id)
+                self._revision += 1
+                return self._result(assignment)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def _window(self, flight_id: Hashable) -> List[Dict[str, Any]]:
+        """The changed flight plus the flights holding the slots nearest its preferred time"""
+        changed = self.assignments[flight_id]
+        preferred = changed['preferred_time'].timestamp()
+        scheduled = changed['scheduled_time'].timestamp()
+        nearby = []
+        for timeline in self.runways.values():
+            for slot, other, _ in timeline.slots_between(preferred - 1.0, scheduled + 1.0):
+                if other != flight_id:
+                    nearby.append((abs(slot - preferred), other))
+        nearby.sort(key=lambda item: item[0])
+        return [changed] + [self.assignments[other] for _, other in nearby[:REPAIR_WINDOW - 1]]
+
+    @staticmethod
+    def _window_cost(window: List[Dict[str, Any]]) -> float:
+        return sum(delay_weight(a['priority'], a['fuel_level']) * a['delay_minutes'] for a in window)
+
+    def _replace_window(self, window: List[Dict[str, Any]], order: List[Dict[str, Any]]):
+        for assignment in window:
+            self._unplace(assignment)
+        for assignment in order:
+            self._place(assignment)
+
+    def _repair(self, flight_id: Hashable):
+        """
+        Local repair around one flight: re-place the window in heap order,
+        then try adjacent swaps, keeping whichever placement is cheapest.
+        """
+        window = self._window(flight_id)
+        if len(window) < 2:
+            return
+
+        def key(assignment):
+            return (priority_rank(assignment['priority']), assignment['fuel_level'],
+                    assignment['preferred_time'].timestamp())
+
+        saved = [(a, a['runway'], a['scheduled_time'], a['delay_minutes']) for a in window]
+        best_cost = self._window_cost(window)
+        best_order = None
+        order = sorted(window, key=lambda a: a['scheduled_time'])
+
+        by_priority = sorted(window, key=key)
+        self._replace_window(window, by_priority)
+        cost = self._window_cost(window)
+        if cost < best_cost - 1e-9:
+            best_cost, best_order, order = cost, by_priority, by_priority
+
+        improved = True
+        while improved:
+            improved = False
+            for k in range(len(order) - 1):
+                candidate = order[:k] + [order[k + 1], order[k]] + order[k + 2:]
+                self._replace_window(window, candidate)
+                cost = self._window_cost(window)
+                if cost < best_cost - 1e-9:
+                    best_cost, best_order, order, improved = cost, candidate, candidate, True
+
+        if best_order is not None:
+            self._replace_window(window, best_order)
+            return
+
+        # Nothing beat the original placement; put every flight back where it was
+        for assignment in window:
+            self._unplace(assignment)
+        for assignment, runway, scheduled_time, delay_minutes in saved:
+            self.runways[runway].insert(assignment['flight_id'], scheduled_time.timestamp(), assignment['category'])
+            assignment.update(runway=runway, scheduled_time=scheduled_time, delay_minutes=delay_minutes)
+            self._total_delay_minutes += delay_minutes
+
+    def cancel_flight(self, flight_id: Hashable) -> bool:
+        """Release a scheduled slot or drop a pending request"""
+        with self._lock:
+            if self._pending_requests.pop(flight_id, None) is not None:
+                return True  # its heap entry is skipped lazily on dispatch
+
+            assignment = self.assignments.pop(flight_id, None)
+            if assignment is None:
+                return False
+            self._unplace(assignment)
+            self._scheduled_by_type[assignment['flight_type']] -= 1
+            self._revision += 1
+            return True
+
+    def calculate_delays(self) -> Dict[str, float]:
+        """Delay totals from the running counter"""
+        scheduled = len(self.assignments)
+        return {
+            'total_delay_minutes': self._total_delay_minutes,
+            'average_delay_minutes': self._total_delay_minutes / scheduled if scheduled else 0.0,
+            'scheduled_flights': scheduled,
+        }
+
+    def resequence(self, optimizer: Any = None, time_budget: float = 1.5) -> Dict[str, Any]:
+        """
+        Re-sequence every assigned flight with the GA optimizer and rebuild the
+        runway timelines, keeping the current plan unless the weighted delay
+        improves. The GA runs without holding the lock; its plan is dropped if
+        the schedule changed meanwhile. Without an optimizer the scheduler's
+        own one is used.
+        """
+        with self._lock:
+            revision = self._revision
+            runways = [(name, timeline.capacity, self.weather_delays.get(name, 0.0))
+                       for name, timeline in self.runways.items()]
+            flights = [{key: assignment[key] for key in ('flight_id', 'preferred_time', 'category', 'priority', 'fuel_level')}
+                       for assignment in self.assignments.values()]
+        if optimizer is not None:
+            result = optimizer.optimize(flights, time_budget)
+        else:
+            with self._optimizer_lock:
+                result = self._owned_optimizer(runways).optimize(flights, time_budget)
+
+        with self._lock:
+            self._last_resequence = time.time()
+            current = self._window_cost(list(self.assignments.values()))
+            if revision != self._revision:
+                return dict(result, applied=False, stale=True, previous_weighted_cost=current)
+            if result['weighted_cost'] >= current - 1e-9:
+                return dict(result, applied=False, stale=False, previous_weighted_cost=current)
+
+            self.runways = {name: RunwayTimeline(name, capacity) for name, capacity, _ in runways}
+            for entry in result['schedule']:
+                assignment = self.assignments[entry['flight_id']]
+                self.runways[entry['runway']].insert(entry['flight_id'], entry['scheduled_time'].timestamp(),
+                                                     assignment['category'])
+                assignment.update(runway=entry['runway'], scheduled_time=entry['scheduled_time'],
+                                  delay_minutes=entry['delay_minutes'])
+            self._total_delay_minutes = result['total_delay_minutes']
+            self._revision += 1
+            return dict(result, applied=True, stale=False, previous_weighted_cost=current)
+
+    def _owned_optimizer(self, runways: List[Tuple[str, int, float]]) -> Any:
+        """The scheduler's optimizer, rebuilt when the runways or their delays change"""
+        from models.sequence_ga import SequenceOptimizer
+
+        if self._optimizer is None or runways != self._optimizer_runways:
+            if self._optimizer is not None:
+                self._optimizer.close()
+            self._optimizer = SequenceOptimizer(runways, n_islands=self.n_islands)
+            self._optimizer_runways = runways
+        return self._optimizer
+
+    def close_optimizer(self):
+        """Shut down the worker pool of the scheduler's own optimizer"""
+        with self._optimizer_lock:
+            if self._optimizer is not None:
+                self._optimizer.close()
+                self._optimizer = None
+                self._optimizer_runways = []
+
+    def maybe_resequence(self, interval: float = RESEQUENCE_INTERVAL, optimizer: Any = None,
+                         time_budget: float = 1.5) -> Optional[Dict[str, Any]]:
+        """Run resequence if at least interval seconds passed since the last run"""
+        if time.time() - self._last_resequence < interval:
+            return None
+        return self.resequence(optimizer, time_budget)
+
+    def start_background_resequencing(self, interval: float = RESEQUENCE_INTERVAL, optimizer: Any = None,
+                                      time_budget: float = 1.5):
+        """Re-sequence the whole schedule every interval seconds on a daemon thread"""
+        if self._background is not None and self._background.is_alive():
+            return
+        self._stop_background.clear()
+
+        def run():
+            while not self._stop_background.wait(interval):
+                try:
+                    self.resequence(optimizer, time_budget)
+                except Exception as e:
+                    print(f"Background re-sequencing failed: {e}")
+
+        self._background = threading.Thread(target=run, name='runway-resequencer', daemon=True)
+        self._background.start()
+
+    def stop_background_resequencing(self):
+        self._stop_background.set()
+        if self._background is not None:
+            self._background.join()
+            self._background = None
+        self.close_optimizer()
+
+    def get_system_status(self) -> Dict[str, Any]:
+        """Scheduler summary from maintained counters"""
+        scheduled = len(self.assignments)
+        return {
+            'total_runways': len(self.runways),
+            'total_scheduled_flights': scheduled,
+            'pending_flights': len(self._pending_requests),
+            'total_delay_minutes': self._total_delay_minutes,
+            'average_delay_minutes': self._total_delay_minutes / scheduled if scheduled else 0.0,
+            'scheduled_by_type': dict(self._scheduled_by_type),
+            'runway_utilization': {name: len(timeline) for name, timeline in self.runways.items()},
+        }
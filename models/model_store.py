@@ -0,0 +1,68 @@
+"""
+Collision Model Artifact Store
+Saves fitted models with joblib under a content hash of everything that
+determines the fit, and memory-maps them back on load.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import joblib
+import sklearn
+
+DEFAULT_ARTIFACT_DIR = Path(os.getenv('ATC_MODEL_DIR', Path(__file__).parent / 'artifacts'))
+ARTIFACT_PREFIX = 'collision'
+
+# Artifacts already loaded in this process, keyed by content hash, so a
+# Streamlit rerun or a second model instance does not touch the disk again
+_loaded: Dict[str, Dict[str, Any]] = {}
+
+
+def artifact_key(params: Dict[str, Any]) -> str:
+    """Stable hash of the training parameters (generator, hyperparameters, features)"""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def artifact_path(key: str, directory: Optional[Path] = None) -> Path:
+    return Path(directory or DEFAULT_ARTIFACT_DIR) / f"{ARTIFACT_PREFIX}_{key}.joblib"
+
+
+def save_artifact(key: str, artifact: Dict[str, Any], directory: Optional[Path] = None) -> Path:
+    """Write an artifact atomically; arrays are stored uncompressed so they can be memory-mapped"""
+    path = artifact_path(key, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    artifact = dict(artifact, key=key, sklearn_version=sklearn.__version__)
+    temporary = path.with_suffix('.tmp')
+    joblib.dump(artifact, temporary)
+    os.replace(temporary, path)
+
+    _loaded[key] = artifact
+    return path
+
+
+def load_artifact(key: str, directory: Optional[Path] = None, mmap: bool = True) -> Optional[Dict[str, Any]]:
+    """Return the artifact for key, or None when it has not been saved"""
+    if key in _loaded:
+        return _loaded[key]
+
+    path = artifact_path(key, directory)
+    if not path.exists():
+        return None
+
+    artifact = joblib.load(path, mmap_mode='r' if mmap else None)
+    if artifact.get('sklearn_version') != sklearn.__version__:
+        # Pickled estimators are not portable across scikit-learn versions
+        return None
+
+    _loaded[key] = artifact
+    return artifact
+
+
+def clear_loaded():
+    """Forget artifacts cached in this process"""
+    _loaded.clear()
@@ -0,0 +1,181 @@
+"""
+Runway Timeline
+Sorted slot structure for one runway that finds the earliest slot honouring
+wake-turbulence separation without scanning the whole slot list.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from models.wake_turbulence import separation_matrix_seconds
+
+# Slots per block; blocks are split at twice this size
+BLOCK_SIZE = 64
+
+INFINITY = float('inf')
+
+
+class RunwayTimeline:
+    """
+    Slots of one runway kept in sorted blocks.
+
+    Each block remembers the widest gap it owns (between its own slots and
+    up to the first slot of the next block), so the search for a free slot
+    skips whole blocks that are too densely packed instead of visiting every
+    slot. Lookups bisect over block starts and then within one block.
+
+    With n slots in blocks of B this is O(B + n/B) per insert or remove
+    (the block insort plus splicing the per-block lists when a block splits
+    or empties), not O(log n); with BLOCK_SIZE = 64 the n/B term only shows
+    past tens of thousands of slots per runway.
+    """
+
+    def __init__(self, name: str, capacity: int, separation: Optional[np.ndarray] = None):
+        self.name = name
+        self.capacity = capacity
+        self.min_interval = 3600.0 / capacity if capacity else 0.0
+        separation = separation_matrix_seconds() if separation is None else separation
+        self.separation = np.maximum(separation, self.min_interval)
+        self._leader_rows = self.separation.tolist()
+        self._follower_columns = self.separation.T.tolist()
+
+        self._blocks: List[List[Tuple[float, Hashable]]] = []
+        self._categories: Dict[Hashable, int] = {}
+        self._times: Dict[Hashable, float] = {}
+        self._starts: List[float] = []
+        self._max_gap: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def __contains__(self, flight_id: Hashable) -> bool:
+        return flight_id in self._times
+
+    def slot_of(self, flight_id: Hashable) -> Optional[float]:
+        return self._times.get(flight_id)
+
+    def slots(self) -> List[Tuple[float, Hashable, int]]:
+        """All (time, flight_id, category) slots in time order"""
+        return [(time, flight_id, self._categories[flight_id])
+                for block in self._blocks for time, flight_id in block]
+
+    def slots_between(self, start: float, stop: float) -> List[Tuple[float, Hashable, int]]:
+        """(time, flight_id, category) slots with start <= time <= stop"""
+        if not self._blocks:
+            return []
+        found = []
+        b = self._locate(start)
+        i = bisect_left(self._blocks[b], (start,))
+        while b < len(self._blocks):
+            block = self._blocks[b]
+            while i < len(block):
+                time, flight_id = block[i]
+                if time > stop:
+                    return found
+                found.append((time, flight_id, self._categories[flight_id]))
+                i += 1
+            b, i = b + 1, 0
+        return found
+
+    def _refresh_gap(self, b: int):
+        if not 0 <= b < len(self._blocks):
+            return
+        block = self._blocks[b]
+        gap = max((block[k + 1][0] - block[k][0] for k in range(len(block) - 1)), default=0.0)
+        following = self._starts[b + 1] if b + 1 < len(self._blocks) else INFINITY
+        self._max_gap[b] = max(gap, following - block[-1][0])
+
+    def _locate(self, time: float) -> int:
+        return max(bisect_right(self._starts, time) - 1, 0)
+
+    def insert(self, flight_id: Hashable, time: float, category: int):
+        """Occupy a slot; the caller is responsible for separation (see earliest_slot)"""
+        if flight_id in self._times:
+            raise KeyError(f"{flight_id} already holds a slot on {self.name}")
+
+        self._categories[flight_id] = category
+        self._times[flight_id] = time
+        if not self._blocks:
+            self._blocks.append([(time, flight_id)])
+            self._starts.append(time)
+            self._max_gap.append(INFINITY)
+            return
+
+        b = self._locate(time)
+        block = self._blocks[b]
+        insort(block, (time, flight_id))
+        self._starts[b] = block[0][0]
+
+        if len(block) > 2 * BLOCK_SIZE:
+            self._blocks[b:b + 1] = [block[:BLOCK_SIZE], block[BLOCK_SIZE:]]
+            self._starts[b:b + 1] = [block[0][0], block[BLOCK_SIZE][0]]
+            self._max_gap[b:b + 1] = [0.0, 0.0]
+            self._refresh_gap(b + 1)
+        self._refresh_gap(b)
+        self._refresh_gap(b - 1)
+
+    def remove(self, flight_id: Hashable) -> Optional[float]:
+        """Free a slot; returns its time, or None if the flight held none"""
+        time = self._times.pop(flight_id, None)
+        if time is None:
+            return None
+        del self._categories[flight_id]
+
+        b = self._locate(time)
+        block = self._blocks[b]
+        del block[bisect_left(block, (time, flight_id))]
+        if block:
+            self._starts[b] = block[0][0]
+            self._refresh_gap(b)
+        else:
+            del self._blocks[b], self._starts[b], self._max_gap[b]
+        self._refresh_gap(b - 1)
+        return time
+
+    def _slot_at(self, b: int, i: int) -> Tuple[float, int]:
+        time, flight_id = self._blocks[b][i]
+        return time, self._categories[flight_id]
+
+    def earliest_slot(self, not_before: float, category: int) -> float:
+        """Earliest time >= not_before at which a flight of category fits between its neighbours"""
+        if not self._blocks:
+            return not_before
+
+        before = self._follower_columns[category]  # leader -> this flight
+        after = self._leader_rows[category]         # this flight -> follower
+        narrowest = min(before) + min(after)
+
+        # Cursor (b, i) points at the first slot at or after the candidate time
+        b = self._locate(not_before)
+        i = bisect_left(self._blocks[b], (not_before,))
+        if i == len(self._blocks[b]):
+            b, i = b + 1, 0
+        previous: Optional[Tuple[float, int]] = None
+        if i > 0:
+            previous = self._slot_at(b, i - 1)
+        elif b > 0:
+            previous = self._slot_at(b - 1, len(self._blocks[b - 1]) - 1)
+
+        candidate = not_before
+        while True:
+            if previous is not None:
+                candidate = max(candidate, previous[0] + before[previous[1]])
+            if b >= len(self._blocks):
+                return candidate
+
+            following = self._slot_at(b, i)
+            if candidate + after[following[1]] <= following[0]:
+                return candidate
+
+            previous = following
+            i += 1
+            # From the first slot of a block onwards every gap up to the next
+            # block is owned by that block; skip blocks where none is wide enough.
+            # The last block owns an infinite gap, so b + 1 always exists here.
+            while i == 1 and self._max_gap[b] < narrowest:
+                b += 1
+                previous = self._slot_at(b, 0)
+            if i == len(self._blocks[b]):
+                b, i = b + 1, 0
@@ -0,0 +1,286 @@
+"""
+Genetic Algorithm Runway Sequencing
+Optimizes the landing/departure order across runways with population fitness
+evaluated in vectorized batches and islands spread across a process pool.
+"""
+
+import os
+import time
+import numpy as np
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from models.indexed_scheduler import delay_weight
+from models.wake_turbulence import separation_matrix_seconds
+
+
+class SequencingProblem:
+    """Flights and runways flattened into arrays for vectorized evaluation"""
+
+    def __init__(self, flights: Sequence[Dict[str, Any]], runways: Sequence[Tuple]):
+        self.flight_ids = [flight['flight_id'] for flight in flights]
+        self.runway_names = [runway[0] for runway in runways]
+
+        self.earliest = np.array([_timestamp(flight['preferred_time']) for flight in flights], dtype=np.float64)
+        self.category = np.array([flight.get('category', 1) for flight in flights], dtype=np.intp)
+        self.weight = np.array([delay_weight(flight.get('priority', 'NORMAL'), flight.get('fuel_level', 100.0))
+                                for flight in flights], dtype=np.float64)
+
+        # separation[runway, leader, follower] in seconds; leader row 3 means "runway empty"
+        wake = separation_matrix_seconds()
+        self.separation = np.zeros((len(runways), 4, 3), dtype=np.float64)
+        for index, (_, capacity, *_) in enumerate(runways):
+            self.separation[index, :3, :] = np.maximum(wake, 3600.0 / capacity if capacity else 0.0)
+        # Optional third runway entry: weather delay in minutes before any slot on it
+        self.runway_delay = np.array([60.0 * (runway[2] if len(runway) > 2 else 0.0) for runway in runways])
+
+    @property
+    def size(self) -> int:
+        return len(self.flight_ids)
+
+    def fcfs_order(self) -> np.ndarray:
+        """First-come-first-served by preferred time"""
+        return np.argsort(self.earliest, kind='stable')
+
+    def decode(self, orders: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Greedy decode of a population of orders (P x N): each flight in turn
+        takes the runway where it can go earliest behind that runway's last
+        aircraft. Returns (cost per order, slot times P x N, runway P x N),
+        with times and runways indexed by flight.
+        """
+        orders = np.atleast_2d(orders)
+        population, n = orders.shape
+        rows = np.arange(population)
+        runway_index = np.arange(self.separation.shape[0])
+
+        last_time = np.full((population, len(runway_index)), -np.inf)
+        last_category = np.full((population, len(runway_index)), 3, dtype=np.intp)
+        cost = np.zeros(population)
+        times = np.empty((population, n))
+        runways = np.empty((population, n), dtype=np.intp)
+
+        for position in range(n):
+            flight = orders[:, position]
+            earliest = self.earliest[flight]
+            gap = self.separation[runway_index[None, :], last_category, self.category[flight][:, None]]
+            candidate = np.maximum(earliest[:, None] + self.runway_delay, last_time + gap)
+            runway = candidate.argmin(axis=1)
+            slot = candidate[rows, runway]
+
+            last_time[rows, runway] = slot
+            last_category[rows, runway] = self.category[flight]
+            times[rows, flight] = slot
+            runways[rows, flight] = runway
+            cost += self.weight[flight] * (slot - earliest) / 60.0
+        return cost, times, runways
+
+    def fitness(self, orders: np.ndarray) -> np.ndarray:
+        return self.decode(orders)[0]
+
+
+def _timestamp(value: Any) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+def _order_crossover(parent1: np.ndarray, parent2: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """OX crossover: keep a slice of parent1, fill the rest in parent2's order"""
+    n = len(parent1)
+    start, stop = np.sort(rng.choice(n + 1, 2, replace=False))
+    child = np.empty(n, dtype=parent1.dtype)
+    child[start:stop] = parent1[start:stop]
+    rest = parent2[~np.isin(parent2, parent1[start:stop])]
+    child[:start] = rest[:start]
+    child[stop:] = rest[start:]
+    return child
+
+
+def _mutate(order: np.ndarray, rng: np.random.Generator, max_shift: int = 8) -> np.ndarray:
+    """Move one flight a few positions, which keeps sequences near-chronological"""
+    n = len(order)
+    source = rng.integers(n)
+    target = int(np.clip(source + rng.integers(-max_shift, max_shift + 1), 0, n - 1))
+    flight = order[source]
+    order = np.delete(order, source)
+    return np.insert(order, target, flight)
+
+
+def local_search(problem: SequencingProblem, order: np.ndarray, cost: float,
+                 rounds: int = 3) -> Tuple[np.ndarray, float]:
+    """Best-improvement adjacent swaps, all neighbours scored in one batch per round"""
+    n = len(order)
+    if n < 2:
+        return order, cost
+    for _ in range(rounds):
+        neighbours = np.repeat(order[None, :], n - 1, axis=0)
+        k = np.arange(n - 1)
+        neighbours[k, k], neighbours[k, k + 1] = order[k + 1], order[k]
+        costs = problem.fitness(neighbours)
+        best = int(costs.argmin())
+        if costs[best] >= cost - 1e-9:
+            break
+        order, cost = neighbours[best], float(costs[best])
+    return order, cost
+
+
+def evolve_island(problem: SequencingProblem, population: np.ndarray, generations: int,
+                  deadline: float, seed: Any, mutation_rate: float = 0.3,
+                  elite: int = 2, tournament: int = 3) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Run one island until generations or the wall-clock deadline; returns sorted population and costs"""
+    rng = np.random.default_rng(seed)
+    size = len(population)
+    costs = problem.fitness(population)
+    completed = 0
+
+    while completed < generations and time.time() < deadline:
+        ranking = np.argsort(costs)
+        children = [population[index] for index in ranking[:elite]]
+        while len(children) < size:
+            contenders = rng.integers(size, size=(2, tournament))
+            parent1 = population[contenders[0][costs[contenders[0]].argmin()]]
+            parent2 = population[contenders[1][costs[contenders[1]].argmin()]]
+            child = _order_crossover(parent1, parent2, rng)
+            if rng.random() < mutation_rate:
+                child = _mutate(child, rng)
+            children.append(child)
+
+        population = np.stack(children)
+        costs = problem.fitness(population)
+        completed += 1
+
+    ranking = np.argsort(costs)
+    return population[ranking], costs[ranking], completed
+
+
+class SequenceOptimizer:
+    """
+    Island-model GA over runway sequences.
+
+    Each island evolves its own population in a worker process for a number
+    of generations; between epochs the best order of every island migrates
+    to its neighbour and the global best is polished with local search.
+    The process pool is created once and reused across update cycles.
+    Runways are (name, capacity) or (name, capacity, weather delay minutes).
+    """
+
+    def __init__(self, runways: Sequence[Tuple[str, int]], population_size: int = 60,
+                 n_islands: Optional[int] = None, migration_interval: int = 15, seed: int = 0,
+                 executor: Optional[Executor] = None):
+        self.runways = list(runways)
+        self.population_size = population_size
+        self.n_islands = n_islands or os.cpu_count() or 1
+        self.migration_interval = migration_interval
+        self.seed = seed
+        self._executor = executor
+
+    def _pool(self) -> Optional[Executor]:
+        if self.n_islands <= 1:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.n_islands)
+        return self._executor
+
+    def close(self):
+        """Shut down the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _initial_population(self, problem: SequencingProblem, rng: np.random.Generator) -> np.ndarray:
+        fcfs = problem.fcfs_order()
+        # Urgent flights first, then by preferred time
+        urgent = np.lexsort((problem.earliest, -problem.weight))
+        population = [fcfs, urgent]
+        while len(population) < self.population_size:
+            order = population[rng.integers(2)].copy()
+            for _ in range(rng.integers(1, 6)):
+                order = _mutate(order, rng)
+            population.append(order)
+        return np.stack(population)
+
+    def optimize(self, flights: Sequence[Dict[str, Any]], time_budget: float = 1.5,
+                 max_generations: int = 500) -> Dict[str, Any]:
+        """
+        Sequence flights (dicts with flight_id, preferred_time, category,
+        priority, fuel_level) across the runways within time_budget seconds.
+        """
+        started = time.time()
+        deadline = started + time_budget
+        problem = SequencingProblem(flights, self.runways)
+        if not problem.size:
+            return {'schedule': [], 'total_delay_minutes': 0.0, 'weighted_cost': 0.0, 'generations': 0}
+
+        seeds = np.random.SeedSequence(self.seed).spawn(self.n_islands)
+        rng = np.random.default_rng(seeds[0])
+        islands = [self._initial_population(problem, rng) for _ in range(self.n_islands)]
+        fcfs_cost = float(problem.fitness(problem.fcfs_order())[0])
+        best_order, best_cost = problem.fcfs_order(), fcfs_cost
+
+        pool = self._pool()
+        generations = 0
+        epoch = 0
+        while generations < max_generations and time.time() < deadline:
+            step = min(self.migration_interval, max_generations - generations)
+            epoch_seeds = [np.random.SeedSequence([self.seed, epoch, island]) for island in range(self.n_islands)]
+            if pool is None:
+                results = [evolve_island(problem, population, step, deadline, island_seed)
+                           for population, island_seed in zip(islands, epoch_seeds)]
+            else:
+                futures = [pool.submit(evolve_island, problem, population, step, deadline, island_seed)
+                           for population, island_seed in zip(islands, epoch_seeds)]
+                results = [future.result() for future in futures]
+
+            islands = [population for population, _, _ in results]
+            generations += max(completed for _, _, completed in results)
+            for population, costs, _ in results:
+                if costs[0] < best_cost:
+                    best_order, best_cost = population[0], float(costs[0])
+
+            best_order, best_cost = local_search(problem, best_order, best_cost)
+
+            # Ring migration: each island's worst member is replaced by its neighbour's best
+            for index, population in enumerate(islands):
+                population[-1] = islands[index - 1][0]
+            islands[0][-2] = best_order
+            epoch += 1
+
+        _, times, runways = problem.decode(best_order)
+        schedule = []
+        for position in np.argsort(times[0], kind='stable'):
+            delay = (times[0][position] - problem.earliest[position]) / 60.0
+            schedule.append({
+                'flight_id': problem.flight_ids[position],
+                'runway': problem.runway_names[runways[0][position]],
+                'scheduled_time': datetime.fromtimestamp(times[0][position]),
+                'delay_minutes': float(delay),
+            })
+
+        return {
+            'schedule': schedule,
+            'total_delay_minutes': calculate_delays(schedule)['total_delay_minutes'],
+            'weighted_cost': best_cost,
+            'fcfs_weighted_cost': fcfs_cost,
+            'generations': generations,
+            'elapsed_seconds': time.time() - started,
+        }
+
+
+def schedule_departures(flight_queue: Sequence[Dict[str, Any]], runways: Sequence[Tuple[str, int]],
+                        time_budget: float = 1.5) -> Dict[str, Any]:
+    """One-shot GA sequencing of a flight queue; see SequenceOptimizer.optimize"""
+    optimizer = SequenceOptimizer(runways)
+    try:
+        return optimizer.optimize(flight_queue, time_budget)
+    finally:
+        optimizer.close()
+
+
+def calculate_delays(schedule: Sequence[Dict[str, Any]]) -> Dict[str, float]:
+    """Delay totals of a schedule as produced by SequenceOptimizer.optimize"""
+    delays = [entry['delay_minutes'] for entry in schedule]
+    return {
+        'total_delay_minutes': float(sum(delays)),
+        'average_delay_minutes': float(sum(delays) / len(delays)) if delays else 0.0,
+        'max_delay_minutes': float(max(delays, default=0.0)),
+    }
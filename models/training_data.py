@@ -0,0 +1,103 @@
+"""
+Synthetic Training Data for the Collision Avoidance Model
+Generates random aircraft encounters and labels them from their closest approach.
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Sequence, Tuple, Union
+
+from models.conflict_features import extract_pair_features
+from models.wake_turbulence import HEAVY, LIGHT, MEDIUM
+
+# Bump whenever the generator or labelling changes so saved models are not reused
+GENERATOR_VERSION = 2
+
+# Samples per shard; fixed so the data for a seed does not depend on the worker count
+SHARD_SIZE = 100_000
+
+# Severity codes from utils.conflict_engine
+MEDIUM_SEVERITY, HIGH_SEVERITY = 2, 3
+
+# Above this weather factor MEDIUM encounters are labelled as conflicts too
+ADVERSE_WEATHER_FACTOR = 1.5
+
+
+def generate_synthetic_pairs(n_samples: int, seed: Union[int, np.random.SeedSequence] = 42,
+                             max_range_nm: float = 30.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Random encounters over the continental US as (features, labels).
+
+    Most intruders are steered roughly towards the first aircraft so
+    that conflicts are not vanishingly rare.
+    """
+    rng = np.random.default_rng(seed)
+    n = n_samples
+
+    state = np.empty((2 * n, 6), dtype=np.float64)
+    own, intruder = state[:n], state[n:]
+
+    own[:, 0] = rng.uniform(25.0, 50.0, n)
+    own[:, 1] = rng.uniform(-125.0, -70.0, n)
+    own[:, 2] = rng.uniform(2000.0, 42000.0, n)
+    own[:, 3] = rng.uniform(150.0, 550.0, n)
+    own[:, 4] = rng.uniform(0.0, 360.0, n)
+    own[:, 5] = np.clip(rng.normal(0.0, 800.0, n), -3000.0, 3000.0)
+
+    distance = max_range_nm * np.sqrt(rng.uniform(0.0, 1.0, n))
+    bearing = rng.uniform(0.0, 2 * np.pi, n)
+    intruder[:, 0] = own[:, 0] + distance * np.cos(bearing) / 60.0
+    intruder[:, 1] = own[:, 1] + distance * np.sin(bearing) / (60.0 * np.cos(np.radians(own[:, 0])))
+    intruder[:, 2] = np.clip(own[:, 2] + rng.uniform(-2500.0, 2500.0, n), 0.0, None)
+    intruder[:, 3] = rng.uniform(150.0, 550.0, n)
+
+    inbound = (np.degrees(bearing) + 180.0 + rng.normal(0.0, 10.0, n)) % 360.0
+    intruder[:, 4] = np.where(rng.random(n) < 0.7, inbound, rng.uniform(0.0, 360.0, n))
+    intruder[:, 5] = np.clip(rng.normal(0.0, 800.0, n), -3000.0, 3000.0)
+
+    weather = np.repeat(rng.uniform(0.8, 2.0, n), 2)
+    density = np.repeat(rng.poisson(5.0, n).astype(np.float64), 2)
+    category = rng.choice([LIGHT, MEDIUM, HEAVY], size=2 * n, p=[0.1, 0.7, 0.2])
+
+    rows = np.arange(n)
+    features, geometry = extract_pair_features(state, rows, rows + n, weather_factor=weather,
+                                               traffic_density=density, aircraft_category=category)
+
+    severity = geometry['severity']
+    labels = (severity >= HIGH_SEVERITY) | ((weather[:n] > ADVERSE_WEATHER_FACTOR) & (severity >= MEDIUM_SEVERITY))
+    return features, labels.astype(np.int8)
+
+
+def shard_plan(n_samples: int, seed: Union[int, Sequence[int]],
+               shard_size: int = SHARD_SIZE) -> Tuple[list, list]:
+    """Shard sizes and their independent child seeds for a run"""
+    sizes = [shard_size] * (n_samples // shard_size)
+    if n_samples % shard_size:
+        sizes.append(n_samples % shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return sizes, seeds
+
+
+def generate_synthetic_pairs_parallel(n_samples: int, seed: Union[int, Sequence[int]] = 42,
+                                      n_workers: Optional[int] = None,
+                                      shard_size: int = SHARD_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Generate encounters in shards across a process pool.
+
+    Every shard gets its own child of SeedSequence(seed), so the result is
+    identical for any n_workers.
+    """
+    if n_samples <= 0:
+        raise ValueError("n_samples must be positive")
+    sizes, seeds = shard_plan(n_samples, seed, shard_size)
+    n_workers = min(n_workers or os.cpu_count() or 1, len(sizes))
+
+    if n_workers <= 1:
+        shards = [generate_synthetic_pairs(size, shard_seed) for size, shard_seed in zip(sizes, seeds)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            shards = list(pool.map(generate_synthetic_pairs, sizes, seeds))
+
+    return (np.concatenate([features for features, _ in shards]),
+            np.concatenate([labels for _, labels in shards]))
@@ -0,0 +1,67 @@
+"""
+Wake Turbulence Categories
+Maps ICAO aircraft type designators to LIGHT / MEDIUM / HEAVY and gives the
+leader-follower separation used for runway sequencing.
+"""
+
+import numpy as np
+from typing import Any, Optional
+
+LIGHT, MEDIUM, HEAVY = 0, 1, 2
+CATEGORY_NAMES = ('Light', 'Medium', 'Heavy')
+
+HEAVY_TYPES = frozenset({
+    'A306', 'A310', 'A332', 'A333', 'A338', 'A339', 'A343', 'A346', 'A359', 'A35K', 'A388',
+    'B744', 'B748', 'B762', 'B763', 'B764', 'B772', 'B773', 'B77L', 'B77W', 'B777',
+    'B788', 'B789', 'B78X', 'MD11',
+})
+LIGHT_TYPES = frozenset({
+    'C152', 'C172', 'C182', 'C208', 'PA28', 'PA32', 'SR22', 'BE20', 'BE58', 'PC12', 'DA40', 'DA42',
+})
+
+# Leader-follower wake separation in nautical miles; other pairs use the
+# minimum radar separation
+separation_requirements = {
+    'Heavy-Heavy': 4.0,
+    'Heavy-Medium': 5.0,
+    'Heavy-Light': 6.0,
+    'Medium-Light': 3.0,
+}
+MINIMUM_SEPARATION_NM = 3.0
+
+# Typical final approach ground speed used to turn distance into time
+APPROACH_SPEED_KT = 140.0
+
+
+def separation_nm(leader: int, follower: int) -> float:
+    """Required distance behind a leader of one category for a follower of another"""
+    key = f"{CATEGORY_NAMES[leader]}-{CATEGORY_NAMES[follower]}"
+    return separation_requirements.get(key, MINIMUM_SEPARATION_NM)
+
+
+def separation_matrix_seconds(approach_speed_kt: float = APPROACH_SPEED_KT) -> np.ndarray:
+    """3 x 3 [leader, follower] wake separation in seconds"""
+    matrix = np.empty((len(CATEGORY_NAMES), len(CATEGORY_NAMES)))
+    for leader in range(len(CATEGORY_NAMES)):
+        for follower in range(len(CATEGORY_NAMES)):
+            matrix[leader, follower] = separation_nm(leader, follower) / approach_speed_kt * 3600.0
+    return matrix
+
+
+def wake_category(aircraft_type: Optional[str]) -> int:
+    """Wake category for an ICAO type designator; unknown types count as MEDIUM"""
+    if not aircraft_type:
+        return MEDIUM
+    code = str(aircraft_type).strip().upper()
+    if code in HEAVY_TYPES:
+        return HEAVY
+    if code in LIGHT_TYPES:
+        return LIGHT
+    return MEDIUM
+
+
+def flight_wake_category(flight: Any) -> int:
+    """Wake category of a flight dict or FlightData-like object"""
+    if isinstance(flight, dict):
+        return wake_category(flight.get('aircraft_type'))
+    return wake_category(getattr(flight, 'aircraft_type', None))
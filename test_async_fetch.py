@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Test Script for Concurrent Flight Source Fetching and Merging
+Runs against a local stub HTTP server, so no network access is needed
+"""
+
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+
+from utils.async_fetch import AsyncFlightAggregator, configured_sources
+from utils.flight_merge import FlightMerger, merge_flights
+from utils.quota_planner import PRIORITY_CONFLICT, QuotaPlanner, TokenBucket
+from utils.response_cache import CachedWeather, ResponseCache
+
+OPENSKY_STATES = {
+    'time': 1700000000,
+    'states': [
+        ['abc123', 'UAL123  ', 'United States', 1700000000, 1700000001, -73.9, 40.7, 3048.0, False,
+         257.2, 90.0, 5.08, None, 3100.0, '1200', False, 0],
+    ],
+}
+
+ADSB_AIRCRAFT = {
+    'now': 1700000000000,
+    'ac': [{'hex': 'DEF456', 'flight': 'DAL9 ', 'lat': 40.8, 'lon': -73.8, 'alt_baro': 12000,
+            'gs': 300.0, 'track': 270.0, 'baro_rate': -640, 'seen_pos': 2.0, 't': 'A321'}],
+}
+
+
+class StubServer:
+    """aiohttp server on an ephemeral port, running on its own loop thread"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.requests = []
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    async def _handler(self, request):
+        self.requests.append(request.path)
+        await asyncio.sleep(self.delays.get(request.path, 0.0))
+        if request.path.startswith('/opensky'):
+            return web.json_response(OPENSKY_STATES)
+        if request.path.startswith('/adsb'):
+            return web.json_response(ADSB_AIRCRAFT)
+        if request.path.startswith('/flightaware'):
+            return web.json_response({'error': 'Unauthorized'}, status=401)
+        return web.json_response({'data': []})
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self._handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        return site._server.sockets[0].getsockname()[1]
+
+    def __enter__(self):
+        self.thread.start()
+        self.port = asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+    def env(self):
+        base = f'http://127.0.0.1:{self.port}'
+        return {
+            'OPENSKY_BASE_URL': f'{base}/opensky',
+            'AVIATIONSTACK_API_KEY': 'key', 'AVIATIONSTACK_BASE_URL': f'{base}/aviationstack',
+            'FLIGHTAWARE_API_KEY': 'key', 'FLIGHTAWARE_BASE_URL': f'{base}/flightaware',
+        }
+
+
+def stub_sources(server, deadlines):
+    """Source factory pointing every provider at the stub server"""
+    def factory(bbox):
+        sources = configured_sources(bbox, env=server.env(), deadlines=deadlines)
+        # RapidAPI requests are always https; point the parsed source at the stub instead
+        adsb = configured_sources([40.0, -75.0, 41.5, -72.5], env={'RAPIDAPI_KEY': 'key', 'RAPIDAPI_HOST': 'stub'})[-1]
+        return sources + [adsb._replace(url=f'http://127.0.0.1:{server.port}/adsb', deadline=deadlines['RapidAPI'])]
+    return factory
+
+
+def test_fan_out_returns_partial_results_by_deadline():
+    """Latency follows the slowest source within deadline; late and failing sources are tagged"""
+    delays = {'/opensky/states/all': 0.3, '/adsb': 0.3, '/aviationstack/flights': 5.0}
+    with StubServer(delays) as server:
+        deadlines = {'OpenSky': 1.0, 'AviationStack': 0.6, 'FlightAware': 1.0, 'RapidAPI': 1.0}
+        aggregator = AsyncFlightAggregator(stub_sources(server, deadlines))
+        try:
+            started = time.perf_counter()
+            result = aggregator.get_aggregated_flight_data(bbox=[40.0, -75.0, 41.5, -72.5])
+            elapsed = time.perf_counter() - started
+        finally:
+            aggregator.close()
+
+    status = result['source_status']
+    assert elapsed < 1.0, elapsed
+    assert status['OpenSky']['status'] == 'ok' and status['RapidAPI']['status'] == 'ok'
+    assert status['AviationStack']['status'] == 'timeout'
+    assert status['FlightAware']['status'] == 'error' and '401' in status['FlightAware']['error']
+    assert sorted(result['sources']) == ['OpenSky', 'RapidAPI'] and result['count'] == result['raw_count'] == 2
+
+    flights = {flight['source']: flight for flight in result['flights']}
+    assert flights['OpenSky']['callsign'] == 'UAL123'
+    assert abs(flights['OpenSky']['baro_altitude'] - 10000.0) < 1.0
+    assert abs(flights['OpenSky']['velocity'] - 500.0) < 1.0
+    assert flights['RapidAPI']['icao24'] == 'def456'
+    assert flights['RapidAPI']['last_position_update'] == 1700000000 - 2.0
+    print(f"✅ 4 sources fanned out in {elapsed * 1000:.0f} ms with partial results")
+
+
+def test_overall_deadline_and_async_callers():
+    """The overall deadline caps the wait and the coroutine API shares the pooled session"""
+    with StubServer({'/opensky/states/all': 3.0}) as server:
+        deadlines = {'OpenSky': 5.0, 'AviationStack': 5.0, 'FlightAware': 5.0, 'RapidAPI': 5.0}
+        aggregator = AsyncFlightAggregator(stub_sources(server, deadlines), deadline=0.5)
+        try:
+            first = asyncio.run(aggregator.fetch())
+            session = aggregator._session
+            second = aggregator.get_aggregated_flight_data()
+            assert aggregator._session is session
+        finally:
+            aggregator.close()
+
+    assert first['source_status']['OpenSky']['status'] == 'timeout'
+    assert 'Overall deadline' in first['source_status']['OpenSky']['error']
+    assert sorted(first['sources']) == sorted(second['sources']) == ['AviationStack', 'RapidAPI']
+    print("✅ Overall deadline respected from async and sync callers")
+
+
+def test_merge_fuses_overlapping_reports():
+    """One record per aircraft: freshest position, descriptive fields by source priority"""
+    reports = [
+        {'icao24': 'ABC123', 'callsign': 'UAL123', 'latitude': 40.70, 'longitude': -73.90, 'baro_altitude': 10000.0,
+         'last_position_update': 100.0, 'aircraft_type': None, 'source': 'OpenSky'},
+        {'icao24': None, 'callsign': 'UAL123 ', 'latitude': 40.72, 'longitude': -73.88, 'baro_altitude': 10100.0,
+         'last_position_update': 104.0, 'aircraft_type': 'B738', 'origin': 'EWR', 'source': 'FlightAware'},
+        {'icao24': 'abc123', 'callsign': 'UAL123', 'latitude': 40.71, 'longitude': -73.89, 'baro_altitude': 10050.0,
+         'last_position_update': 102.0, 'aircraft_type': 'B38M', 'source': 'RapidAPI'},
+        {'icao24': 'def456', 'callsign': 'DAL9', 'latitude': 41.0, 'longitude': -74.0, 'baro_altitude': 30000.0,
+         'last_position_update': 100.0, 'source': 'OpenSky'},
+    ]
+
+    merged = {flight['icao24']: flight for flight in merge_flights(reports)}
+
+    assert sorted(merged) == ['abc123', 'def456']
+    ual = merged['abc123']
+    assert ual['latitude'] == 40.72 and ual['baro_altitude'] == 10100.0 and ual['source'] == 'FlightAware'
+    assert ual['aircraft_type'] == 'B38M' and ual['origin'] == 'EWR'
+    assert ual['sources'] == ['OpenSky', 'RapidAPI', 'FlightAware']
+    print("✅ 4 overlapping reports merged into 2 aircraft")
+
+
+def test_callsign_report_adopted_within_one_batch():
+    """A callsign-only report ahead of the icao24 report in the same batch fuses into one record"""
+    merger = FlightMerger()
+    update = merger.update([
+        {'icao24': None, 'callsign': 'UAL1', 'latitude': 40.0, 'longitude': -73.0, 'last_position_update': 101.0,
+         'aircraft_type': 'B738', 'source': 'FlightAware'},
+        {'icao24': 'abc123', 'callsign': 'UAL1', 'latitude': 40.1, 'longitude': -73.1, 'last_position_update': 100.0,
+         'source': 'OpenSky'},
+    ], now=0.0)
+
+    assert len(update.changed) == 1 and update.removed == []
+    fused = update.changed[0]
+    assert fused['icao24'] == 'abc123' and fused['sources'] == ['OpenSky', 'FlightAware']
+    assert fused['aircraft_type'] == 'B738' and fused['latitude'] == 40.0
+    assert list(merger.aircraft) == ['abc123']
+    print("✅ Callsign-only report adopted by its icao24 in the same batch")
+
+
+def test_merger_emits_only_changes():
+    """Repeated and out-of-order reports emit nothing; silent aircraft expire"""
+    merger = FlightMerger(stale_after=30.0)
+    first = [{'icao24': f'a{k}', 'latitude': 40.0 + k, 'longitude': -73.0, 'last_position_update': 100.0,
+              'source': 'OpenSky'} for k in range(3)]
+    assert len(merger.update(first, now=0.0).changed) == 3
+
+    assert merger.update(first, now=5.0) == ([], [])
+    moved = dict(first[1], latitude=41.5, last_position_update=105.0)
+    stale = dict(first[2], latitude=45.0, last_position_update=90.0)
+    update = merger.update([moved, stale], now=10.0)
+    assert [flight['icao24'] for flight in update.changed] == ['a1'] and update.removed == []
+    assert merger.aircraft['a2']['latitude'] == 42.0
+
+    update = merger.update([dict(moved, last_position_update=110.0)], now=40.0)
+    assert sorted(update.removed) == ['a0', 'a2'] and list(merger.aircraft) == ['a1']
+    print("✅ Merger emits only changed aircraft")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cached_sources_skip_requests_until_stale():
+    """Fresh entries skip the request, stale ones are served while a background refresh runs"""
+    clock = FakeClock()
+    with StubServer({}) as server:
+        deadlines = {'OpenSky': 1.0, 'AviationStack': 1.0, 'FlightAware': 1.0, 'RapidAPI': 1.0}
+        cache = ResponseCache(ttls={'OpenSky': 30.0, 'RapidAPI': 30.0, 'AviationStack': 30.0}, clock=clock)
+        aggregator = AsyncFlightAggregator(stub_sources(server, deadlines), cache=cache)
+        try:
+            first = aggregator.get_aggregated_flight_data(bbox=[40.2, -74.5, 41.0, -73.0])
+            requests = len(server.requests)
+            # A slightly different view inside the same tiles reuses every entry; only the
+            # failing FlightAware source is asked again, since errors are never cached
+            second = aggregator.get_aggregated_flight_data(bbox=[40.1, -74.2, 40.9, -73.5])
+            assert len(server.requests) == requests + 1
+
+            clock.now += 60.0
+            stale = aggregator.get_aggregated_flight_data(bbox=[40.2, -74.5, 41.0, -73.0])
+            time.sleep(0.3)
+            refreshed = len(server.requests)
+            clock.now += 1.0
+            aggregator.get_aggregated_flight_data(bbox=[40.2, -74.5, 41.0, -73.0])
+        finally:
+            aggregator.close()
+
+    assert first['source_status']['OpenSky']['cache'] == 'miss' and first['count'] == 2
+    assert second['source_status']['OpenSky']['cache'] == 'fresh' and second['count'] == 2
+    assert stale['source_status']['OpenSky']['cache'] == 'stale' and stale['count'] == 2
+    # OpenSky, AviationStack and RapidAPI refresh in the background, FlightAware is retried inline
+    assert refreshed == requests + 5 and len(server.requests) == refreshed + 1
+    stats = cache.stats()
+    assert stats['refreshes'] == 3 and stats['refresh_errors'] == 0 and stats['entries'] == 3
+    print(f"✅ Provider cache served {stats['hits'] + stats['stale_hits']} of "
+          f"{stats['hits'] + stats['stale_hits'] + stats['misses']} source lookups")
+
+
+def test_response_cache_lru_disk_tier_and_weather():
+    """LRU eviction, a warm start from disk and per-location weather caching"""
+    clock = FakeClock()
+    calls = []
+
+    def fetch_location(location):
+        calls.append(location)
+        return {'location': location, 'temperature': 20.0}
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache(max_entries=2, directory=directory, clock=clock)
+        weather = CachedWeather(fetch_location, cache)
+        locations = ['JFK', 'LAX', (40.64, -73.78)]
+        assert set(weather.get_weather_data_multiple_sources(locations)) == set(locations)
+        assert len(cache) == 2 and cache.stats()['evictions'] == 1
+
+        # Cycling through three locations with room for two reloads each one from disk
+        weather.get_weather_data_multiple_sources(locations)
+        assert calls == locations and cache.stats()['disk_hits'] == 3
+
+        restarted = ResponseCache(directory=directory, clock=clock)
+        key = ('OpenWeatherMap', (40.64, -73.78), 'weather')
+        assert restarted.lookup(key)[1] == 'fresh'
+
+        clock.now += 601.0
+        assert CachedWeather(fetch_location, restarted).get_weather_data_multiple_sources(['JFK'])
+        restarted.wait_for_refreshes(5.0)
+        restarted.close()
+        assert calls == locations + ['JFK'] and restarted.stats()['stale_hits'] == 1
+
+    # JFK and LGA share a 1° tile but are separate weather locations
+    jfk, lga = (40.6413, -73.7781), (40.7769, -73.8740)
+    nearby = CachedWeather(lambda location: {'temperature': 20.0 if location == jfk else 25.0}, ResponseCache())
+    stations = nearby.get_weather_data_multiple_sources([jfk, lga])
+    assert stations[jfk] != stations[lga] and len(nearby.cache) == 2
+    print("✅ Cache evicts least recently used entries and restarts warm from disk")
+
+
+def test_token_bucket_spreads_daily_quota():
+    """Polling every 10 s all day spends the quota evenly and never exceeds it"""
+    clock = FakeClock()
+    clock.now = 19000 * 86400.0
+    bucket = TokenBucket(400, clock=clock)
+    used = []
+    for _ in range(8640 * 2):
+        bucket.try_take()
+        used.append(bucket.used_today)
+        clock.now += 10.0
+
+    first_day = used[8639]
+    assert 390 <= first_day <= 400, first_day
+    assert 180 <= used[4319] <= 220, used[4319]
+    assert 390 <= used[-1] <= 400 and bucket.day == 19001
+    print(f"✅ Token bucket spent {first_day}/400 requests, {used[4319]} by midday")
+
+
+def test_planner_reserves_quota_for_conflicts_and_batches_weather():
+    """Normal requests leave a reserve for conflict regions; weather goes out oldest-first in batches"""
+    clock = FakeClock()
+    clock.now = 19000 * 86400.0 + 43200.0
+    planner = QuotaPlanner(clock=clock)
+    planner.mark_conflicts([[40.0, -75.0, 41.0, -73.0]])
+    nyc, texas = [40.5, -74.5, 40.9, -73.5], [30.0, -100.0, 32.0, -97.0]
+    assert planner.priority_for(nyc) == PRIORITY_CONFLICT and planner.priority_for(texas) != PRIORITY_CONFLICT
+
+    normal = sum(planner.allow('OpenSky', 'texas', planner.priority_for(texas)) for _ in range(20))
+    conflict = sum(planner.allow('OpenSky', 'nyc', planner.priority_for(nyc)) for _ in range(20))
+    assert normal >= 1 and conflict >= 1 and planner.allow('AviationStack')
+
+    batches = []
+
+    def fetch_batch(locations):
+        batches.append(list(locations))
+        return {location: {'location': location, 'temperature': 15.0} for location in locations}
+
+    cache = ResponseCache(clock=clock)
+    weather = CachedWeather(cache=cache, fetch_batch=fetch_batch, planner=planner)
+    stations = [f'K{index:03d}' for index in range(45)]
+    first = weather.get_weather_data_multiple_sources(stations)
+    clock.now += 1200.0
+    second = weather.get_weather_data_multiple_sources(stations)
+
+    status = planner.status()
+    rows = {row['provider']: row for row in status['providers']}
+    assert [len(batch) for batch in batches] == [20, 20, 5] * 2 and len(first) == len(second) == 45
+    assert rows['OpenWeatherMap']['used_today'] == 6
+    assert rows['OpenSky']['denied'] > 0 and status['conflict_regions'] == 1 and status['decisions']
+    print(f"✅ Planner allowed {normal} normal and {conflict} conflict requests, "
+          f"45 stations in {len(batches)} weather calls")
+
+
+def test_aggregator_defers_requests_without_quota():
+    """Sources the planner cannot pay for are reported as deferred"""
+    clock = FakeClock()
+    with StubServer({}) as server:
+        deadlines = {'OpenSky': 1.0, 'AviationStack': 1.0, 'FlightAware': 1.0, 'RapidAPI': 1.0}
+        planner = QuotaPlanner({'OpenSky': 0, 'RapidAPI': 1000}, clock=clock)
+        aggregator = AsyncFlightAggregator(stub_sources(server, deadlines), planner=planner,
+                                           cache=ResponseCache(clock=clock))
+        try:
+            result = aggregator.get_aggregated_flight_data(bbox=[40.2, -74.5, 41.0, -73.0])
+        finally:
+            aggregator.close()
+
+    status = result['source_status']
+    assert status['OpenSky']['status'] == 'deferred' and status['RapidAPI']['status'] == 'ok'
+    assert not any(path.startswith('/opensky') for path in server.requests)
+    print("✅ Requests without quota are deferred, not sent")
+
+
+def test_denied_refetch_serves_expired_data():
+    """Past the stale window a refetch the planner denies falls back to the expired entry"""
+    clock = FakeClock()
+    clock.now = 19000 * 86400.0 + 43200.0
+    with StubServer({}) as server:
+        deadlines = {'OpenSky': 1.0, 'AviationStack': 1.0, 'FlightAware': 1.0, 'RapidAPI': 1.0}
+        planner = QuotaPlanner(clock=clock)
+        aggregator = AsyncFlightAggregator(stub_sources(server, deadlines), planner=planner,
+                                           cache=ResponseCache(clock=clock))
+        bbox = [40.2, -74.5, 41.0, -73.0]
+        try:
+            first = aggregator.get_aggregated_flight_data(bbox=bbox)
+            opensky = sum(path.startswith('/opensky') for path in server.requests)
+            # Well past 30 s TTL + 4 x 30 s stale window, and the bucket is empty
+            clock.now += 1000.0
+            bucket = planner.buckets['OpenSky']
+            bucket.used_today, bucket.tokens, bucket.updated = bucket.daily_quota, 0.0, clock.now
+            later = aggregator.get_aggregated_flight_data(bbox=bbox)
+        finally:
+            aggregator.close()
+
+    assert first['source_status']['OpenSky']['count'] > 0
+    status = later['source_status']['OpenSky']
+    assert status['status'] == 'ok' and status['cache'] == 'expired', status
+    assert status['count'] == first['source_status']['OpenSky']['count']
+    assert sum(path.startswith('/opensky') for path in server.requests) == opensky
+    print(f"✅ Denied refetch served {status['count']} expired OpenSky flights instead of none")
+
+
+def main():
+    """Run all async fetch tests"""
+    print("🧪 Async Flight Fetch Test Suite")
+    print("=" * 60)
+
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("-" * 60)
+    print(f"🎯 Overall: {len(tests) - failures}/{len(tests)} tests passed")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
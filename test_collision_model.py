@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test Script for the Batched Collision Avoidance Model
+Checks batched scoring against single-pair predictions
+"""
+
+import sys
+import os
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from demo_data import generate_demo_flights
+from utils.flight_batch import FlightBatch
+from models.batch_collision import BatchCollisionAvoidanceModel
+from models.forest_compiler import CompiledForest
+from models.model_store import clear_loaded
+from models.training_data import generate_synthetic_pairs_parallel
+
+ARTIFACT_DIR = tempfile.mkdtemp(prefix='atc_models_')
+_MODEL = None
+
+
+def trained_model():
+    """Train the shared test model once"""
+    global _MODEL
+    if _MODEL is None:
+        _MODEL = BatchCollisionAvoidanceModel(n_estimators=30, n_samples=4000, artifact_dir=ARTIFACT_DIR)
+        _MODEL.train()
+    return _MODEL
+
+
+def test_batch_matches_single_pair_predictions():
+    """One predict_proba call gives the same probabilities as per-pair calls"""
+    model = trained_model()
+    flights = generate_demo_flights(30)['flights']
+    pairs = [(flights[k], flights[k + 1]) for k in range(len(flights) - 1)]
+
+    batch = model.predict_conflicts_batch(pairs, prefilter=False)
+    single = [model.predict_conflict(flight1, flight2)['conflict_probability'] for flight1, flight2 in pairs]
+
+    assert np.allclose(batch['conflict_probability'], single)
+    assert np.all(batch['confidence'] >= 0.5)
+    print(f"✅ Batched scores match {len(pairs)} single-pair predictions")
+
+
+def test_prefilter_skips_geometrically_clear_pairs():
+    """Pairs the geometric detector rules out are never scored"""
+    model = trained_model()
+    near = {'latitude': 40.64, 'longitude': -73.78, 'baro_altitude': 10000, 'velocity': 250, 'true_track': 90}
+    head_on = {'latitude': 40.64, 'longitude': -73.70, 'baro_altitude': 10200, 'velocity': 250, 'true_track': 270}
+    far = {'latitude': 34.0, 'longitude': -118.4, 'baro_altitude': 10000, 'velocity': 250, 'true_track': 90}
+
+    result = model.predict_conflicts_batch([(near, head_on), (near, far)])
+
+    assert result['evaluated'].tolist() == [True, False]
+    assert result['conflict_probability'][1] == 0.0 and result['confidence'][1] == 1.0
+    assert result['conflict_probability'][0] > 0.5
+    print("✅ Prefilter skips geometrically clear pairs")
+
+
+def test_predict_pairs_on_flight_batch():
+    """Index pairs into a FlightBatch are scored without building pair lists"""
+    model = trained_model()
+    flights = FlightBatch.from_dicts(generate_demo_flights(200)['flights'])
+    i, j = np.triu_indices(len(flights), 1)
+
+    result = model.predict_pairs(flights, i, j)
+
+    assert result['conflict_probability'].shape == i.shape
+    assert np.all(result['conflict_probability'][~result['evaluated']] == 0.0)
+    print(f"✅ Scored {len(i)} pairs, {int(result['evaluated'].sum())} sent to the forest")
+
+
+def test_saved_model_is_loaded_instead_of_retrained():
+    """A new instance with the same parameters reuses the saved artifact lazily"""
+    model = trained_model()
+    flight1 = {'latitude': 40.6413, 'longitude': -73.7781, 'baro_altitude': 3000, 'velocity': 250, 'true_track': 90}
+    flight2 = {'latitude': 40.6513, 'longitude': -73.7681, 'baro_altitude': 3100, 'velocity': 260, 'true_track': 270}
+
+    clear_loaded()
+    restored = BatchCollisionAvoidanceModel(n_estimators=30, n_samples=4000, artifact_dir=ARTIFACT_DIR)
+    assert not restored.is_trained
+    assert restored.predict_conflict(flight1, flight2) == model.predict_conflict(flight1, flight2)
+    assert restored.is_trained and restored.metrics == model.metrics
+
+    assert BatchCollisionAvoidanceModel(n_estimators=30, n_samples=4000, artifact_dir=ARTIFACT_DIR).train()['loaded']
+    other = BatchCollisionAvoidanceModel(n_estimators=31, n_samples=4000, artifact_dir=ARTIFACT_DIR)
+    assert other.artifact_key != model.artifact_key and not other.load()
+    print(f"✅ Saved model {model.artifact_key} reused without retraining")
+
+
+def test_sharded_generation_is_deterministic():
+    """Shard seeds make the dataset independent of the worker count"""
+    serial = generate_synthetic_pairs_parallel(5000, seed=7, n_workers=1, shard_size=1000)
+    pooled = generate_synthetic_pairs_parallel(5000, seed=7, n_workers=2, shard_size=1000)
+
+    assert serial[0].shape == (5000, 12)
+    assert np.array_equal(serial[0], pooled[0]) and np.array_equal(serial[1], pooled[1])
+    print("✅ Sharded generation is deterministic across worker counts")
+
+
+def test_warm_start_growth_adds_trees():
+    """grow() extends the forest and reports throughput"""
+    model = BatchCollisionAvoidanceModel(n_estimators=10, n_samples=2000, artifact_dir=ARTIFACT_DIR)
+    base = model.train()
+    grown = model.grow(2000, 5)
+
+    assert base['samples_per_second'] > 0 and grown['samples_per_second'] > 0
+    assert len(model.model.estimators_) == 15 and grown['n_samples'] == 4000
+    assert 0.0 <= grown['test_accuracy'] <= 1.0
+
+    reloaded = BatchCollisionAvoidanceModel(n_estimators=10, n_samples=2000, artifact_dir=ARTIFACT_DIR)
+    assert reloaded.train()['loaded'] and len(reloaded.model.estimators_) == 10
+    regrown = reloaded.grow(2000, 5)
+    assert regrown['loaded'] and len(reloaded.model.estimators_) == 15
+    features, _ = generate_synthetic_pairs_parallel(200, seed=11)
+    assert np.array_equal(reloaded.model.predict_proba(reloaded.scaler.transform(features)),
+                          model.model.predict_proba(model.scaler.transform(features)))
+    print(f"✅ Forest grown to {grown['n_estimators']} trees at {grown['samples_per_second']:.0f} samples/s")
+
+
+def test_compiled_forest_matches_sklearn():
+    """Vectorized traversal of the flattened forest reproduces predict_proba"""
+    model = trained_model()
+    features, _ = generate_synthetic_pairs_parallel(3000, seed=11)
+    expected = model.model.predict_proba(model.scaler.transform(features))
+
+    compiled = CompiledForest.from_sklearn(model.model, model.scaler)
+    assert compiled.n_trees == len(model.model.estimators_)
+    assert np.allclose(compiled.predict_proba(features), expected, atol=1e-12)
+    assert np.allclose(compiled.predict_proba_positive(features[:1]), expected[:1, 1], atol=1e-12)
+    print(f"✅ Compiled forest ({compiled.n_nodes} nodes) matches sklearn")
+
+
+def main():
+    """Run all collision model tests"""
+    print("🧪 Collision Model Test Suite")
+    print("=" * 60)
+
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("-" * 60)
+    print(f"🎯 Overall: {len(tests) - failures}/{len(tests)} tests passed")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Test Script for Indexed Runway Scheduling
+Checks slot search against a brute-force reference and priority dispatch order
+"""
+
+import sys
+import os
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import datetime, timedelta
+
+import models.runway_timeline as runway_timeline
+from models.runway_timeline import RunwayTimeline
+from models.indexed_scheduler import IndexedRunwayScheduler
+from models.sequence_ga import SequenceOptimizer
+from models.wake_turbulence import HEAVY, LIGHT, MEDIUM
+
+
+def brute_force_slot(timeline, not_before, category):
+    """Earliest separated slot found by checking every candidate against every slot"""
+    slots = timeline.slots()
+    candidates = [not_before] + [time + timeline.separation[leader, category] for time, _, leader in slots]
+    for candidate in sorted(c for c in candidates if c >= not_before):
+        if all((time < candidate and candidate - time >= timeline.separation[other, category] - 1e-9) or
+               (time > candidate and time - candidate >= timeline.separation[category, other] - 1e-9)
+               for time, _, other in slots):
+            return candidate
+
+
+def test_earliest_slot_matches_brute_force():
+    """Block skipping never misses a feasible gap"""
+    original_block_size = runway_timeline.BLOCK_SIZE
+    runway_timeline.BLOCK_SIZE = 4
+    try:
+        rng = random.Random(3)
+        for _ in range(50):
+            timeline = RunwayTimeline('RW01', 40)
+            held = []
+            for flight in range(60):
+                not_before, category = rng.uniform(0, 20000), rng.choice([LIGHT, MEDIUM, HEAVY])
+                slot = timeline.earliest_slot(not_before, category)
+                assert abs(slot - brute_force_slot(timeline, not_before, category)) < 1e-6
+                if rng.random() < 0.7:
+                    timeline.insert(flight, slot, category)
+                    held.append(flight)
+                elif held:
+                    timeline.remove(held.pop(rng.randrange(len(held))))
+    finally:
+        runway_timeline.BLOCK_SIZE = original_block_size
+    print("✅ Earliest slot matches brute force")
+
+
+def test_heavy_leader_separation():
+    """A light aircraft behind a heavy waits for the 6 NM wake gap"""
+    timeline = RunwayTimeline('RW01', 60)
+    timeline.insert('heavy', 0.0, HEAVY)
+
+    slot = timeline.earliest_slot(0.0, LIGHT)
+
+    assert abs(slot - 6.0 / 140.0 * 3600.0) < 1e-6
+    print(f"✅ Light behind heavy scheduled {slot:.0f}s later")
+
+
+def test_priority_dispatch_and_status_counters():
+    """Emergencies and low fuel go first; cancellations update status"""
+    scheduler = IndexedRunwayScheduler()
+    scheduler.add_runway("RW01", 30)
+    scheduler.add_runway("RW02", 25)
+    now = datetime.now()
+
+    scheduler.queue_flight({'icao24': 'low'}, 'arrival', now, 'LOW', 80.0)
+    scheduler.queue_flight({'icao24': 'normal_fuel'}, 'arrival', now, 'NORMAL', 15.0)
+    scheduler.queue_flight({'icao24': 'normal'}, 'arrival', now, 'NORMAL', 60.0)
+    scheduler.queue_flight({'icao24': 'mayday', 'aircraft_type': 'B77W'}, 'arrival', now + timedelta(minutes=5),
+                           'EMERGENCY', 40.0)
+    scheduler.queue_flight({'icao24': 'gone'}, 'departure', now, 'HIGH', 90.0)
+    assert scheduler.cancel_flight('gone')
+
+    order = [result['flight_id'] for result in scheduler.dispatch()]
+    assert order == ['mayday', 'normal_fuel', 'normal', 'low']
+
+    status = scheduler.get_system_status()
+    assert status['total_scheduled_flights'] == 4 and status['pending_flights'] == 0
+    assert scheduler.cancel_flight('normal')
+    assert scheduler.get_system_status()['total_scheduled_flights'] == 3
+    assert all('normal' not in timeline for timeline in scheduler.runways.values())
+    print(f"✅ Dispatch order: {' → '.join(order)}")
+
+
+def random_arrivals(count, seed):
+    """Arrival requests bunched into one busy hour"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, 12, 0)
+    return [{'flight_id': f'A{k:03d}', 'preferred_time': start + timedelta(seconds=rng.uniform(0, 3600)),
+             'category': rng.choice([LIGHT, MEDIUM, MEDIUM, HEAVY]),
+             'priority': rng.choice(['NORMAL'] * 8 + ['HIGH', 'EMERGENCY']),
+             'fuel_level': rng.uniform(10, 90)} for k in range(count)]
+
+
+def test_requeued_flight_uses_new_priority():
+    """A flight cancelled and queued again is dispatched at its new priority, once"""
+    scheduler = IndexedRunwayScheduler()
+    scheduler.add_runway('09L', 40)
+    now = datetime.now()
+    scheduler.queue_flight({'icao24': 'x'}, 'arrival', now, 'EMERGENCY', 50.0)
+    scheduler.cancel_flight('x')
+    scheduler.queue_flight({'icao24': 'x'}, 'arrival', now, 'LOW', 50.0)
+    scheduler.queue_flight({'icao24': 'y'}, 'arrival', now, 'NORMAL', 50.0)
+    order = [result['flight_id'] for result in scheduler.dispatch()]
+    assert order == ['y', 'x'], order
+
+    scheduler.queue_flight({'icao24': 'z'}, 'arrival', now, 'HIGH', 50.0)
+    scheduler.schedule_flight({'icao24': 'z'}, 'arrival', now, 'HIGH', 50.0)
+    assert scheduler.dispatch() == []
+    print(f"✅ Re-queued flight dispatched at its new priority: {order}")
+
+
+def test_ga_sequence_is_separated_and_beats_fcfs():
+    """GA schedule honours wake separation and costs no more than first-come-first-served"""
+    runways = [('RW01', 40), ('RW02', 35)]
+    flights = random_arrivals(80, seed=5)
+    optimizer = SequenceOptimizer(runways, population_size=30, n_islands=1)
+
+    result = optimizer.optimize(flights, time_budget=30.0, max_generations=30)
+
+    assert len(result['schedule']) == 80 and result['generations'] == 30
+    assert result['weighted_cost'] <= result['fcfs_weighted_cost']
+    categories = {flight['flight_id']: flight['category'] for flight in flights}
+    for name, capacity in runways:
+        separation = RunwayTimeline(name, capacity).separation
+        landings = [entry for entry in result['schedule'] if entry['runway'] == name]
+        for leader, follower in zip(landings, landings[1:]):
+            gap = (follower['scheduled_time'] - leader['scheduled_time']).total_seconds()
+            assert gap >= separation[categories[leader['flight_id']], categories[follower['flight_id']]] - 1e-6
+    assert all(entry['delay_minutes'] >= -1e-9 for entry in result['schedule'])
+    print(f"✅ GA weighted delay {result['weighted_cost']:.0f} vs FCFS {result['fcfs_weighted_cost']:.0f}")
+
+
+def test_resequence_rebuilds_timelines():
+    """Applying a GA plan keeps assignments, timelines and counters consistent"""
+    scheduler = IndexedRunwayScheduler()
+    scheduler.add_runway("RW01", 30)
+    scheduler.add_runway("RW02", 30)
+    for flight in random_arrivals(40, seed=9):
+        scheduler.queue_flight({'icao24': flight['flight_id']}, 'arrival', flight['preferred_time'],
+                               flight['priority'], flight['fuel_level'])
+    scheduler.dispatch()
+
+    optimizer = SequenceOptimizer([(name, 30) for name in scheduler.runways], population_size=20, n_islands=1)
+    result = scheduler.resequence(optimizer, time_budget=30.0)
+
+    assert result['weighted_cost'] < result['previous_weighted_cost'] or not result['applied']
+    for flight_id, assignment in scheduler.assignments.items():
+        timeline = scheduler.runways[assignment['runway']]
+        assert abs(timeline.slot_of(flight_id) - assignment['scheduled_time'].timestamp()) < 1e-6
+    total = sum(assignment['delay_minutes'] for assignment in scheduler.assignments.values())
+    assert abs(scheduler.get_system_status()['total_delay_minutes'] - total) < 1e-6
+    print(f"✅ Re-sequenced plan applied: {result['applied']}")
+
+
+def test_resequence_reuses_worker_pool():
+    """Repeated resequence runs share one multi-island optimizer until the runways change"""
+    scheduler = IndexedRunwayScheduler(n_islands=2)
+    scheduler.add_runway("RW01", 30)
+    scheduler.add_runway("RW02", 30)
+    for flight in random_arrivals(30, seed=4):
+        scheduler.queue_flight({'icao24': flight['flight_id']}, 'arrival', flight['preferred_time'],
+                               flight['priority'], flight['fuel_level'])
+    scheduler.dispatch()
+
+    scheduler.resequence(time_budget=0.5)
+    optimizer = scheduler._optimizer
+    pool = optimizer._executor
+    assert optimizer.n_islands == 2 and pool is not None
+    scheduler.resequence(time_budget=0.5)
+    assert scheduler._optimizer is optimizer and optimizer._executor is pool
+
+    scheduler.add_runway("RW03", 20)
+    result = scheduler.resequence(time_budget=0.5)
+    assert scheduler._optimizer is not optimizer and optimizer._executor is None
+    assert {entry['runway'] for entry in result['schedule']} <= set(scheduler.runways)
+
+    scheduler.start_background_resequencing(interval=3600.0)
+    scheduler.stop_background_resequencing()
+    assert scheduler._optimizer is None
+    print("✅ Two-island optimizer reused across runs; pool closed on stop")
+
+
+def test_update_flight_repairs_locally():
+    """Escalating a delayed flight pulls it forward and keeps delay counters exact"""
+    scheduler = IndexedRunwayScheduler()
+    scheduler.add_runway("RW01", 30)
+    start = datetime(2024, 1, 1, 12, 0)
+    for k in range(12):
+        scheduler.schedule_flight({'icao24': f'F{k}'}, 'arrival', start, 'NORMAL', 60.0)
+    last = max(scheduler.assignments.values(), key=lambda a: a['scheduled_time'])
+    delay_before = last['delay_minutes']
+
+    result = scheduler.update_flight(last['flight_id'], priority='EMERGENCY', fuel_level=8.0)
+
+    assert result['success'] and result['delay_minutes'] < delay_before
+    slots = scheduler.runways['RW01'].slots()
+    separation = scheduler.runways['RW01'].separation
+    assert all(b[0] - a[0] >= separation[a[2], b[2]] - 1e-6 for a, b in zip(slots, slots[1:]))
+    total = sum(assignment['delay_minutes'] for assignment in scheduler.assignments.values())
+    assert abs(scheduler.calculate_delays()['total_delay_minutes'] - total) < 1e-6
+    print(f"✅ Escalated flight delay {delay_before:.0f} → {result['delay_minutes']:.0f} min")
+
+
+def main():
+    """Run all runway scheduling tests"""
+    print("🧪 Runway Scheduling Test Suite")
+    print("=" * 60)
+
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("-" * 60)
+    print(f"🎯 Overall: {len(tests) - failures}/{len(tests)} tests passed")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
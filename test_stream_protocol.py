@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Test Script for Flight Streaming Protocol
+Checks keyframe/delta round trips and a live WebSocket session on localhost
+"""
+
+import sys
+import os
+import asyncio
+import json
+import random
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import websockets
+
+from utils.delta_stream import DeltaDecoder, DeltaEncoder, DeltaStreamer, serialize
+from utils.region_router import Region, TileIndex
+from utils.wire_format import BinaryDecoder, BinaryFrameEncoder, RECORD_DTYPE, decode_frame, encode_frame, \
+    records_from_dicts, records_to_dicts, KEYFRAME
+from demo_data import generate_demo_flights
+
+
+def random_traffic(count, seed):
+    """Aircraft with positions that drift a little every tick"""
+    rng = random.Random(seed)
+    return {f'{k:06x}': {'icao24': f'{k:06x}', 'callsign': f'TST{k}', 'latitude': rng.uniform(30, 45),
+                         'longitude': rng.uniform(-120, -75), 'baro_altitude': rng.uniform(5000, 40000),
+                         'velocity': rng.uniform(250, 500), 'true_track': rng.uniform(0, 360),
+                         'vertical_rate': 0.0, 'on_ground': False} for k in range(count)}
+
+
+def advance(traffic, rng, tick):
+    """Move a third of the aircraft, retire one and add one"""
+    for flight in list(traffic.values())[::3]:
+        flight['latitude'] += rng.uniform(-0.01, 0.01)
+        flight['baro_altitude'] += rng.choice([0.0, 500.0])
+    traffic.pop(next(iter(traffic)))
+    icao24 = f'f{tick:05x}'
+    traffic[icao24] = {'icao24': icao24, 'latitude': 40.0, 'longitude': -74.0, 'baro_altitude': 3000.0}
+
+
+def test_delta_round_trip_matches_quantized_state():
+    """Decoder state equals the quantized source after every keyframe and delta"""
+    rng = random.Random(1)
+    traffic = random_traffic(300, seed=2)
+    encoder, decoder = DeltaEncoder(keyframe_interval=5), DeltaDecoder()
+    full_bytes = delta_bytes = 0
+
+    for tick in range(12):
+        message = json.loads(serialize(encoder.encode(traffic.values(), timestamp=float(tick))))
+        assert decoder.apply(message)
+        expected = {icao24: encoder.quantize(flight) for icao24, flight in traffic.items()}
+        assert decoder._state == expected
+        if message['type'] == 'delta':
+            delta_bytes += len(serialize(message))
+            full_bytes += len(json.dumps(list(traffic.values())))
+        advance(traffic, rng, tick)
+
+    ratio = full_bytes / delta_bytes
+    assert ratio > 5, ratio
+    decoded = decoder.aircraft[next(iter(decoder.aircraft))]
+    assert isinstance(decoded['latitude'], float)
+    print(f"✅ Deltas {ratio:.1f}x smaller than full JSON snapshots")
+
+
+def test_sequence_gap_requires_resync():
+    """A missed delta is detected and a keyframe brings the client back"""
+    traffic = random_traffic(20, seed=3)
+    encoder, decoder = DeltaEncoder(keyframe_interval=100), DeltaDecoder()
+    assert decoder.apply(encoder.encode(traffic.values()))
+
+    advance(traffic, random.Random(4), 1)
+    encoder.encode(traffic.values())  # lost in transit
+    advance(traffic, random.Random(5), 2)
+    assert not decoder.apply(encoder.encode(traffic.values()))
+    assert decoder.needs_resync
+
+    assert decoder.apply(encoder.keyframe()) and not decoder.needs_resync
+    assert set(decoder.aircraft) == set(traffic)
+    print("✅ Sequence gap detected and resynced")
+
+
+def test_non_finite_readings_and_blocking_fetch():
+    """NaN/inf values are dropped like None, and a blocking fetch does not stall the event loop"""
+    flight = {'icao24': 'abc123', 'latitude': float('nan'), 'longitude': -74.0,
+              'baro_altitude': float('inf'), 'velocity': 420.0}
+    encoder = DeltaEncoder()
+    assert set(encoder.quantize(flight)) == {'longitude', 'velocity'}
+    json.loads(serialize(encoder.encode([flight])), parse_constant=lambda name: 1 / 0)
+
+    def slow_fetch():
+        time.sleep(0.3)
+        return [flight]
+
+    async def session():
+        streamer = DeltaStreamer(slow_fetch, port=0)
+        beats = 0
+
+        async def heartbeat():
+            nonlocal beats
+            while True:
+                await asyncio.sleep(0.02)
+                beats += 1
+
+        task = asyncio.ensure_future(heartbeat())
+        await streamer.tick()
+        task.cancel()
+        return streamer, beats
+
+    streamer, beats = asyncio.run(session())
+    assert streamer.stats['ticks'] == 1 and beats >= 5
+    print(f"✅ Non-finite readings dropped; loop ran {beats} times during a blocking fetch")
+
+
+def test_websocket_delta_and_snapshot_clients():
+    """Live server: delta clients get keyframe then deltas, snapshot clients get full data"""
+    traffic = random_traffic(50, seed=6)
+    rng = random.Random(7)
+
+    async def session():
+        streamer = DeltaStreamer(lambda: {'flights': list(traffic.values())}, port=0, keyframe_interval=10)
+        await streamer.start()
+        try:
+            await streamer.tick()
+            url = f'ws://localhost:{streamer.port}'
+            async with websockets.connect(url + '/?protocol=delta') as delta_client, \
+                    websockets.connect(url) as snapshot_client:
+                decoder = DeltaDecoder()
+                assert decoder.apply(json.loads(await delta_client.recv()))
+                assert json.loads(await snapshot_client.recv())['type'] == 'snapshot'
+
+                for tick in range(3):
+                    advance(traffic, rng, tick)
+                    await streamer.tick()
+                    message = json.loads(await delta_client.recv())
+                    assert message['type'] == 'delta' and decoder.apply(message)
+                    snapshot = json.loads(await snapshot_client.recv())
+                    assert len(snapshot['flights']) == len(traffic)
+
+                await delta_client.send(json.dumps({'type': 'resync'}))
+                keyframe = json.loads(await delta_client.recv())
+                assert keyframe['type'] == 'keyframe' and keyframe['seq'] == decoder.seq
+                assert set(decoder.aircraft) == set(traffic)
+        finally:
+            await streamer.stop()
+        return streamer.metrics()
+
+    metrics = asyncio.run(session())
+    assert metrics['ticks'] == 4 and metrics['resyncs'] == 1 and metrics['clients'] == 2
+    print(f"✅ Live session sent {metrics['sent']} messages, {metrics['bytes_sent']} bytes")
+
+
+class FakeSocket:
+    """Stands in for a client connection; delay=None never completes a send"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.received = []
+
+    async def send(self, payload):
+        if self.delay is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delay)
+        self.received.append(payload)
+
+    def messages(self):
+        return [json.loads(payload) for payload in self.received]
+
+
+def test_slow_clients_drop_to_latest_and_keep_alerts():
+    """A slow client loses intermediate deltas but stays consistent; stuck clients are cut off"""
+    traffic = random_traffic(100, seed=8)
+    rng = random.Random(9)
+
+    async def session():
+        streamer = DeltaStreamer(lambda: list(traffic.values()), port=0, keyframe_interval=1000, send_timeout=0.2)
+        fast, slow, stuck = FakeSocket(), FakeSocket(0.03), FakeSocket(None)
+        channels = [streamer.attach(websocket, 'delta') for websocket in (fast, slow, stuck)]
+        for tick in range(40):
+            advance(traffic, rng, tick)
+            await streamer.tick()
+            if tick % 10 == 0:
+                streamer.broadcast_alert({'severity': 'CRITICAL', 'flight1': 'a', 'flight2': 'b'})
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.5)
+        return streamer, fast, slow, channels
+
+    streamer, fast, slow, (fast_channel, slow_channel, stuck_channel) = asyncio.run(session())
+
+    expected = {icao24: streamer.feed.encoder.quantize(flight) for icao24, flight in traffic.items()}
+    for websocket in (fast, slow):
+        decoder = DeltaDecoder()
+        updates = [message for message in websocket.messages() if message['type'] != 'alert']
+        assert all(decoder.apply(message) for message in updates)
+        assert decoder._state == expected
+        assert sum(message['type'] == 'alert' for message in websocket.messages()) == 4
+
+    assert fast_channel.metrics['dropped'] == 0 and slow_channel.metrics['dropped'] > 0
+    assert stuck_channel.closed and 'blocked' in stuck_channel.close_reason
+    metrics = {client['remote']: client for client in streamer.client_metrics()}
+    assert len(metrics) <= 3 and streamer.metrics()['dropped'] >= slow_channel.metrics['dropped']
+    print(f"✅ Slow client dropped {slow_channel.metrics['dropped']} updates, "
+          f"stuck client cut off ({stuck_channel.close_reason})")
+
+
+def test_broadcast_throughput_with_many_clients():
+    """100+ updates per second to 10+ concurrent clients"""
+    traffic = random_traffic(200, seed=10)
+    rng = random.Random(11)
+
+    async def session():
+        streamer = DeltaStreamer(lambda: list(traffic.values()), port=0)
+        sockets = [FakeSocket() for _ in range(12)]
+        for index, websocket in enumerate(sockets):
+            streamer.attach(websocket, 'delta' if index % 2 else 'snapshot')
+        started = time.perf_counter()
+        for tick in range(200):
+            advance(traffic, rng, tick)
+            await streamer.tick()
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.05)
+        return sockets, elapsed, streamer.metrics()
+
+    sockets, elapsed, metrics = asyncio.run(session())
+    rate = 200 / elapsed
+    assert rate > 100, rate
+    assert metrics['connected_clients'] == 12 and metrics['dropped'] == 0
+    assert all(len(websocket.received) == 200 for websocket in sockets)
+    print(f"✅ {rate:.0f} updates/s delivered to each of 12 clients without drops")
+
+
+def test_binary_records_round_trip():
+    """Packed records decode back to the demo flights within quantization"""
+    flights = generate_demo_flights(50)['flights'] + [{'icao24': 'not-hex', 'latitude': 1.0}]
+    frame = decode_frame(encode_frame(KEYFRAME, 7, 7, 123.5, records_from_dicts(flights)))
+
+    assert frame.seq == 7 and frame.timestamp == 123.5 and len(frame.records) == 50
+    assert RECORD_DTYPE.itemsize == 29
+    decoded = {flight['icao24']: flight for flight in records_to_dicts(frame.records)}
+    for flight in flights[:50]:
+        other = decoded[flight['icao24']]
+        assert other['callsign'] == flight['callsign'][:8]
+        assert abs(other['latitude'] - flight['latitude']) <= 5e-6
+        assert abs(other['baro_altitude'] - flight['baro_altitude']) <= 12.5
+        assert abs(other['true_track'] - flight['true_track']) <= 0.005
+    print(f"✅ Binary records round trip at {RECORD_DTYPE.itemsize} bytes per aircraft")
+
+
+def test_binary_deltas_track_state():
+    """Binary keyframe/delta stream reproduces the encoder's state and detects gaps"""
+    rng = random.Random(12)
+    traffic = random_traffic(200, seed=13)
+    encoder, decoder = BinaryFrameEncoder(keyframe_interval=6), BinaryDecoder()
+    sizes = []
+
+    for tick in range(14):
+        frame = encoder.encode(records_from_dicts(list(traffic.values())))
+        assert decoder.apply(frame)
+        assert (decoder.records == encoder._records).all()
+        sizes.append(len(frame))
+        advance(traffic, rng, tick)
+
+    encoder.encode(records_from_dicts(list(traffic.values())))  # lost
+    assert not decoder.apply(encoder.encode(records_from_dicts(list(traffic.values()))))
+    assert decoder.apply(encoder.keyframe()) and set(decoder.aircraft) == set(traffic)
+    print(f"✅ Binary keyframe {sizes[0]} bytes, deltas ~{sum(sizes[1:6]) // 5} bytes")
+
+
+def test_websocket_binary_client():
+    """Binary clients get frames while JSON stays the default"""
+    traffic = random_traffic(30, seed=14)
+
+    async def session():
+        streamer = DeltaStreamer(lambda: list(traffic.values()), port=0)
+        await streamer.start()
+        try:
+            await streamer.tick()
+            async with websockets.connect(f'ws://localhost:{streamer.port}/?protocol=binary') as client:
+                decoder = BinaryDecoder()
+                assert decoder.apply(await client.recv())
+                advance(traffic, random.Random(15), 0)
+                await streamer.tick()
+                assert decoder.apply(await client.recv())
+                return decoder
+        finally:
+            await streamer.stop()
+
+    decoder = asyncio.run(session())
+    assert set(decoder.aircraft) == set(traffic)
+    print("✅ Binary WebSocket client in sync")
+
+
+def test_tile_index_matches_brute_force():
+    """Tile lookups return exactly the aircraft a full scan would, across the antimeridian too"""
+    rng = random.Random(16)
+    flights = [{'icao24': f'{index:06x}', 'latitude': rng.uniform(-89, 89), 'longitude': rng.uniform(-180, 180),
+                'baro_altitude': rng.choice([None, rng.uniform(0, 40000)])} for index in range(5000)]
+    index = TileIndex(flights, tile_degrees=2.0)
+    regions = [Region(40.0, -75.0, 42.0, -72.0), Region(-10.0, 170.0, 10.0, -170.0),
+               Region(-90.0, -180.0, 90.0, 180.0, 10000.0, 20000.0), Region(0.0, 0.5, 0.0, 0.5)]
+    for region in regions:
+        expected = [flight for flight in flights if region.min_lat <= flight['latitude'] <= region.max_lat
+                    and (region.min_lon <= flight['longitude'] <= region.max_lon if not region.crosses_antimeridian
+                         else flight['longitude'] >= region.min_lon or flight['longitude'] <= region.max_lon)
+                    and (region.min_altitude == -float('inf') or flight['baro_altitude'] is not None
+                         and region.min_altitude <= flight['baro_altitude'] <= region.max_altitude)]
+        assert index.select(region) == expected, region
+
+    invalid = ({'bbox': [1, 2, 3]}, {'bbox': [50, 0, 40, 10]}, {'bbox': [0, 0, 1, 1], 'altitude': [5, 1]},
+               {'bbox': [0, 0, 1, 1], 'altitude': [5]}, {'bbox': [0, 0, 1, 1], 'altitude': 5},
+               {'bbox': [0, 0, 1, 1], 'altitude': [{}, 10]}, {'bbox': [0, 0, 1, 1], 'altitude': ['nan', 10]})
+    for message in invalid:
+        try:
+            Region.from_message(message)
+        except ValueError:
+            continue
+        raise AssertionError(f"{message} accepted")
+    print("✅ Tile index selection matches a brute-force scan")
+
+
+def test_region_subscription_filters_stream():
+    """A subscribed client only hears about aircraft in its box; unsubscribing restores the full feed"""
+    traffic = random_traffic(400, seed=17)
+    box = [35.0, -90.0, 40.0, -80.0]
+    inside = {icao24 for icao24, flight in traffic.items()
+              if box[0] <= flight['latitude'] <= box[2] and box[1] <= flight['longitude'] <= box[3]}
+    assert 0 < len(inside) < len(traffic)
+
+    async def session():
+        streamer = DeltaStreamer(lambda: list(traffic.values()), port=0)
+        await streamer.start()
+        try:
+            await streamer.tick()
+            async with websockets.connect(f'ws://localhost:{streamer.port}/?protocol=delta') as client:
+                decoder = DeltaDecoder()
+                assert decoder.apply(json.loads(await client.recv()))
+                assert len(decoder.aircraft) == len(traffic)
+
+                await client.send(json.dumps({'type': 'subscribe', 'bbox': box}))
+                decoder = DeltaDecoder()
+                assert decoder.apply(json.loads(await client.recv()))
+                regional = set(decoder.aircraft)
+                advance(traffic, random.Random(18), 0)
+                await streamer.tick()
+                assert decoder.apply(json.loads(await client.recv()))
+                feeds = len(streamer.regions)
+
+                await client.send(json.dumps({'type': 'subscribe', 'bbox': [0, 0]}))
+                error = json.loads(await client.recv())
+
+                await client.send(json.dumps({'type': 'unsubscribe'}))
+                decoder = DeltaDecoder()
+                assert decoder.apply(json.loads(await client.recv()))
+                return regional, feeds, error, set(decoder.aircraft), len(streamer.regions)
+        finally:
+            await streamer.stop()
+
+    regional, feeds, error, unsubscribed, remaining = asyncio.run(session())
+    assert regional == inside and feeds == 1 and remaining == 0
+    assert error['type'] == 'error' and unsubscribed == set(traffic)
+    print(f"✅ Region subscription narrowed {len(traffic)} aircraft to {len(regional)}")
+
+
+def test_idle_feeds_are_not_encoded():
+    """Protocols and regions without clients cost nothing per tick"""
+    traffic = random_traffic(200, seed=19)
+
+    async def session():
+        streamer = DeltaStreamer(lambda: list(traffic.values()), port=0)
+        for _ in range(3):
+            await streamer.tick()
+        idle = (streamer.feed.encoder.seq, streamer.feed.binary.seq)
+
+        shared = [FakeSocket() for _ in range(3)]
+        for websocket in shared:
+            streamer.attach(websocket, 'delta')
+            streamer.subscribe(websocket, 'delta', Region(40.0, -75.0, 42.0, -72.0))
+        await streamer.tick()
+        await asyncio.sleep(0.05)
+        return streamer, idle, shared
+
+    streamer, idle, shared = asyncio.run(session())
+    # Joining the global feed builds one keyframe; the next tick skips it entirely
+    assert idle == (0, 0) and len(streamer.regions) == 1
+    assert streamer.feed.encoder.seq == 3 and streamer.metrics()['subscriptions'] == 3
+    assert all(websocket.received[-1] == shared[0].received[-1] for websocket in shared)
+    print("✅ Only feeds with clients are encoded, identical regions share one")
+
+
+def main():
+    """Run all streaming protocol tests"""
+    print("🧪 Streaming Protocol Test Suite")
+    print("=" * 60)
+
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("-" * 60)
+    print(f"🎯 Overall: {len(tests) - failures}/{len(tests)} tests passed")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
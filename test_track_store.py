@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test Script for the Track History Store
+Checks that recorded snapshots come back unchanged from track and bbox/time
+queries, and that queries only open the segments they need
+"""
+
+import sys
+import os
+import tempfile
+import time
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from traffic_simulator import TrafficSimulator
+from utils.track_store import TrackStore
+
+START = 1700000000.0
+
+
+def record(store, count=300, ticks=120, seconds=60.0, seed=9):
+    """Feed simulator snapshots into store; returns every recorded row as columns"""
+    simulator = TrafficSimulator(count, seed=seed, start_time=START)
+    rows = {'time': [], 'icao24': [], 'latitude': [], 'longitude': []}
+    for _ in range(ticks):
+        batch = simulator.batch()
+        store.append(batch, timestamp=simulator.time)
+        rows['time'].append(np.full(len(batch), simulator.time))
+        rows['icao24'].append(batch.icao24)
+        rows['latitude'].append(batch.latitude.astype(np.float32))
+        rows['longitude'].append(batch.longitude.astype(np.float32))
+        simulator.step(seconds)
+    return {name: np.concatenate(values) for name, values in rows.items()}, simulator
+
+
+def test_track_roundtrip():
+    """An aircraft's track comes back in time order after reopening the store"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = TrackStore(directory, flush_rows=5000)
+        recorded, simulator = record(store)
+        store.close()
+        assert store.stats()['partitions'] == len({int((START + 60.0 * tick) // 3600) for tick in range(120)})
+
+        reopened = TrackStore(directory)
+        icao24 = simulator.icao24[17]
+        track = reopened.track(icao24)
+        expected = recorded['icao24'] == icao24
+        assert len(track['time']) == expected.sum() == 120
+        assert np.all(np.diff(track['time']) > 0)
+        assert np.array_equal(track['latitude'], recorded['latitude'][expected])
+
+        window = reopened.track(icao24, start=START + 600, end=START + 1200)
+        assert window['time'].min() == START + 600 and window['time'].max() == START + 1200
+        print(f"✅ Track of {icao24}: {len(track['time'])} positions across {reopened.stats()['segments']} segments")
+
+
+def test_bbox_matches_scan():
+    """bbox/time queries return exactly the rows a full scan would"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = TrackStore(directory, flush_rows=4000)
+        recorded, _ = record(store, ticks=60)
+        store.flush()
+
+        bbox, start, end = [35.0, -95.0, 42.5, -80.0], START + 900, START + 2400
+        result = store.in_bbox(bbox, start, end)
+        mask = (recorded['latitude'] >= bbox[0]) & (recorded['latitude'] <= bbox[2]) & \
+            (recorded['longitude'] >= bbox[1]) & (recorded['longitude'] <= bbox[3]) & \
+            (recorded['time'] >= start) & (recorded['time'] <= end)
+        assert len(result['time']) == mask.sum() > 0
+        assert sorted(zip(result['time'].tolist(), result['icao24'].tolist())) == \
+            sorted(zip(recorded['time'][mask].tolist(), recorded['icao24'][mask].tolist()))
+        print(f"✅ bbox query returned {mask.sum()} rows, same as a full scan")
+
+
+def test_queries_skip_segments():
+    """A query for one time window opens only the segments overlapping it"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = TrackStore(directory, flush_rows=3000)
+        _, simulator = record(store)
+        store.close()
+        total = store.stats()['segments']
+
+        store.in_bbox([-90.0, -180.0, 90.0, 180.0], START, START + 300)
+        opened = store.stats()['open_segments']
+        assert 0 < opened < total
+        store.track(simulator.icao24[0], start=START + 7000)
+        assert store.stats()['open_segments'] < total
+        print(f"✅ Five-minute query opened {opened} of {total} segments")
+
+
+def test_buffered_rows_visible():
+    """Snapshots not yet flushed are still returned, including aggregated-feed dicts"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = TrackStore(directory)
+        when = datetime.fromtimestamp(START)
+        flights = [{'icao24': 'ABC123', 'callsign': 'TEST1  ', 'latitude': 40.0, 'longitude': -75.0,
+                    'baro_altitude': 30000, 'velocity': 450, 'true_track': 90, 'vertical_rate': 0},
+                   {'icao24': 'def456', 'callsign': None, 'latitude': None, 'longitude': None}]
+        assert store.append({'flights': flights, 'timestamp': when.isoformat()}) == 1
+        assert store.stats()['segments'] == 0
+
+        track = store.track('abc123')
+        assert track['time'].tolist() == [START] and track['callsign'].tolist() == ['TEST1']
+        assert len(store.in_bbox([39.0, -76.0, 41.0, -74.0])['time']) == 1
+        assert len(store.track('def456')['time']) == 0
+        print("✅ Buffered snapshot visible to track and bbox queries")
+
+
+def test_failed_writes_keep_rows():
+    """A failed segment write keeps its rows buffered, and orphaned segments do not block new ones"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = TrackStore(directory, flush_rows=250)
+        partition = store.partition_of(START)
+        # A crash between writing a segment and recording it in the manifest leaves this behind
+        os.makedirs(os.path.join(directory, str(partition), 'segment-00000'))
+
+        failing = {'left': 1}
+        original = np.save
+
+        def flaky_save(*args, **kwargs):
+            if failing['left']:
+                failing['left'] -= 1
+                raise OSError(28, 'No space left on device')
+            return original(*args, **kwargs)
+
+        np.save = flaky_save
+        try:
+            recorded, simulator = record(store, count=100, ticks=5)
+        finally:
+            np.save = original
+        store.close()
+
+        stats = store.stats()
+        assert stats['buffered_rows'] == 0 and stats['rows'] == len(recorded['time']) == 500
+        assert [segment['path'] for segment in store.segments][0] == f'{partition}/segment-00001'
+        reopened = TrackStore(directory)
+        assert len(reopened.track(simulator.icao24[3])['time']) == 5
+        print(f"✅ Failed write lost no rows; {stats['segments']} segments written past the orphan")
+
+
+def test_append_throughput():
+    """Recording 10,000 aircraft a tick keeps up with a one-second feed"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = TrackStore(directory)
+        simulator = TrafficSimulator(10000, seed=1, start_time=START)
+        started = time.perf_counter()
+        for _ in range(20):
+            store.append(simulator.batch(), timestamp=simulator.time)
+            simulator.step(1.0)
+        store.close()
+        per_tick = (time.perf_counter() - started) / 20
+        assert per_tick < 0.5
+        assert store.stats()['rows'] == 200000
+
+        started = time.perf_counter()
+        track = store.track(simulator.icao24[5000])
+        lookup_ms = (time.perf_counter() - started) * 1000.0
+        assert len(track['time']) == 20
+        print(f"✅ 10,000 aircraft recorded in {per_tick * 1000:.1f} ms per tick; track lookup {lookup_ms:.2f} ms")
+
+
+def main():
+    """Run all track store tests"""
+    print("🧪 Track Store Test Suite")
+    print("=" * 60)
+
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("-" * 60)
+    print(f"🎯 Overall: {len(tests) - failures}/{len(tests)} tests passed")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test Script for Traffic Scenarios
+Checks that scripted scenarios replay deterministically by seed and that
+their conflict and scheduling metrics reflect what was injected
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from traffic_scenarios import SCENARIO_FILE, ScenarioRunner, load_scenarios, run_scenario
+
+BURST = {
+    'name': 'burst', 'seed': 3, 'background': 100, 'duration_s': 300, 'tick_s': 10,
+    'runways': {'ORD-10L': 30},
+    'events': [
+        {'type': 'arrival_burst', 'at': 0, 'airport': 'ORD', 'count': 12, 'window_s': 120, 'min_eta_s': 120},
+        {'type': 'fuel_emergency', 'at': 20, 'callsign': 'BRST012', 'fuel_level': 5},
+    ],
+}
+
+
+def test_replay_is_deterministic():
+    """The same scenario and seed give the same fingerprint; another seed changes it"""
+    first, second = run_scenario(BURST), run_scenario(BURST)
+    assert first['fingerprint'] == second['fingerprint']
+    assert first['scheduler'] == second['scheduler']
+    assert run_scenario(BURST, seed=4)['fingerprint'] != first['fingerprint']
+    print(f"✅ Replay fingerprint stable: {first['fingerprint'][:16]}")
+
+
+def test_head_on_pairs_detected():
+    """Every head-on pair is flagged, with warning before the closest approach"""
+    report = run_scenario({
+        'name': 'head_on', 'seed': 1, 'background': 50, 'duration_s': 120, 'tick_s': 10,
+        'events': [{'type': 'head_on', 'at': 30, 'center': [40.0, -100.0], 'flight_level': 350,
+                    'distance_nm': 100, 'speed': 450, 'pairs': 3}],
+    })
+    conflicts = report['conflicts']
+    assert conflicts['expected'] == 3 and conflicts['expected_found'] == 3
+    assert conflicts['detection_delay_s']['max'] == 0.0
+    assert 0.0 < conflicts['min_warning_minutes'] <= 10.0
+    assert conflicts['recall'] == 1.0
+    print(f"✅ {conflicts['expected_found']}/3 head-on pairs detected, "
+          f"≥{conflicts['min_warning_minutes']} min warning")
+
+
+def test_converging_streams_meet():
+    """Stream leaders converging on ORD are detected only once within the lookahead"""
+    runner = ScenarioRunner({
+        'name': 'streams', 'seed': 2, 'background': 0, 'duration_s': 1200, 'tick_s': 10,
+        'runways': {'ORD-10L': 40},
+        'events': [{'type': 'converging', 'at': 0, 'airport': 'ORD', 'bearings': [270, 180], 'per_stream': 2,
+                    'start_nm': 80, 'speed': 300, 'spacing_nm': 20}],
+    })
+    report = runner.run()
+    conflicts = report['conflicts']
+    assert conflicts['expected_found'] == 1
+    # 80 NM at 300 kt is 16 minutes out, so detection waits for the 10 minute lookahead
+    assert 180.0 <= conflicts['detection_delay_s']['max'] <= 360.0
+    assert report['scheduler']['flights'] == 4
+    assert report['scheduler']['landed'] >= 2
+    print(f"✅ Stream leaders flagged after {conflicts['detection_delay_s']['max']:.0f} s, "
+          f"{report['scheduler']['landed']} landed")
+
+
+def test_fuel_emergency_escalates():
+    """A fuel emergency moves the flight to the front of the runway queue"""
+    report = run_scenario(BURST)
+    emergency = report['scheduler']['emergencies'][0]
+    assert emergency['callsign'] == 'BRST012'
+    assert emergency['delay_after'] < emergency['delay_before']
+    assert report['scheduler']['max_delay_minutes'] > 0.0
+    print(f"✅ BRST012 delay {emergency['delay_before']} → {emergency['delay_after']} min")
+
+
+def test_invalid_scenarios_rejected():
+    """Unknown event types, airports and callsigns are errors, not silent no-ops"""
+    for scenario in ({'events': [{'type': 'volcano'}]},
+                     {'events': [{'type': 'holding', 'airport': 'XXX'}]},
+                     {'events': [{'type': 'fuel_emergency', 'callsign': 'NOPE1'}]}):
+        try:
+            run_scenario(dict(scenario, duration_s=0))
+        except ValueError:
+            continue
+        raise AssertionError(f"{scenario} was accepted")
+
+    runner = ScenarioRunner(BURST)
+    runner.scheduler.update_flight = lambda *args, **kwargs: {'success': False, 'error': 'runway closed'}
+    try:
+        runner.run()
+    except ValueError as e:
+        assert 'runway closed' in str(e)
+    else:
+        raise AssertionError("failed escalation was accepted")
+    print("✅ Invalid scenarios and failed escalations raise ValueError")
+
+
+def test_shipped_scenarios_load():
+    """traffic_scenarios.json parses and every scenario builds a runner"""
+    scenarios = load_scenarios(SCENARIO_FILE)
+    names = [scenario['name'] for scenario in scenarios]
+    assert len(names) == len(set(names)) >= 4
+    for scenario in scenarios:
+        ScenarioRunner(scenario)
+    print(f"✅ {len(scenarios)} shipped scenarios: {', '.join(names)}")
+
+
+def main():
+    """Run all traffic scenario tests"""
+    print("🧪 Traffic Scenario Test Suite")
+    print("=" * 60)
+
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("-" * 60)
+    print(f"🎯 Overall: {len(tests) - failures}/{len(tests)} tests passed")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test Script for the Traffic Simulator
+Checks that simulated traffic is deterministic per seed, persists between
+ticks and follows its climb/cruise/descent profile
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from traffic_simulator import CLIMB, CRUISE, DESCENT, ICAO24_BLOCK_SIZE, ICAO24_BLOCK_START, TERMINAL_SPEED_KT, \
+    TrafficSimulator, flight_data_source
+from utils.flight_batch import FlightBatch
+from utils.geodesy import EARTH_RADIUS_NM, haversine_one_to_many
+
+
+def test_same_seed_same_traffic():
+    """Two simulators with one seed stay identical tick for tick; another seed differs"""
+    first, second = TrafficSimulator(200, seed=7, start_time=0.0), TrafficSimulator(200, seed=7, start_time=0.0)
+    other = TrafficSimulator(200, seed=8, start_time=0.0)
+    for _ in range(20):
+        for simulator in (first, second, other):
+            simulator.step(30.0)
+    assert first.flights() == second.flights()
+    assert not np.allclose(first.latitude, other.latitude)
+    print("✅ Same seed reproduces the same traffic over 20 ticks")
+
+
+def test_icao24_fits_24_bits():
+    """Addresses stay unique six-digit hex inside the simulator block for any seed"""
+    for seed in (0, 125, 126, 200, 2**32):
+        simulator = TrafficSimulator(5000, seed=seed, start_time=0.0)
+        addresses = np.array([int(icao24, 16) for icao24 in simulator.icao24])
+        assert all(len(icao24) == 6 for icao24 in simulator.icao24)
+        assert len(set(addresses.tolist())) == 5000
+        assert addresses.min() >= ICAO24_BLOCK_START and addresses.max() < ICAO24_BLOCK_START + ICAO24_BLOCK_SIZE
+    assert np.array_equal(TrafficSimulator(100, seed=200).icao24, TrafficSimulator(100, seed=200).icao24)
+    print("✅ icao24 addresses unique and within 24 bits up to seed 2**32")
+
+
+def test_aircraft_persist_and_move():
+    """icao24 and callsign are stable; positions move by about speed × time"""
+    simulator = TrafficSimulator(500, seed=1, start_time=0.0)
+    before = simulator.flights()
+    expected = simulator.velocity / 60.0
+    simulator.step(60.0)
+    after = simulator.flights()
+    assert [f['icao24'] for f in before] == [f['icao24'] for f in after]
+    assert [f['callsign'] for f in before] == [f['callsign'] for f in after]
+    assert len({f['icao24'] for f in after}) == 500
+
+    moved = np.array([haversine_one_to_many(b['latitude'], b['longitude'],
+                                            np.array([a['latitude']]), np.array([a['longitude']]))[0]
+                      for b, a in zip(before, after)])
+    turned = simulator.flown_nm < expected  # arrived and started a new route this tick
+    assert np.all(np.abs(moved[~turned] - expected[~turned]) < 0.5)
+    print(f"✅ 500 aircraft persist; median move {np.median(moved):.2f} NM per minute")
+
+
+def test_flight_phases():
+    """Altitude climbs after departure, holds at cruise and descends before arrival"""
+    simulator = TrafficSimulator(2000, seed=3, start_time=0.0)
+    phase = simulator.phase
+    assert set(np.unique(phase)) == {CLIMB, CRUISE, DESCENT}
+
+    previous = simulator.altitude.copy()
+    simulator.step(10.0)
+    still = simulator.flown_nm > simulator.velocity * 10.0 / 3600.0
+    climbing = still & (phase == CLIMB) & (simulator.phase == CLIMB)
+    descending = still & (phase == DESCENT) & (simulator.phase == DESCENT)
+    cruising = still & (phase == CRUISE) & (simulator.phase == CRUISE)
+    assert np.all(simulator.altitude[climbing] > previous[climbing])
+    assert np.all(simulator.vertical_rate[climbing] > 0)
+    assert np.all(simulator.altitude[descending] < previous[descending])
+    assert np.all(simulator.vertical_rate[descending] < 0)
+    assert np.allclose(simulator.altitude[cruising], simulator.cruise_altitude[cruising])
+    assert np.all(simulator.velocity[simulator.altitude < 10000] <= TERMINAL_SPEED_KT)
+    print(f"✅ Phases: {int(climbing.sum())} climbing, {int(cruising.sum())} cruising, "
+          f"{int(descending.sum())} descending")
+
+
+def test_arrivals_turn_around():
+    """Arriving aircraft take off again from their destination towards a new one"""
+    simulator = TrafficSimulator(100, seed=5, start_time=0.0)
+    simulator.flown_nm = simulator.route_nm - 1.0
+    destinations = simulator.destination.copy()
+    simulator.step(60.0)
+    assert np.array_equal(simulator.origin, destinations)
+    assert np.all(simulator.destination != simulator.origin)
+    assert np.all(simulator.flown_nm == 0.0)
+    assert np.all(simulator.route_nm <= np.pi * EARTH_RADIUS_NM)
+    print("✅ 100 arrivals turned around towards new destinations")
+
+
+def test_batch_matches_flights():
+    """batch() gives the same traffic as the flight dicts"""
+    simulator = TrafficSimulator(300, seed=2, start_time=0.0)
+    simulator.step(5.0)
+    batch = simulator.batch()
+    reference = FlightBatch.from_dicts(simulator.flights())
+    assert len(batch) == 300
+    assert np.array_equal(batch.icao24, reference.icao24)
+    assert np.allclose(batch.latitude, reference.latitude)
+    assert np.allclose(batch.baro_altitude, reference.baro_altitude, atol=0.5)
+    print("✅ FlightBatch columns match the flight dicts")
+
+
+def test_aggregated_interface():
+    """The simulator answers get_aggregated_flight_data and is picked by FLIGHT_DATA_SOURCE"""
+    source = flight_data_source({'FLIGHT_DATA_SOURCE': 'simulator', 'SIMULATOR_AIRCRAFT': '400'})
+    assert isinstance(source, TrafficSimulator) and source.count == 400
+    data = source.get_aggregated_flight_data()
+    assert data['count'] == 400 and data['sources'] == ['Simulator']
+    assert data['source_status']['Simulator']['status'] == 'ok'
+
+    bbox = [35.0, -90.0, 42.0, -75.0]
+    boxed = source.get_aggregated_flight_data(bbox)
+    assert all(bbox[0] <= f['latitude'] <= bbox[2] and bbox[1] <= f['longitude'] <= bbox[3]
+               for f in boxed['flights'])
+    assert 0 < boxed['count'] < 400
+    print(f"✅ Simulator selected as data source; {boxed['count']} of 400 aircraft in the bbox")
+
+
+def test_tick_at_scale():
+    """A 50,000 aircraft tick stays well under a second"""
+    simulator = TrafficSimulator(50000, seed=4, start_time=0.0)
+    started = time.perf_counter()
+    for _ in range(5):
+        simulator.step(5.0)
+    tick = (time.perf_counter() - started) / 5
+    assert tick < 1.0
+    assert len(simulator.batch()) == 50000
+    print(f"✅ 50,000 aircraft advance in {tick * 1000:.1f} ms per tick")
+
+
+def main():
+    """Run all traffic simulator tests"""
+    print("🧪 Traffic Simulator Test Suite")
+    print("=" * 60)
+
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("-" * 60)
+    print(f"🎯 Overall: {len(tests) - failures}/{len(tests)} tests passed")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
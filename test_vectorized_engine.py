@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Test Script for the Vectorized Processing Engines
+Checks the batched conflict engine against a per-pair reference
+"""
+
+import sys
+import os
+import math
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from demo_data import generate_demo_flights
+from utils.conflict_engine import VectorizedConflictDetector, build_state_matrix, detect_conflicts
+from utils.spatial_index import SpatialGrid
+from utils.flight_batch import FLIGHT_FIELDS, FlightBatch
+from utils.trajectory_batch import BatchTrajectoryCalculator
+from utils.geodesy import (AIRPORT_CODES, EARTH_RADIUS_NM, airport_distance_cache_info, airport_distances,
+                           cached_airport_distances, haversine_one_to_many, haversine_paired,
+                           haversine_pairwise, prepare_points)
+
+
+def reference_cpa(f1, f2, lookahead_minutes=10.0):
+    """Scalar closest-point-of-approach used as the reference implementation"""
+    mean_lat = math.radians((f1['latitude'] + f2['latitude']) / 2)
+    rx = (f2['longitude'] - f1['longitude']) * 60 * math.cos(mean_lat)
+    ry = (f2['latitude'] - f1['latitude']) * 60
+    vx = (f2['velocity'] * math.sin(math.radians(f2['true_track']))
+          - f1['velocity'] * math.sin(math.radians(f1['true_track']))) / 60
+    vy = (f2['velocity'] * math.cos(math.radians(f2['true_track']))
+          - f1['velocity'] * math.cos(math.radians(f1['true_track']))) / 60
+    closing = vx * vx + vy * vy
+    t = -(rx * vx + ry * vy) / closing if closing > 1e-12 else 0.0
+    t = min(max(t, 0.0), lookahead_minutes)
+    return t, math.hypot(rx + vx * t, ry + vy * t)
+
+
+def test_check_conflict_close_pair():
+    """Two aircraft near JFK head towards each other"""
+    flight1 = {'icao24': 'test001', 'latitude': 40.6413, 'longitude': -73.7781, 'baro_altitude': 3000,
+               'velocity': 250, 'true_track': 90, 'vertical_rate': 0}
+    flight2 = {'icao24': 'test002', 'latitude': 40.6513, 'longitude': -73.7681, 'baro_altitude': 3100,
+               'velocity': 260, 'true_track': 270, 'vertical_rate': 5}
+
+    conflict = VectorizedConflictDetector().check_conflict(flight1, flight2)
+
+    assert conflict is not None
+    assert conflict['severity'] == 'CRITICAL'
+    t, separation = reference_cpa(flight1, flight2)
+    assert abs(conflict['time_to_conflict'] - t) < 1e-9
+    assert abs(conflict['min_separation'] - separation) < 1e-9
+    print(f"✅ Close pair: {conflict['severity']} in {conflict['time_to_conflict']:.2f} min")
+
+
+def test_all_pairs_matches_reference():
+    """Batched detection finds the same pairs as a per-pair loop"""
+    flights = generate_demo_flights(150)['flights']
+    state = build_state_matrix(flights)
+
+    result = detect_conflicts(state, chunk_pairs=500)
+    batched = {(int(i), int(j)): sep for i, j, sep in zip(result['i'], result['j'], result['min_separation'])}
+
+    expected = {}
+    for i in range(len(flights)):
+        for j in range(i + 1, len(flights)):
+            t, separation = reference_cpa(flights[i], flights[j])
+            alt1 = flights[i]['baro_altitude'] + flights[i]['vertical_rate'] * t
+            alt2 = flights[j]['baro_altitude'] + flights[j]['vertical_rate'] * t
+            if separation < 12.0 and abs(alt2 - alt1) < 2000.0:
+                expected[(i, j)] = separation
+
+    assert batched.keys() == expected.keys()
+    for pair, separation in expected.items():
+        assert abs(batched[pair] - separation) < 1e-6
+    print(f"✅ All-pairs detection matches reference ({len(expected)} conflicts)")
+
+
+def test_ignores_incomplete_and_grounded_flights():
+    """Flights without a position or on the ground never produce conflicts"""
+    flights = [
+        {'latitude': 40.0, 'longitude': -73.0, 'baro_altitude': 10000, 'velocity': 300, 'true_track': 0},
+        {'latitude': None, 'longitude': -73.0, 'baro_altitude': 10000, 'velocity': 300, 'true_track': 180},
+        {'latitude': 40.01, 'longitude': -73.0, 'baro_altitude': 10000, 'velocity': 0, 'on_ground': True},
+    ]
+
+    assert VectorizedConflictDetector().detect_all_conflicts(flights) == []
+    print("✅ Incomplete and grounded flights skipped")
+
+
+def test_spatial_grid_incremental_updates():
+    """Insert, move and remove keep the grid consistent"""
+    grid = SpatialGrid()
+    grid.insert('a', 40.64, -73.78, 35000)
+    grid.insert('b', 40.70, -73.90, 35500)
+    grid.insert('c', -33.94, 151.18, 35000)
+
+    assert grid.neighbours('a') == {'b'}
+    assert not grid.move('a', 40.641, -73.781, 35000)
+    assert grid.move('a', -33.90, 151.10, 35000)
+    assert grid.neighbours('a') == {'c'}
+
+    stats = grid.sync({'a': (-33.90, 151.10, 35000), 'd': (51.47, -0.45, 12000)})
+    assert stats == {'inserted': 1, 'moved': 0, 'removed': 2}
+    assert len(grid) == 2 and 'b' not in grid
+    print("✅ Spatial grid insert/move/remove")
+
+
+def test_spatial_prefilter_matches_all_pairs():
+    """The spatial prefilter does not lose any conflict"""
+    flights = generate_demo_flights(400)['flights']
+    indexed = VectorizedConflictDetector()
+    brute = VectorizedConflictDetector(use_spatial_index=False)
+
+    def pair_ids(conflicts):
+        return sorted(tuple(sorted((c['flight1']['icao24'], c['flight2']['icao24']))) for c in conflicts)
+
+    expected = pair_ids(brute.detect_all_conflicts(flights))
+    assert pair_ids(indexed.detect_all_conflicts(flights)) == expected
+    # Second tick reuses the index instead of rebuilding it
+    assert pair_ids(indexed.detect_all_conflicts(flights)) == expected
+    print(f"✅ Spatial prefilter keeps all {len(expected)} conflicts")
+
+
+def test_altitude_bands_follow_vertical_rates():
+    """Band ranges drop vertically distant pairs without losing climbing or descending conflicts"""
+    from traffic_simulator import TrafficSimulator
+
+    simulator = TrafficSimulator(3000, seed=5, start_time=0.0)
+    for _ in range(10):
+        simulator.step(60.0)
+    batch = simulator.batch()
+
+    def pair_ids(conflicts):
+        return sorted(tuple(sorted((c['flight1'].icao24, c['flight2'].icao24))) for c in conflicts)
+
+    expected = pair_ids(VectorizedConflictDetector(use_spatial_index=False).detect_all_conflicts(batch))
+    assert pair_ids(VectorizedConflictDetector().detect_all_conflicts(batch)) == expected
+
+    state = build_state_matrix(batch)
+    positions = {key: tuple(state[row, [0, 1, 2, 5]]) for row, key in enumerate(batch.icao24.tolist())}
+    index_of = {key: row for row, key in enumerate(batch.icao24.tolist())}
+    banded, horizontal = SpatialGrid(), SpatialGrid(band_ft=1e9)
+    for grid in (banded, horizontal):
+        grid.sync(positions)
+    candidates = len(banded.candidate_index_pairs(index_of)[0])
+    assert candidates < 0.6 * len(horizontal.candidate_index_pairs(index_of)[0])
+
+    grid = SpatialGrid()
+    grid.insert('level', 40.0, -74.0, 35000)
+    grid.insert('above', 40.0, -74.0, 39000)
+    assert grid.neighbours('level') == set()
+    grid.insert('descending', 40.0, -74.0, 39000, vertical_rate=-500.0)
+    assert grid.neighbours('level') == {'descending'}
+    print(f"✅ Altitude bands keep all {len(expected)} conflicts from {candidates} candidate pairs")
+
+
+def test_flight_batch_rows_match_flight_data_fields():
+    """Row views expose every FlightData field with FlightData semantics"""
+    states = [
+        ['abc123', 'UAL123  ', 'United States', 1700000000, 1700000001, -74.0, 40.7, 35000.0,
+         False, 450.0, 90.0, 0.0, None, 35100.0, '1200', False, 0],
+        ['def456', None, 'Canada', None, 1700000002, -73.9, 40.8, None,
+         True, None, None, None, None, None, None, False, 0],
+    ]
+    batch = FlightBatch.from_state_vectors(states)
+
+    assert len(batch) == 2
+    for position, name in enumerate(FLIGHT_FIELDS):
+        assert getattr(batch[0], name) == states[0][position], name
+    assert batch[1].baro_altitude is None and batch[1].time_position is None
+    assert len(batch.with_position()) == 1
+    assert batch.airborne()[0].icao24 == 'abc123'
+
+    short = FlightBatch.from_state_vectors([states[0][:12] + [[1, 2], 35100.0, '1200', False], states[1][:12]])
+    assert short[0].sensors == [1, 2] and short[0].position_source == 0
+    assert short[1].sensors is None and short[1].squawk is None and not short[1].spi
+
+    flights = generate_demo_flights(50)['flights']
+    from_dicts = FlightBatch.from_dicts(flights)
+    assert from_dicts[3].latitude == flights[3]['latitude']
+    assert from_dicts[3].time_position == flights[3]['last_position_update']
+    assert len(VectorizedConflictDetector().detect_all_conflicts(from_dicts)) == \
+        len(VectorizedConflictDetector().detect_all_conflicts(flights))
+
+    anonymous = FlightBatch.from_dicts([dict(flights[0], icao24=None), flights[1]])
+    assert anonymous.icao24.tolist() == ['', flights[1]['icao24']]
+    assert anonymous.with_position().icao24.tolist() == [flights[1]['icao24']]
+    print("✅ FlightBatch rows are FlightData-compatible")
+
+
+def test_batch_trajectories_follow_great_circle():
+    """Batched projection matches the scalar destination-point formula"""
+    flights = FlightBatch.from_dicts(generate_demo_flights(40)['flights'])
+    trajectories = BatchTrajectoryCalculator.calculate_trajectories(flights, 30)
+    assert trajectories.shape == (40, 181, 3)
+
+    flight = flights[7]
+    distance = flight.velocity * 0.5 / EARTH_RADIUS_NM
+    lat1, lon1, track = map(math.radians, (flight.latitude, flight.longitude, flight.true_track))
+    lat2 = math.asin(math.sin(lat1) * math.cos(distance) + math.cos(lat1) * math.sin(distance) * math.cos(track))
+    lon2 = lon1 + math.atan2(math.sin(track) * math.sin(distance) * math.cos(lat1),
+                             math.cos(distance) - math.sin(lat1) * math.sin(lat2))
+    assert np.allclose(trajectories[7, -1], [math.degrees(lat2), math.degrees(lon2),
+                                             flight.baro_altitude + flight.vertical_rate * 30])
+
+    compact = BatchTrajectoryCalculator.calculate_trajectories(flights, 30, float32=True)
+    assert compact.dtype == np.float32 and compact.nbytes * 2 == trajectories.nbytes
+    assert np.allclose(compact, trajectories, atol=1e-2)
+    print("✅ Batched trajectories follow the great circle")
+
+
+def test_vectorized_haversine_variants_agree():
+    """Paired, one-to-many and matrix distances agree with a scalar haversine"""
+    def scalar(lat1, lon1, lat2, lon2):
+        dlat = math.radians(lat2 - lat1)
+        dlon = math.radians(lon2 - lon1)
+        h = (math.sin(dlat / 2) ** 2
+             + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2)
+        return 2 * EARTH_RADIUS_NM * math.asin(math.sqrt(h))
+
+    rng = np.random.default_rng(7)
+    lats, lons = rng.uniform(-60, 60, 30), rng.uniform(-180, 180, 30)
+    matrix = haversine_pairwise(prepare_points(lats, lons))
+
+    assert matrix.shape == (30, 30) and np.allclose(np.diag(matrix), 0.0)
+    assert abs(matrix[3, 11] - scalar(lats[3], lons[3], lats[11], lons[11])) < 1e-6
+    assert np.allclose(haversine_one_to_many(lats[3], lons[3], lats, lons), matrix[3])
+    assert np.allclose(haversine_paired(lats[:-1], lons[:-1], lats[1:], lons[1:]), np.diag(matrix, 1))
+
+    jfk_to_lhr = airport_distances(40.6413, -73.7781)[0][AIRPORT_CODES.index('LHR')]
+    assert abs(jfk_to_lhr - scalar(40.6413, -73.7781, 51.47, -0.4543)) < 1e-6
+
+    before = airport_distance_cache_info().hits
+    first = cached_airport_distances(41.001, -87.002)
+    assert cached_airport_distances(41.0012, -87.0018) == first
+    assert airport_distance_cache_info().hits == before + 1
+    print("✅ Vectorized haversine variants agree")
+
+
+def main():
+    """Run all engine tests"""
+    print("🧪 Vectorized Engine Test Suite")
+    print("=" * 60)
+
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("-" * 60)
+    print(f"🎯 Overall: {len(tests) - failures}/{len(tests)} tests passed")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
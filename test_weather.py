@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test Script for Weather Ingestion
+Checks that every weather source decodes into the same station record and
+that the gridded weather field matches direct interpolation
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from models.indexed_scheduler import IndexedRunwayScheduler
+from utils.geodesy import AIRPORTS, haversine_one_to_many
+from utils.response_cache import CachedWeather, ResponseCache
+from utils.weather_grid import BASELINE, INFLUENCE_NM, WeatherGrid, station_weather_factor
+from utils.weather_schema import FOG, RAIN, STORM, StationWeather, condition_category, decode_all, \
+    decode_weather, hazards
+from demo_data import get_demo_weather
+
+OPENWEATHERMAP_JFK = {
+    'coord': {'lon': -73.78, 'lat': 40.64},
+    'weather': [{'id': 701, 'main': 'Mist', 'description': 'mist'}],
+    'main': {'temp': 12.5, 'pressure': 1009, 'humidity': 93},
+    'visibility': 800,
+    'wind': {'speed': 15.0, 'deg': 220},
+    'dt': 1700000000,
+    'name': 'Jamaica',
+}
+
+
+def test_sources_decode_to_one_record():
+    """Flat demo dicts, OpenWeatherMap payloads and the old nested records agree on units"""
+    flat = {'station': 'JFK', 'temperature': 12.5, 'humidity': 93, 'pressure': 1009, 'wind_speed': 54.0,
+            'wind_direction': 220, 'visibility': 0.8, 'conditions': 'mist'}
+    records = [decode_weather(flat), decode_weather(OPENWEATHERMAP_JFK, 'JFK'),
+               decode_weather({'weather': OPENWEATHERMAP_JFK}, 'JFK')]
+    for record in records:
+        assert isinstance(record, StationWeather) and record.station == 'JFK'
+        assert abs(record.wind_speed - 54.0) < 1e-9 and abs(record.visibility - 0.8) < 1e-9
+        assert record.temperature == 12.5 and record.category == FOG
+        assert hazards(record) == ['fog', 'low_visibility', 'high_wind']
+    assert records[1].latitude == 40.64 and records[1].observed_at == 1700000000
+    assert decode_weather(records[1]) is records[1] and decode_weather('JFK') is None
+    print("✅ Demo, OpenWeatherMap and nested reports decode to the same record")
+
+
+def test_decode_all_and_categories():
+    """Lists and dicts decode once; already-decoded data passes through untouched"""
+    demo = get_demo_weather()
+    records = decode_all(demo)
+    assert list(records) == [item['station'] for item in demo]
+    assert all(record.wind_speed == item['wind_speed'] for record, item in zip(records.values(), demo))
+    assert decode_all(records) is records and decode_all(None) == {} and decode_all('x') == {}
+    assert list(decode_all([{'temperature': 20}])) == ['Station_0']
+
+    assert condition_category('Light Rain') == RAIN
+    assert condition_category('thunderstorm with heavy rain') == STORM
+    assert condition_category('Clear', visibility=0.5) == FOG
+    assert condition_category('Partly Cloudy', visibility=10) == 'clear'
+    print(f"✅ Decoded {len(records)} demo stations")
+
+
+def test_weather_cache_stores_decoded_records():
+    """get_weather_data_multiple_sources decodes at ingest, so cached values are records"""
+    calls = []
+
+    def fetch_batch(locations):
+        calls.append(list(locations))
+        return {location: dict(OPENWEATHERMAP_JFK, name=location) for location in locations}
+
+    weather = CachedWeather(cache=ResponseCache(), fetch_batch=fetch_batch)
+    first = weather.get_weather_data_multiple_sources(['JFK', 'LGA'])
+    second = weather.get_weather_data_multiple_sources(['JFK', 'LGA'])
+    assert len(calls) == 1 and first == second
+    assert all(isinstance(record, StationWeather) for record in second.values())
+    assert second['LGA'].station == 'LGA' and abs(second['LGA'].wind_speed - 54.0) < 1e-9
+    print("✅ Weather cache holds decoded station records")
+
+
+def storm_at_ord():
+    weather = get_demo_weather()
+    for item in weather:
+        item.update(conditions='Clear', visibility=10, wind_speed=10)
+    ord_report = next(item for item in weather if item['station'] == 'ORD')
+    ord_report.update(conditions='Thunderstorm', visibility=2, wind_speed=60)
+    return weather
+
+
+def test_weather_grid_matches_direct_interpolation():
+    """Grid lookups equal inverse-distance weighting at the cell centre, rebuilt only on change"""
+    grid = WeatherGrid()
+    weather = storm_at_ord()
+    assert grid.update(weather) and not grid.update(list(weather)) and grid.builds == 1
+
+    rng = np.random.default_rng(20)
+    latitudes, longitudes = rng.uniform(25, 50, 300), rng.uniform(-125, -65, 300)
+    sampled = grid.weather_factor(latitudes, longitudes)
+
+    stations = list(grid.stations.values())
+    factors = np.array([station_weather_factor(record) for record in stations])
+    rows, columns = grid.cells(latitudes, longitudes)
+    for k in range(len(latitudes)):
+        center_lat, center_lon = -90.0 + (rows[k] + 0.5) * grid.degrees, -180.0 + (columns[k] + 0.5) * grid.degrees
+        distance = np.maximum(haversine_one_to_many(center_lat, center_lon,
+                                                    [record.latitude for record in stations],
+                                                    [record.longitude for record in stations]), 1.0)
+        weights = distance ** -2.0
+        expected = ((weights * factors).sum() + INFLUENCE_NM ** -2.0) / (weights.sum() + INFLUENCE_NM ** -2.0)
+        assert abs(sampled[k] - expected) < 1e-9
+
+    ord_lat, ord_lon = AIRPORTS['ORD']
+    near, nearby, remote, unknown = grid.weather_factor([ord_lat, 41.5, -40.0, np.nan], [ord_lon, -87.5, 20.0, np.nan])
+    assert near > 1.9 and 1.0 < nearby < near and abs(remote - 1.0) < 0.01
+    assert unknown == BASELINE['weather_factor']
+    assert abs(grid.delay_minutes(ord_lat, ord_lon)[0] - 30.0) < 0.5
+
+    weather[0]['conditions'] = 'Fog'
+    assert grid.update(weather) and grid.builds == 2
+    print(f"✅ Weather grid matches direct IDW at 300 positions (storm cell factor {near:.2f})")
+
+
+def test_runway_weather_delays_from_grid():
+    """Runway delays sampled from the grid push slots back on affected runways only"""
+    grid = WeatherGrid()
+    grid.update(storm_at_ord())
+    scheduler = IndexedRunwayScheduler()
+    scheduler.add_runway('ORD-10L', 30)
+    scheduler.add_runway('ATL-08R', 30)
+    delays = scheduler.apply_weather(grid, {'ORD-10L': AIRPORTS['ORD'], 'ATL-08R': AIRPORTS['ATL']})
+    assert delays['ORD-10L'] > 29.0 and delays['ATL-08R'] < 1.0
+
+    start = datetime(2024, 1, 1, 12, 0)
+    results = [scheduler.schedule_flight({'icao24': f'w{k}'}, 'departure', start + timedelta(minutes=k), 'NORMAL')
+               for k in range(6)]
+    on_ord = [result for result in results if result['runway'] == 'ORD-10L']
+    assert all(result['delay_minutes'] >= delays['ORD-10L'] - 1e-6 for result in on_ord)
+    assert sum(result['runway'] == 'ATL-08R' for result in results) >= 5
+
+    resequenced = scheduler.resequence(time_budget=0.3)
+    for assignment in scheduler.assignments.values():
+        weather = delays[assignment['runway']] if assignment['runway'] == 'ORD-10L' else 0.0
+        assert assignment['delay_minutes'] >= weather - 1e-6
+    print(f"✅ Storm at ORD delays its runway {delays['ORD-10L']:.1f} min "
+          f"(resequence applied: {resequenced['applied']})")
+
+
+def main():
+    """Run all weather tests"""
+    print("🧪 Weather Test Suite")
+    print("=" * 60)
+
+    tests = [value for name, value in sorted(globals().items()) if name.startswith('test_')]
+    failures = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failures += 1
+            print(f"❌ {test.__name__} failed: {e}")
+
+    print("-" * 60)
+    print(f"🎯 Overall: {len(tests) - failures}/{len(tests)} tests passed")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
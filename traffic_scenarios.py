@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+"""
+Traffic Scenarios
+Scripted traffic (head-on pairs, converging arrival streams, holding stacks,
+arrival bursts, fuel emergencies) injected on top of the seeded simulator
+and replayed deterministically, to measure conflict detection recall and
+latency and runway scheduler delay at known densities.
+
+Scenarios are described in JSON (see traffic_scenarios.json):
+
+    {"name": "...", "seed": 1, "background": 300, "duration_s": 900,
+     "tick_s": 5, "runways": {"ORD-10L": 40},
+     "events": [{"type": "head_on", "at": 0, ...}, ...]}
+"""
+
+import hashlib
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from demo_data import AIRCRAFT_TYPES, AIRPORTS
+from models.indexed_scheduler import IndexedRunwayScheduler
+from traffic_simulator import TrafficSimulator
+from utils.conflict_engine import DEFAULT_LOOKAHEAD_MINUTES, VectorizedConflictDetector, build_state_matrix, \
+    detect_conflicts
+from utils.flight_batch import FlightBatch
+from utils.geodesy import haversine_paired
+
+SCENARIO_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traffic_scenarios.json')
+
+# Fixed simulation epoch so scheduled times replay identically
+DEFAULT_START_TIME = 1700000000.0
+
+NM_PER_DEG_LAT = 60.0
+
+# Scripted aircraft are identified by icao24 from this block upwards
+SCRIPTED_ICAO_BASE = 0xf00000
+
+# Scripted arrivals land (and leave the airborne picture) within this distance
+LANDING_NM = 1.0
+
+# FlightBatch columns the scenario snapshot carries
+SNAPSHOT_FIELDS = ('icao24', 'callsign', 'origin_country', 'time_position', 'last_contact', 'latitude',
+                   'longitude', 'baro_altitude', 'velocity', 'true_track', 'vertical_rate', 'on_ground')
+
+Pair = Tuple[str, str]
+
+
+def _pair(a: str, b: str) -> Pair:
+    return (a, b) if a < b else (b, a)
+
+
+def _airport(code: str) -> Tuple[float, float]:
+    if code not in AIRPORTS:
+        raise ValueError(f"Unknown airport '{code}'")
+    return AIRPORTS[code]['lat'], AIRPORTS[code]['lon']
+
+
+def _offset(lat: float, lon: float, bearing: float, distance_nm: float) -> Tuple[float, float]:
+    """Position distance_nm from (lat, lon) along bearing, flat-earth (scenario geometry is local)"""
+    bearing = math.radians(bearing)
+    lat2 = lat + distance_nm * math.cos(bearing) / NM_PER_DEG_LAT
+    lon2 = lon + distance_nm * math.sin(bearing) / (NM_PER_DEG_LAT * math.cos(math.radians(lat)))
+    return lat2, lon2
+
+
+class ScriptedFlights:
+    """
+    Aircraft placed by scenario events, dead-reckoned every tick.
+
+    Each aircraft holds a constant track and speed unless it is turning
+    (holding patterns) or homing on an airport (arrivals), in which case the
+    track follows the bearing to the airport and it lands on reaching it.
+    Vertical rate runs until the target altitude is reached.
+    """
+
+    FIELDS = ('latitude', 'longitude', 'altitude', 'speed', 'track', 'vertical_rate', 'turn_rate',
+              'target_altitude', 'home_lat', 'home_lon')
+
+    def __init__(self):
+        self.icao24: List[str] = []
+        self.callsign: List[str] = []
+        self.aircraft_type: List[str] = []
+        self.arrays = {field: np.empty(0) for field in self.FIELDS}
+        self.homing = np.empty(0, dtype=bool)
+        self.landed = np.empty(0, dtype=bool)
+        self.landed_at: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.icao24)
+
+    def add(self, callsign: str, aircraft_type: str, latitude: float, longitude: float, altitude: float,
+            speed: float, track: float = 0.0, vertical_rate: float = 0.0, turn_rate: float = 0.0,
+            target_altitude: Optional[float] = None, home: Optional[Tuple[float, float]] = None) -> str:
+        if callsign in self.callsign:
+            raise ValueError(f"Duplicate scripted callsign '{callsign}'")
+        icao24 = f'{SCRIPTED_ICAO_BASE + len(self.icao24):06x}'
+        self.icao24.append(icao24)
+        self.callsign.append(callsign)
+        self.aircraft_type.append(aircraft_type)
+        values = {'latitude': latitude, 'longitude': longitude, 'altitude': altitude, 'speed': speed,
+                  'track': track % 360.0, 'vertical_rate': vertical_rate, 'turn_rate': turn_rate,
+                  'target_altitude': altitude if target_altitude is None else target_altitude,
+                  'home_lat': home[0] if home else np.nan, 'home_lon': home[1] if home else np.nan}
+        for field in self.FIELDS:
+            self.arrays[field] = np.append(self.arrays[field], values[field])
+        self.homing = np.append(self.homing, home is not None)
+        self.landed = np.append(self.landed, False)
+        if home is not None:
+            self._home_tracks()
+        return icao24
+
+    def _home_tracks(self):
+        a = self.arrays
+        rows = self.homing & ~self.landed
+        lat1, lat2 = np.radians(a['latitude'][rows]), np.radians(a['home_lat'][rows])
+        dlon = np.radians(a['home_lon'][rows] - a['longitude'][rows])
+        a['track'][rows] = np.degrees(np.arctan2(np.sin(dlon) * np.cos(lat2), np.cos(lat1) * np.sin(lat2)
+                                                 - np.sin(lat1) * np.cos(lat2) * np.cos(dlon))) % 360.0
+
+    def home_distance(self) -> np.ndarray:
+        a = self.arrays
+        distance = haversine_paired(a['latitude'], a['longitude'], a['home_lat'], a['home_lon'])
+        return np.where(self.homing, distance, np.inf)
+
+    def step(self, seconds: float, now: float):
+        if not len(self):
+            return
+        a = self.arrays
+        flying = ~self.landed
+        track = np.radians(a['track'])
+        distance = np.where(flying, a['speed'] * seconds / 3600.0, 0.0)
+        a['latitude'] = a['latitude'] + distance * np.cos(track) / NM_PER_DEG_LAT
+        a['longitude'] = a['longitude'] + distance * np.sin(track) / (NM_PER_DEG_LAT
+                                                                       * np.cos(np.radians(a['latitude'])))
+
+        # Climb or descend towards the target altitude, then level off
+        climb = np.where(flying, a['vertical_rate'] * seconds / 60.0, 0.0)
+        gap = a['target_altitude'] - a['altitude']
+        step = np.where(np.sign(climb) == np.sign(gap), np.sign(gap) * np.minimum(np.abs(climb), np.abs(gap)), 0.0)
+        a['altitude'] = a['altitude'] + step
+        a['vertical_rate'] = np.where(np.abs(a['target_altitude'] - a['altitude']) < 1.0, 0.0, a['vertical_rate'])
+        a['track'] = (a['track'] + np.where(flying, a['turn_rate'] * seconds, 0.0)) % 360.0
+
+        arrived = flying & self.homing & (self.home_distance() <= LANDING_NM + distance)
+        for row in np.flatnonzero(arrived):
+            self.landed_at[self.icao24[row]] = now
+        self.landed |= arrived
+        self._home_tracks()
+
+    def columns(self, timestamp: float) -> Dict[str, np.ndarray]:
+        a = self.arrays
+        count = len(self)
+        callsign = np.empty(count, dtype=object)
+        callsign[:] = self.callsign
+        flying = ~self.landed
+        return {
+            'icao24': np.array(self.icao24, dtype=str),
+            'callsign': callsign,
+            'origin_country': np.full(count, 'United States', dtype=object),
+            'time_position': np.full(count, timestamp),
+            'last_contact': np.full(count, timestamp),
+            'latitude': a['latitude'],
+            'longitude': a['longitude'],
+            'baro_altitude': a['altitude'],
+            'velocity': np.where(flying, a['speed'], 0.0),
+            'true_track': a['track'],
+            'vertical_rate': np.where(flying, a['vertical_rate'], 0.0),
+            'on_ground': self.landed.copy(),
+        }
+
+
+class ScenarioRunner:
+    """
+    Replays one scenario and reports detection and scheduling metrics.
+
+    Background traffic comes from a TrafficSimulator seeded with the
+    scenario seed; event randomness (burst radials and spacing) uses the
+    same seed, so a run is fully reproducible and its fingerprint only
+    changes when detection or scheduling behaviour does.
+
+    Ground truth for recall is an exhaustive closest-point-of-approach check
+    of every scripted aircraft against every other airborne aircraft, so
+    recall measures what the production detector (with its spatial index
+    prefilter) misses. Pairs an event expects to conflict are also tracked
+    for detection delay and warning time.
+    """
+
+    EVENT_TYPES = ('head_on', 'converging', 'holding', 'arrival_burst', 'fuel_emergency')
+
+    def __init__(self, scenario: Dict[str, Any], seed: Optional[int] = None,
+                 detector: Optional[VectorizedConflictDetector] = None):
+        self.scenario = scenario
+        self.name = scenario.get('name', 'scenario')
+        self.seed = scenario.get('seed', 0) if seed is None else seed
+        self.duration = float(scenario.get('duration_s', 600))
+        self.tick = float(scenario.get('tick_s', 5))
+        self.start_time = float(scenario.get('start_time', DEFAULT_START_TIME))
+        self.lookahead = float(scenario.get('lookahead_minutes', DEFAULT_LOOKAHEAD_MINUTES))
+        self.events = sorted(scenario.get('events', []), key=lambda event: event.get('at', 0))
+        for event in self.events:
+            if event.get('type') not in self.EVENT_TYPES:
+                raise ValueError(f"Unknown scenario event type '{event.get('type')}'")
+
+        self.rng = np.random.default_rng(self.seed)
+        background = int(scenario.get('background', 0))
+        self.background = TrafficSimulator(background, self.seed, start_time=self.start_time) if background else None
+        self.scripted = ScriptedFlights()
+        self.detector = detector or VectorizedConflictDetector(lookahead_minutes=self.lookahead)
+
+        self.scheduler = IndexedRunwayScheduler()
+        for runway, capacity in scenario.get('runways', {}).items():
+            self.scheduler.add_runway(runway, int(capacity))
+
+        self.elapsed = 0.0
+        self.expected: Dict[Pair, Dict[str, Any]] = {}
+        self.emergencies: List[Dict[str, Any]] = []
+        self._by_callsign: Dict[str, str] = {}
+
+    # Event injection
+
+    def _add(self, callsign: str, **kwargs) -> str:
+        aircraft_type = kwargs.pop('aircraft_type', None) or AIRCRAFT_TYPES[len(self.scripted) % len(AIRCRAFT_TYPES)]
+        icao24 = self.scripted.add(callsign, aircraft_type, **kwargs)
+        self._by_callsign[callsign] = icao24
+        return icao24
+
+    def _expect(self, a: str, b: str):
+        self.expected[_pair(a, b)] = {'injected_at': self.elapsed, 'detected_at': None, 'warning_minutes': None}
+
+    def _schedule_arrival(self, icao24: str, eta_seconds: float, fuel_level: float):
+        row = self.scripted.icao24.index(icao24)
+        flight = {'icao24': icao24, 'callsign': self.scripted.callsign[row],
+                  'aircraft_type': self.scripted.aircraft_type[row]}
+        preferred = datetime.fromtimestamp(self.start_time + self.elapsed + eta_seconds)
+        result = self.scheduler.schedule_flight(flight, 'arrival', preferred, 'NORMAL', fuel_level)
+        if not result['success']:
+            raise ValueError(f"Could not schedule {flight['callsign']}: {result['error']}")
+
+    def _head_on(self, event: Dict[str, Any]):
+        """Pairs on reciprocal tracks at one flight level, closing on the centre point"""
+        lat, lon = event.get('center', (39.0, -95.0))
+        track = float(event.get('track', 90.0))
+        altitude = float(event.get('flight_level', 350)) * 100.0
+        speed = float(event.get('speed', 450.0))
+        half = float(event.get('distance_nm', 80.0)) / 2.0
+        prefix = event.get('prefix', 'HDON')
+        for index in range(int(event.get('pairs', 1))):
+            # Successive pairs are stacked 30 NM apart across the track
+            center = _offset(lat, lon, track + 90.0, 30.0 * index)
+            miss = float(event.get('miss_nm', 0.0)) / 2.0
+            west = _offset(*_offset(*center, track + 180.0, half), track + 90.0, miss)
+            east = _offset(*_offset(*center, track, half), track - 90.0, miss)
+            a = self._add(f'{prefix}{2 * index + 1}', latitude=west[0], longitude=west[1], altitude=altitude,
+                          speed=speed, track=track)
+            b = self._add(f'{prefix}{2 * index + 2}', latitude=east[0], longitude=east[1], altitude=altitude,
+                          speed=speed, track=track + 180.0)
+            self._expect(a, b)
+
+    def _converging(self, event: Dict[str, Any]):
+        """Arrival streams on several inbound bearings whose leaders reach the airport together"""
+        home = _airport(event.get('airport', 'ORD'))
+        altitude = float(event.get('altitude', 12000.0))
+        speed = float(event.get('speed', 300.0))
+        start_nm = float(event.get('start_nm', 100.0))
+        spacing = float(event.get('spacing_nm', 10.0))
+        prefix = event.get('prefix', 'CONV')
+        fuel = float(event.get('fuel_level', 60.0))
+        leaders = []
+        for stream, bearing in enumerate(event.get('bearings', (270.0, 180.0))):
+            for position in range(int(event.get('per_stream', 5))):
+                distance = start_nm + spacing * position
+                lat, lon = _offset(*home, bearing, distance)
+                icao24 = self._add(f'{prefix}{stream + 1}{position + 1:02d}', latitude=lat, longitude=lon,
+                                   altitude=altitude, speed=speed, vertical_rate=-float(event.get('descent_fpm', 0.0)),
+                                   target_altitude=float(event.get('target_altitude', altitude)), home=home)
+                self._schedule_arrival(icao24, distance / speed * 3600.0, fuel)
+                if position == 0:
+                    leaders.append(icao24)
+        for index, leader in enumerate(leaders):
+            for other in leaders[index + 1:]:
+                self._expect(leader, other)
+
+    def _holding(self, event: Dict[str, Any]):
+        """A stack of aircraft orbiting one fix at consecutive levels, all waiting to land"""
+        home = _airport(event.get('airport', 'ORD'))
+        fix = _offset(*home, float(event.get('bearing', 90.0)), float(event.get('distance_nm', 20.0)))
+        base = float(event.get('base_altitude', 7000.0))
+        spacing = float(event.get('spacing_ft', 1000.0))
+        prefix = event.get('prefix', 'HOLD')
+        fuel = float(event.get('fuel_level', 40.0))
+        for level in range(int(event.get('levels', 5))):
+            icao24 = self._add(f'{prefix}{level + 1}', latitude=fix[0], longitude=fix[1],
+                               altitude=base + spacing * level, speed=float(event.get('speed', 220.0)),
+                               track=90.0 * level, turn_rate=float(event.get('turn_rate', 1.5)))
+            self._schedule_arrival(icao24, 0.0, fuel)
+
+    def _arrival_burst(self, event: Dict[str, Any]):
+        """count arrivals from random bearings all wanting to land within window_s"""
+        home = _airport(event.get('airport', 'ORD'))
+        altitude = float(event.get('altitude', 11000.0))
+        speed = float(event.get('speed', 250.0))
+        window = float(event.get('window_s', 300.0))
+        prefix = event.get('prefix', 'BRST')
+        fuel = float(event.get('fuel_level', 60.0))
+        count = int(event.get('count', 20))
+        bearings = self.rng.uniform(0.0, 360.0, size=count)
+        etas = np.sort(self.rng.uniform(0.0, window, size=count)) + float(event.get('min_eta_s', 300.0))
+        for index, (bearing, eta) in enumerate(zip(bearings, etas)):
+            distance = speed * eta / 3600.0
+            lat, lon = _offset(*home, bearing, distance)
+            icao24 = self._add(f'{prefix}{index + 1:03d}', latitude=lat, longitude=lon, altitude=altitude,
+                               speed=speed, vertical_rate=-float(event.get('descent_fpm', 1000.0)),
+                               target_altitude=float(event.get('target_altitude', 3000.0)), home=home)
+            self._schedule_arrival(icao24, eta, fuel)
+
+    def _fuel_emergency(self, event: Dict[str, Any]):
+        """Escalate a scheduled flight to EMERGENCY with low fuel and record its delay change"""
+        callsign = event['callsign']
+        icao24 = self._by_callsign.get(callsign)
+        if icao24 is None or icao24 not in self.scheduler.assignments:
+            raise ValueError(f"Fuel emergency for unknown or unscheduled flight '{callsign}'")
+        before = self.scheduler.assignments[icao24]['delay_minutes']
+        result = self.scheduler.update_flight(icao24, priority='EMERGENCY',
+                                              fuel_level=float(event.get('fuel_level', 5.0)))
+        if not result['success']:
+            raise ValueError(f"Fuel emergency for '{callsign}' failed: {result['error']}")
+        self.emergencies.append({'callsign': callsign, 'at': self.elapsed, 'delay_before': round(before, 2),
+                                 'delay_after': round(result['delay_minutes'], 2)})
+
+    def _inject(self, event: Dict[str, Any]):
+        getattr(self, f"_{event['type']}")(event)
+
+    # Replay
+
+    def snapshot(self) -> FlightBatch:
+        """Background and scripted traffic as one FlightBatch"""
+        timestamp = float(int(self.start_time + self.elapsed))
+        parts = []
+        if self.background is not None:
+            parts.append(self.background.batch().to_columns(SNAPSHOT_FIELDS))
+        if len(self.scripted):
+            parts.append(self.scripted.columns(timestamp))
+        if not parts:
+            return FlightBatch.empty()
+        return FlightBatch({name: np.concatenate([part[name] for part in parts]) for name in SNAPSHOT_FIELDS})
+
+    def _truth(self, airborne: FlightBatch) -> Set[Pair]:
+        """Every conflicting pair that involves a scripted aircraft, by exhaustive CPA"""
+        scripted = np.isin(airborne.icao24, self.scripted.icao24)
+        rows = np.flatnonzero(scripted)
+        n = len(airborne)
+        if not len(rows) or n < 2:
+            return set()
+        i = np.repeat(rows, n)
+        j = np.tile(np.arange(n), len(rows))
+        keep = (i != j) & (~scripted[j] | (j > i))
+        result = detect_conflicts(build_state_matrix(airborne), self.lookahead, pairs=(i[keep], j[keep]))
+        icao24 = airborne.icao24
+        return {_pair(icao24[a], icao24[b]) for a, b in zip(result['i'].tolist(), result['j'].tolist())}
+
+    def run(self) -> Dict[str, Any]:
+        pending = list(self.events)
+        truth_total = hits_total = 0
+        detection_ms: List[float] = []
+        digest = hashlib.sha1()
+        peak = 0
+
+        ticks = int(round(self.duration / self.tick)) + 1
+        for tick in range(ticks):
+            self.elapsed = tick * self.tick
+            while pending and pending[0].get('at', 0) <= self.elapsed:
+                self._inject(pending.pop(0))
+
+            airborne = self.snapshot().airborne()
+            peak = max(peak, len(airborne))
+            started = time.perf_counter()
+            conflicts = self.detector.detect_all_conflicts(airborne)
+            detection_ms.append((time.perf_counter() - started) * 1000.0)
+
+            detected = {}
+            for conflict in conflicts:
+                pair = _pair(conflict['flight1'].icao24, conflict['flight2'].icao24)
+                detected[pair] = conflict
+            truth = self._truth(airborne)
+            truth_total += len(truth)
+            hits_total += len(truth & set(detected))
+
+            for pair, record in self.expected.items():
+                if record['detected_at'] is None and pair in detected:
+                    record['detected_at'] = self.elapsed
+                    record['warning_minutes'] = round(detected[pair]['time_to_conflict'], 2)
+            digest.update(repr((tick, sorted(detected))).encode())
+
+            if self.background is not None:
+                self.background.step(self.tick)
+            self.scripted.step(self.tick, self.elapsed + self.tick)
+
+        for flight_id, assignment in sorted(self.scheduler.assignments.items()):
+            digest.update(repr((flight_id, assignment['runway'], assignment['scheduled_time'].timestamp())).encode())
+        return self._report(truth_total, hits_total, detection_ms, ticks, peak, digest.hexdigest())
+
+    def _report(self, truth_total: int, hits_total: int, detection_ms: List[float], ticks: int, peak: int,
+                fingerprint: str) -> Dict[str, Any]:
+        found = [record for record in self.expected.values() if record['detected_at'] is not None]
+        delays = [record['detected_at'] - record['injected_at'] for record in found]
+        schedule = self.scheduler.calculate_delays()
+        scheduled = [assignment['delay_minutes'] for assignment in self.scheduler.assignments.values()]
+        return {
+            'name': self.name,
+            'seed': self.seed,
+            'ticks': ticks,
+            'peak_airborne': peak,
+            'scripted': len(self.scripted),
+            'conflicts': {
+                'truth_pairs': truth_total,
+                'detected_pairs': hits_total,
+                'recall': hits_total / truth_total if truth_total else 1.0,
+                'expected': len(self.expected),
+                'expected_found': len(found),
+                'detection_delay_s': {'mean': float(np.mean(delays)) if delays else None,
+                                      'max': max(delays) if delays else None},
+                'min_warning_minutes': min((record['warning_minutes'] for record in found), default=None),
+                'detection_ms': {'mean': float(np.mean(detection_ms)),
+                                 'p95': float(np.percentile(detection_ms, 95)),
+                                 'max': max(detection_ms)},
+            },
+            'scheduler': {
+                'flights': schedule['scheduled_flights'],
+                'total_delay_minutes': round(schedule['total_delay_minutes'], 2),
+                'average_delay_minutes': round(schedule['average_delay_minutes'], 2),
+                'max_delay_minutes': round(max(scheduled), 2) if scheduled else 0.0,
+                'landed': len(self.scripted.landed_at),
+                'emergencies': self.emergencies,
+            },
+            'fingerprint': fingerprint,
+        }
+
+
+def load_scenarios(path: str = SCENARIO_FILE) -> List[Dict[str, Any]]:
+    """Scenarios from a JSON file holding one scenario or {"scenarios": [...]}"""
+    with open(path, 'r', encoding='utf-8') as handle:
+        data = json.load(handle)
+    return data.get('scenarios', [data]) if isinstance(data, dict) else list(data)
+
+
+def run_scenario(scenario: Dict[str, Any], seed: Optional[int] = None) -> Dict[str, Any]:
+    return ScenarioRunner(scenario, seed).run()
+
+
+def main():
+    """Replay every scenario in a file (default traffic_scenarios.json), optionally only one by name"""
+    path = sys.argv[1] if len(sys.argv) > 1 else SCENARIO_FILE
+    only = sys.argv[2] if len(sys.argv) > 2 else None
+    print("🎬 Traffic Scenarios")
+    print("=" * 60)
+    for scenario in load_scenarios(path):
+        if only and scenario.get('name') != only:
+            continue
+        report = run_scenario(scenario)
+        conflicts, scheduler = report['conflicts'], report['scheduler']
+        print(f"▶ {report['name']} (seed {report['seed']}, {report['ticks']} ticks, "
+              f"peak {report['peak_airborne']} airborne)")
+        print(f"  Conflicts: recall {conflicts['recall']:.3f} ({conflicts['detected_pairs']}/"
+              f"{conflicts['truth_pairs']}), expected {conflicts['expected_found']}/{conflicts['expected']}, "
+              f"mean delay {conflicts['detection_delay_s']['mean']} s, "
+              f"{conflicts['detection_ms']['mean']:.1f} ms/tick (p95 {conflicts['detection_ms']['p95']:.1f})")
+        print(f"  Scheduler: {scheduler['flights']} flights, avg delay {scheduler['average_delay_minutes']} min, "
+              f"max {scheduler['max_delay_minutes']} min, {scheduler['landed']} landed")
+        for emergency in scheduler['emergencies']:
+            print(f"  🚨 {emergency['callsign']}: delay {emergency['delay_before']} → {emergency['delay_after']} min")
+        print(f"  Fingerprint: {report['fingerprint'][:16]}")
+
+
+if __name__ == "__main__":
+    main()
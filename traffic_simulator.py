@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Traffic Simulator
+Seeded, stateful version of the demo feed: N persistent aircraft fly
+great-circle routes between the demo airports with climb, cruise and
+descent phases, advanced with vectorized NumPy every tick.
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from demo_data import AIRCRAFT_TYPES, AIRLINES, AIRPORTS
+from utils.flight_batch import FlightBatch
+from utils.geodesy import EARTH_RADIUS_NM
+
+CLIMB, CRUISE, DESCENT = 0, 1, 2
+PHASE_NAMES = ('climb', 'cruise', 'descent')
+
+# Vertical profile: about 2,000 ft/min in the climb and the 3:1 rule down
+CLIMB_FT_PER_NM = 350.0
+DESCENT_FT_PER_NM = 333.0
+FIELD_ELEVATION_FT = 1000.0
+
+CRUISE_ALTITUDES_FT = (30000, 42000)
+CRUISE_SPEEDS_KT = (420.0, 490.0)
+CLIMB_SPEED_KT = 290.0
+DESCENT_SPEED_KT = 280.0
+# Below 10,000 ft
+TERMINAL_SPEED_KT = 250.0
+
+# Endpoints are scattered around each airport by up to this much, in degrees
+ENDPOINT_JITTER = 0.5
+
+MAX_AIRCRAFT = 50000
+
+# Simulated aircraft draw their 24-bit icao24 addresses from this block
+ICAO24_BLOCK_START = 0xa00000
+ICAO24_BLOCK_SIZE = 0x100000
+
+
+def _unit_vectors(latitude: np.ndarray, longitude: np.ndarray) -> np.ndarray:
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    return np.stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+def _to_degrees(vectors: np.ndarray):
+    latitude = np.degrees(np.arctan2(vectors[..., 2], np.hypot(vectors[..., 0], vectors[..., 1])))
+    longitude = np.degrees(np.arctan2(vectors[..., 1], vectors[..., 0]))
+    return latitude, longitude
+
+
+class TrafficSimulator:
+    """
+    Persistent simulated traffic with the get_aggregated_flight_data interface.
+
+    Every aircraft keeps its icao24 and callsign for the whole run. Positions
+    are interpolated along the great circle between origin and destination;
+    altitude follows a climb/cruise/descent profile over the distance flown,
+    and on arrival the aircraft turns round towards a new destination. The
+    same seed always produces the same traffic, tick for tick.
+    """
+
+    def __init__(self, count: int = 1000, seed: int = 0, airports: Optional[Dict[str, Dict[str, Any]]] = None,
+                 start_time: Optional[float] = None):
+        if not 1 <= count <= MAX_AIRCRAFT:
+            raise ValueError(f"count must be between 1 and {MAX_AIRCRAFT}")
+        self.count = count
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        airports = airports or AIRPORTS
+        self.airport_codes = list(airports)
+        self._airport_lat = np.array([airports[code]['lat'] for code in self.airport_codes])
+        self._airport_lon = np.array([airports[code]['lon'] for code in self.airport_codes])
+
+        self.time = time.time() if start_time is None else start_time
+        self.ticks = 0
+
+        rng = self.rng
+        # Addresses come from their own stream so they do not shift the traffic drawn from rng
+        addresses = np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0]).choice(
+            ICAO24_BLOCK_SIZE, size=count, replace=False) + ICAO24_BLOCK_START
+        self.icao24 = np.array([f'{address:06x}' for address in addresses.tolist()])
+        self.callsign = np.array([f'{AIRLINES[index % len(AIRLINES)]}{100 + index}' for index in range(count)],
+                                 dtype=object)
+        self.aircraft_type = np.array(AIRCRAFT_TYPES, dtype=object)[rng.integers(len(AIRCRAFT_TYPES), size=count)]
+        self.cruise_altitude = rng.integers(CRUISE_ALTITUDES_FT[0] // 1000, CRUISE_ALTITUDES_FT[1] // 1000 + 1,
+                                            size=count) * 1000.0
+        self.cruise_speed = rng.uniform(*CRUISE_SPEEDS_KT, size=count)
+
+        self.origin = rng.integers(len(self.airport_codes), size=count)
+        self.destination = np.empty(count, dtype=np.intp)
+        self._start = np.empty((count, 3))
+        self._end = np.empty((count, 3))
+        self.route_nm = np.empty(count)
+        self._assign_destinations(np.arange(count), self._endpoints(self.origin))
+        self.flown_nm = rng.uniform(0.0, 1.0, size=count) * self.route_nm
+
+        self.altitude = self._profile_altitude()
+        self.vertical_rate = np.zeros(count)
+        self._update_kinematics()
+
+    def _endpoints(self, airports: np.ndarray) -> np.ndarray:
+        jitter = self.rng.uniform(-ENDPOINT_JITTER, ENDPOINT_JITTER, size=(len(airports), 2))
+        return _unit_vectors(self._airport_lat[airports] + jitter[:, 0], self._airport_lon[airports] + jitter[:, 1])
+
+    def _assign_destinations(self, rows: np.ndarray, start: np.ndarray):
+        """New route for rows, starting at start (unit vectors) towards another airport"""
+        offset = self.rng.integers(1, len(self.airport_codes), size=len(rows))
+        self.destination[rows] = (self.origin[rows] + offset) % len(self.airport_codes)
+        self._start[rows] = start
+        self._end[rows] = self._endpoints(self.destination[rows])
+        cosine = np.clip(np.einsum('ij,ij->i', self._start[rows], self._end[rows]), -1.0, 1.0)
+        self.route_nm[rows] = np.maximum(np.arccos(cosine) * EARTH_RADIUS_NM, 1.0)
+
+    def _profile_altitude(self) -> np.ndarray:
+        remaining = self.route_nm - self.flown_nm
+        return np.minimum.reduce((self.cruise_altitude,
+                                  FIELD_ELEVATION_FT + self.flown_nm * CLIMB_FT_PER_NM,
+                                  FIELD_ELEVATION_FT + remaining * DESCENT_FT_PER_NM))
+
+    @property
+    def phase(self) -> np.ndarray:
+        remaining = self.route_nm - self.flown_nm
+        climbing = FIELD_ELEVATION_FT + self.flown_nm * CLIMB_FT_PER_NM < self.cruise_altitude
+        descending = FIELD_ELEVATION_FT + remaining * DESCENT_FT_PER_NM < self.cruise_altitude
+        return np.where(descending & (remaining < self.flown_nm), DESCENT, np.where(climbing, CLIMB, CRUISE))
+
+    def _update_kinematics(self):
+        """Position, track and speed from the distance flown along each route"""
+        angle = self.route_nm / EARTH_RADIUS_NM
+        fraction = np.clip(self.flown_nm / self.route_nm, 0.0, 1.0)
+        sin_angle = np.maximum(np.sin(angle), 1e-12)
+        a = np.sin((1.0 - fraction) * angle) / sin_angle
+        b = np.sin(fraction * angle) / sin_angle
+        position = a[:, None] * self._start + b[:, None] * self._end
+        self.latitude, self.longitude = _to_degrees(position)
+
+        # Initial bearing from the current position to the destination
+        lat1, lon1 = np.radians(self.latitude), np.radians(self.longitude)
+        lat2, lon2 = (np.radians(value) for value in _to_degrees(self._end))
+        dlon = lon2 - lon1
+        bearing = np.arctan2(np.sin(dlon) * np.cos(lat2),
+                             np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon))
+        self.true_track = np.degrees(bearing) % 360.0
+
+        phase = self.phase
+        speed = np.choose(phase, (np.full(self.count, CLIMB_SPEED_KT), self.cruise_speed,
+                                  np.full(self.count, DESCENT_SPEED_KT)))
+        self.velocity = np.where(self.altitude < 10000.0, np.minimum(speed, TERMINAL_SPEED_KT), speed)
+
+    def step(self, seconds: float = 1.0):
+        """Advance every aircraft by seconds of flight"""
+        self.flown_nm = self.flown_nm + self.velocity * seconds / 3600.0
+        arrived = np.flatnonzero(self.flown_nm >= self.route_nm)
+        if len(arrived):
+            self.origin[arrived] = self.destination[arrived]
+            self._assign_destinations(arrived, self._end[arrived])
+            self.flown_nm[arrived] = 0.0
+
+        altitude = self._profile_altitude()
+        self.vertical_rate = (altitude - self.altitude) * 60.0 / seconds if seconds > 0 else self.vertical_rate
+        self.vertical_rate[arrived] = 0.0
+        self.altitude = altitude
+        self._update_kinematics()
+        self.time += seconds
+        self.ticks += 1
+
+    def batch(self) -> FlightBatch:
+        """Current traffic as a FlightBatch, without building per-aircraft dicts"""
+        timestamps = np.full(self.count, float(int(self.time)))
+        return FlightBatch({
+            'icao24': self.icao24,
+            'callsign': self.callsign,
+            'origin_country': np.full(self.count, 'United States', dtype=object),
+            'time_position': timestamps,
+            'last_contact': timestamps,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'baro_altitude': self.altitude,
+            'velocity': self.velocity,
+            'true_track': self.true_track,
+            'vertical_rate': self.vertical_rate,
+            'on_ground': np.zeros(self.count, dtype=bool),
+        })
+
+    def flights(self) -> List[Dict[str, Any]]:
+        """Current traffic as flight dicts in the generate_demo_flights format"""
+        codes = np.array(self.airport_codes, dtype=object)
+        columns = zip(self.icao24.tolist(), self.callsign.tolist(), self.latitude.tolist(),
+                      self.longitude.tolist(), np.round(self.altitude).tolist(), np.round(self.velocity).tolist(),
+                      self.true_track.tolist(), np.round(self.vertical_rate).tolist(),
+                      codes[self.origin].tolist(), codes[self.destination].tolist(), self.aircraft_type.tolist())
+        now = int(self.time)
+        return [{
+            'icao24': icao24,
+            'callsign': callsign,
+            'origin_country': 'United States',
+            'latitude': latitude,
+            'longitude': longitude,
+            'baro_altitude': altitude,
+            'velocity': velocity,
+            'true_track': track,
+            'vertical_rate': vertical_rate,
+            'last_position_update': now,
+            'on_ground': False,
+            'source': 'Simulator',
+            'origin': origin,
+            'destination': destination,
+            'aircraft_type': aircraft_type,
+        } for (icao24, callsign, latitude, longitude, altitude, velocity, track, vertical_rate,
+               origin, destination, aircraft_type) in columns]
+
+    def get_aggregated_flight_data(self, bbox: Optional[Sequence[float]] = None,
+                                   deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Advance to the wall clock (at least one tick) and return the traffic in
+        the aggregated-feed format, optionally limited to a bbox.
+        """
+        self.step(max(1.0, time.time() - self.time))
+        flights = self.flights()
+        if bbox:
+            flights = [flight for flight in flights if bbox[0] <= flight['latitude'] <= bbox[2]
+                       and bbox[1] <= flight['longitude'] <= bbox[3]]
+        return {
+            'flights': flights,
+            'sources': ['Simulator'],
+            'source_status': {'Simulator': {'status': 'ok', 'count': len(flights), 'error': None}},
+            'timestamp': datetime.now().isoformat(),
+            'count': len(flights),
+        }
+
+
+def flight_data_source(env: Optional[Dict[str, str]] = None):
+    """
+    The flight data source selected by FLIGHT_DATA_SOURCE: 'simulator' gives
+    a TrafficSimulator with SIMULATOR_AIRCRAFT aircraft and SIMULATOR_SEED,
+    anything else the live AsyncFlightAggregator.
+    """
+    env = os.environ if env is None else env
+    if env.get('FLIGHT_DATA_SOURCE', 'live').lower() == 'simulator':
+        return TrafficSimulator(int(env.get('SIMULATOR_AIRCRAFT', 1000)), int(env.get('SIMULATOR_SEED', 0)))
+    from utils.async_fetch import AsyncFlightAggregator
+    return AsyncFlightAggregator()
+
+
+def main():
+    """Time the simulator at a few fleet sizes"""
+    print("✈️ Traffic Simulator")
+    print("=" * 40)
+    for count in (100, 5000, 50000):
+        simulator = TrafficSimulator(count, seed=1)
+        started = time.perf_counter()
+        for _ in range(10):
+            simulator.step(5.0)
+        tick_ms = (time.perf_counter() - started) * 100.0
+        started = time.perf_counter()
+        simulator.batch()
+        batch_ms = (time.perf_counter() - started) * 1000.0
+        phases = np.bincount(simulator.phase, minlength=3)
+        print(f"  {count:>6} aircraft: {tick_ms:7.2f} ms/tick, FlightBatch in {batch_ms:6.2f} ms, "
+              + ", ".join(f"{name} {n}" for name, n in zip(PHASE_NAMES, phases)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Concurrent Flight Source Fetching
+Fans a bounding-box query out to every configured flight data provider at
+once over one pooled aiohttp session, so a refresh costs the slowest
+provider's latency instead of the sum of all of them.
+"""
+
+import asyncio
+import base64
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from utils.flight_batch import FLIGHT_FIELDS
+from utils.flight_merge import merge_flights
+from utils.quota_planner import QuotaPlanner
+from utils.response_cache import EXPIRED, MISS, STALE, ResponseCache, cache_key, snap_bbox
+
+FEET_PER_METER = 3.28084
+KNOTS_PER_MS = 1.943844
+KNOTS_PER_KMH = 0.539957
+
+# Seconds each provider gets before its request is abandoned
+DEFAULT_DEADLINES = {
+    'OpenSky': 10.0,
+    'AviationStack': 8.0,
+    'FlightAware': 8.0,
+    'RapidAPI': 6.0,
+}
+
+# Shared connection pool limits
+CONNECTOR_LIMIT = 32
+CONNECTOR_LIMIT_PER_HOST = 8
+
+Bbox = Sequence[float]  # [min_lat, min_lon, max_lat, max_lon]
+
+
+class FlightSource(NamedTuple):
+    """One provider request: where to send it and how to read the answer"""
+    name: str
+    url: str
+    params: Dict[str, Any]
+    headers: Dict[str, str]
+    parse: Callable[[Any], List[Dict[str, Any]]]
+    deadline: float
+
+
+def _epoch(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def _scaled(value: Any, factor: float) -> Optional[float]:
+    return None if value is None else float(value) * factor
+
+
+def _configured(value: Optional[str]) -> bool:
+    return bool(value) and not value.startswith('your_')
+
+
+def parse_opensky(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """OpenSky /states/all state vectors, converted from SI units to ft / kt / ft per minute"""
+    flights = []
+    for state in payload.get('states') or []:
+        flight = dict(zip(FLIGHT_FIELDS, state))
+        flight['callsign'] = (flight['callsign'] or '').strip() or None
+        flight['baro_altitude'] = _scaled(flight['baro_altitude'], FEET_PER_METER)
+        flight['geo_altitude'] = _scaled(flight['geo_altitude'], FEET_PER_METER)
+        flight['velocity'] = _scaled(flight['velocity'], KNOTS_PER_MS)
+        flight['vertical_rate'] = _scaled(flight['vertical_rate'], FEET_PER_METER * 60.0)
+        flight['last_position_update'] = flight['time_position'] or flight['last_contact']
+        flights.append(flight)
+    return flights
+
+
+def parse_aviationstack(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """AviationStack /flights entries that carry a live position"""
+    flights = []
+    for entry in payload.get('data') or []:
+        live = entry.get('live')
+        if not live:
+            continue
+        aircraft = entry.get('aircraft') or {}
+        flight_info = entry.get('flight') or {}
+        flights.append({
+            'icao24': (aircraft.get('icao24') or '').lower() or None,
+            'callsign': flight_info.get('icao') or flight_info.get('iata'),
+            'latitude': live.get('latitude'),
+            'longitude': live.get('longitude'),
+            'baro_altitude': _scaled(live.get('altitude'), FEET_PER_METER),
+            'velocity': _scaled(live.get('speed_horizontal'), KNOTS_PER_KMH),
+            'true_track': live.get('direction'),
+            'vertical_rate': _scaled(live.get('speed_vertical'), FEET_PER_METER * 1000.0 / 60.0),
+            'on_ground': bool(live.get('is_ground')),
+            'last_position_update': _epoch(live.get('updated')),
+            'origin': (entry.get('departure') or {}).get('iata'),
+            'destination': (entry.get('arrival') or {}).get('iata'),
+            'aircraft_type': aircraft.get('icao'),
+        })
+    return flights
+
+
+def parse_flightaware(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """FlightAware AeroAPI /flights/search results; positions carry no ICAO24 address"""
+    flights = []
+    for entry in payload.get('flights') or []:
+        position = entry.get('last_position')
+        if not position:
+            continue
+        flights.append({
+            'icao24': None,
+            'callsign': entry.get('ident'),
+            'latitude': position.get('latitude'),
+            'longitude': position.get('longitude'),
+            'baro_altitude': _scaled(position.get('altitude'), 100.0),  # hundreds of feet
+            'velocity': _scaled(position.get('groundspeed'), 1.0),
+            'true_track': position.get('heading'),
+            'vertical_rate': None,
+            'on_ground': False,
+            'last_position_update': _epoch(position.get('timestamp')),
+            'origin': (entry.get('origin') or {}).get('code_iata'),
+            'destination': (entry.get('destination') or {}).get('code_iata'),
+            'aircraft_type': entry.get('aircraft_type'),
+        })
+    return flights
+
+
+def parse_adsb_exchange(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """ADS-B Exchange style aircraft list as served through RapidAPI"""
+    now = (payload.get('now') or time.time() * 1000.0) / 1000.0
+    flights = []
+    for entry in payload.get('ac') or []:
+        altitude = entry.get('alt_baro')
+        on_ground = altitude == 'ground'
+        flights.append({
+            'icao24': (entry.get('hex') or '').lower() or None,
+            'callsign': (entry.get('flight') or '').strip() or None,
+            'latitude': entry.get('lat'),
+            'longitude': entry.get('lon'),
+            'baro_altitude': 0.0 if on_ground else _scaled(altitude, 1.0),
+            'velocity': _scaled(entry.get('gs'), 1.0),
+            'true_track': entry.get('track'),
+            'vertical_rate': _scaled(entry.get('baro_rate'), 1.0),
+            'on_ground': on_ground,
+            'squawk': entry.get('squawk'),
+            'last_position_update': now - float(entry.get('seen_pos') or 0.0),
+            'aircraft_type': entry.get('t'),
+        })
+    return flights
+
+
+def configured_sources(bbox: Optional[Bbox] = None, env: Optional[Dict[str, str]] = None,
+                       deadlines: Optional[Dict[str, float]] = None) -> List[FlightSource]:
+    """Sources whose credentials are present in the environment (OpenSky needs none)"""
+    env = os.environ if env is None else env
+    deadlines = dict(DEFAULT_DEADLINES, **(deadlines or {}))
+    sources = []
+
+    headers = {}
+    if _configured(env.get('OPENSKY_USERNAME')) and _configured(env.get('OPENSKY_PASSWORD')):
+        token = base64.b64encode(f"{env['OPENSKY_USERNAME']}:{env['OPENSKY_PASSWORD']}".encode()).decode()
+        headers['Authorization'] = f'Basic {token}'
+    params = {}
+    if bbox:
+        params = dict(zip(('lamin', 'lomin', 'lamax', 'lomax'), bbox))
+    sources.append(FlightSource('OpenSky', env.get('OPENSKY_BASE_URL', 'https://opensky-network.org/api') + '/states/all',
+                                params, headers, parse_opensky, deadlines['OpenSky']))
+
+    if _configured(env.get('AVIATIONSTACK_API_KEY')):
+        sources.append(FlightSource('AviationStack',
+                                    env.get('AVIATIONSTACK_BASE_URL', 'http://api.aviationstack.com/v1') + '/flights',
+                                    {'access_key': env['AVIATIONSTACK_API_KEY'], 'flight_status': 'active'},
+                                    {}, parse_aviationstack, deadlines['AviationStack']))
+
+    if _configured(env.get('FLIGHTAWARE_API_KEY')):
+        params = {}
+        if bbox:
+            params['query'] = '-latlong "{} {} {} {}"'.format(*bbox)
+        sources.append(FlightSource('FlightAware',
+                                    env.get('FLIGHTAWARE_BASE_URL', 'https://aeroapi.flightaware.com/aeroapi') + '/flights/search',
+                                    params, {'x-apikey': env['FLIGHTAWARE_API_KEY']},
+                                    parse_flightaware, deadlines['FlightAware']))
+
+    if _configured(env.get('RAPIDAPI_KEY')) and env.get('RAPIDAPI_HOST') and bbox:
+        # The host must serve the ADS-B Exchange lat/lon/dist endpoint
+        lat, lon = (bbox[0] + bbox[2]) / 2.0, (bbox[1] + bbox[3]) / 2.0
+        half_diagonal = math.hypot(bbox[2] - bbox[0], (bbox[3] - bbox[1]) * math.cos(math.radians(lat))) * 30.0
+        path = env.get('RAPIDAPI_FLIGHTS_PATH', '/v2/lat/{lat}/lon/{lon}/dist/{dist}/')
+        url = f"https://{env['RAPIDAPI_HOST']}" + path.format(lat=round(lat, 4), lon=round(lon, 4),
+                                                             dist=min(250, math.ceil(half_diagonal)))
+        sources.append(FlightSource('RapidAPI', url, {},
+                                    {'X-RapidAPI-Key': env['RAPIDAPI_KEY'], 'X-RapidAPI-Host': env['RAPIDAPI_HOST']},
+                                    parse_adsb_exchange, deadlines['RapidAPI']))
+    return sources
+
+
+def _inside(flight: Dict[str, Any], bbox: Bbox) -> bool:
+    # Flights without a position are kept; providers like AviationStack omit it
+    latitude, longitude = flight.get('latitude'), flight.get('longitude')
+    if latitude is None or longitude is None:
+        return True
+    return bbox[0] <= latitude <= bbox[2] and bbox[1] <= longitude <= bbox[3]
+
+
+class AsyncFlightAggregator:
+    """
+    Multi-source flight fetcher with the get_aggregated_flight_data interface.
+
+    Requests run on a private event loop thread that owns one aiohttp session,
+    so connections (and TLS handshakes) are reused across refreshes whether
+    the caller is synchronous or a coroutine on another loop. Each source has
+    its own deadline; whatever has arrived when the overall deadline passes is
+    returned, with a per-source status entry explaining what is missing.
+    Aircraft reported by several sources are merged into one record unless
+    dedupe is off.
+
+    With a ResponseCache, each source's parsed flights are cached per
+    (provider, bbox tile, endpoint): fresh entries skip the request, stale
+    ones are served while a refresh runs in the background. Queries are then
+    widened to whole cache tiles and the result is cut back to the bbox.
+
+    With a QuotaPlanner, every request (including background refreshes) must
+    be paid for from its provider's daily budget. Cached data stays in use
+    while the planner defers a refetch, even past the stale window (reported
+    with cache 'expired'); only sources with nothing cached are 'deferred'.
+    """
+
+    def __init__(self, sources_factory: Callable[[Optional[Bbox]], List[FlightSource]] = configured_sources,
+                 deadline: Optional[float] = None, connector_limit: int = CONNECTOR_LIMIT,
+                 limit_per_host: int = CONNECTOR_LIMIT_PER_HOST, dedupe: bool = True,
+                 cache: Optional[ResponseCache] = None, planner: Optional[QuotaPlanner] = None):
+        self.sources_factory = sources_factory
+        self.deadline = deadline
+        self.connector_limit = connector_limit
+        self.limit_per_host = limit_per_host
+        self.dedupe = dedupe
+        self.cache = cache
+        self.planner = planner
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='flight-fetch', daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.connector_limit, limit_per_host=self.limit_per_host,
+                                             ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def _fetch_source(self, source: FlightSource) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        started = time.perf_counter()
+        status = {'status': 'ok', 'count': 0, 'error': None}
+        flights: List[Dict[str, Any]] = []
+        try:
+            timeout = aiohttp.ClientTimeout(total=source.deadline)
+            async with self._get_session().get(source.url, params=source.params, headers=source.headers,
+                                               timeout=timeout) as response:
+                response.raise_for_status()
+                payload = await response.json(content_type=None)
+            flights = source.parse(payload)
+            for flight in flights:
+                flight['source'] = source.name
+            status['count'] = len(flights)
+        except asyncio.TimeoutError:
+            status.update(status='timeout', error=f'No response within {source.deadline:.1f}s')
+        except Exception as e:
+            status.update(status='error', error=str(e))
+        status['elapsed_ms'] = (time.perf_counter() - started) * 1000.0
+        return status, flights
+
+    async def _fetch_and_store(self, source: FlightSource, key) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        status, flights = await self._fetch_source(source)
+        if status['status'] == 'ok':
+            self.cache.store(key, flights)
+        return status, flights
+
+    async def _refresh_source(self, source: FlightSource, key):
+        status = {'status': 'error'}
+        try:
+            status, _ = await self._fetch_and_store(source, key)
+        finally:
+            self.cache.end_refresh(key, failed=status['status'] != 'ok')
+
+    def _allowed(self, source: FlightSource, key, priority: Optional[str]) -> bool:
+        return self.planner is None or self.planner.allow(source.name, key, priority)
+
+    async def _gather(self, sources: List[FlightSource], deadline: float,
+                      bbox: Optional[Bbox] = None) -> Dict[str, Any]:
+        flights: List[Dict[str, Any]] = []
+        source_status: Dict[str, Dict[str, Any]] = {}
+        tasks = {}
+        priority = self.planner.priority_for(bbox) if self.planner is not None else None
+        for source in sources:
+            key = cache_key(source.name, urlparse(source.url).path, bbox)
+            cached, state = self.cache.lookup(key) if self.cache is not None else (None, MISS)
+            if state == MISS:
+                if not self._allowed(source, key, priority):
+                    # Past the stale window, but old data beats none until the planner pays for a refetch
+                    cached = self.cache.lookup_expired(key) if self.cache is not None else None
+                    if cached is not None:
+                        flights.extend(dict(flight) for flight in cached)
+                        source_status[source.name] = {'status': 'ok', 'count': len(cached), 'error': None,
+                                                      'elapsed_ms': 0.0, 'cache': EXPIRED}
+                    else:
+                        source_status[source.name] = {'status': 'deferred', 'count': 0, 'elapsed_ms': 0.0,
+                                                      'error': 'Deferred by the quota planner', 'cache': state}
+                elif self.cache is None:
+                    tasks[asyncio.ensure_future(self._fetch_source(source))] = source
+                else:
+                    tasks[asyncio.ensure_future(self._fetch_and_store(source, key))] = source
+                continue
+            if (state == STALE and not self.cache.is_refreshing(key) and self._allowed(source, key, priority)
+                    and self.cache.begin_refresh(key)):
+                asyncio.ensure_future(self._refresh_source(source, key))
+            flights.extend(dict(flight) for flight in cached)
+            source_status[source.name] = {'status': 'ok', 'count': len(cached), 'error': None,
+                                          'elapsed_ms': 0.0, 'cache': state}
+
+        done, pending = await asyncio.wait(tasks, timeout=deadline) if tasks else (set(), set())
+        for task in pending:
+            task.cancel()
+
+        for task, source in tasks.items():
+            if task in done:
+                status, source_flights = task.result()
+                flights.extend(source_flights)
+            else:
+                status = {'status': 'timeout', 'count': 0, 'elapsed_ms': deadline * 1000.0,
+                          'error': f'Overall deadline of {deadline:.1f}s reached'}
+            if self.cache is not None:
+                status['cache'] = MISS
+            source_status[source.name] = status
+
+        unique = merge_flights(flights) if self.dedupe else flights
+        if self.cache is not None and bbox:
+            unique = [flight for flight in unique if _inside(flight, bbox)]
+        return {
+            'flights': unique,
+            'sources': [name for name, status in source_status.items() if status['status'] == 'ok'],
+            'source_status': source_status,
+            'timestamp': datetime.now().isoformat(),
+            'count': len(unique),
+            'raw_count': len(flights),
+        }
+
+    def _submit(self, bbox: Optional[Bbox], deadline: Optional[float]):
+        query = snap_bbox(bbox) if self.cache is not None else bbox
+        sources = self.sources_factory(query)
+        deadline = deadline or self.deadline or max((source.deadline for source in sources), default=0.0)
+        return asyncio.run_coroutine_threadsafe(self._gather(sources, deadline, bbox), self._ensure_loop())
+
+    async def fetch(self, bbox: Optional[Bbox] = None, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Coroutine form of get_aggregated_flight_data, usable from any event loop"""
+        return await asyncio.wrap_future(self._submit(bbox, deadline))
+
+    def get_aggregated_flight_data(self, bbox: Optional[Bbox] = None,
+                                   deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Query all configured sources concurrently and return what arrived in time"""
+        return self._submit(bbox, deadline).result()
+
+    def close(self):
+        """Close the pooled session and stop the loop thread"""
+        with self._lock:
+            if self._loop is None:
+                return
+            if self._session is not None:
+                asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+                self._session = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = self._thread = None
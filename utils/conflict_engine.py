@@ -0,0 +1,223 @@
+"""
+Vectorized Conflict Detection Engine
+Evaluates closest point of approach for every aircraft pair with NumPy
+instead of calling ConflictDetector.check_conflict once per pair.
+"""
+
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from utils.flight_batch import FlightBatch
+
+# Column layout of the state matrix consumed by the engine
+LAT, LON, ALT, SPEED, TRACK, VRATE = range(6)
+STATE_COLUMNS = ('latitude', 'longitude', 'baro_altitude', 'velocity', 'true_track', 'vertical_rate')
+
+# Severity codes, ordered so that a larger code is more severe
+SEVERITY_LEVELS = ('NONE', 'LOW', 'MEDIUM', 'HIGH', 'CRITICAL')
+
+# (severity, horizontal NM, vertical ft) - same thresholds as ConflictDetector
+SEVERITY_THRESHOLDS = (
+    ('CRITICAL', 3.0, 500.0),
+    ('HIGH', 5.0, 1000.0),
+    ('MEDIUM', 8.0, 1500.0),
+    ('LOW', 12.0, 2000.0),
+)
+
+NM_PER_DEG_LAT = 60.0
+DEFAULT_LOOKAHEAD_MINUTES = 10.0
+DEFAULT_CHUNK_PAIRS = 1 << 20
+
+
+def _field(flight: Any, name: str, default=None):
+    """Read a field from a FlightData-like object or a flight dict"""
+    if isinstance(flight, dict):
+        value = flight.get(name, default)
+    else:
+        value = getattr(flight, name, default)
+    return default if value is None else value
+
+
+def build_state_matrix(flights: Sequence[Any]) -> np.ndarray:
+    """Build the N x 6 state matrix (lat, lon, alt ft, speed kt, track deg, vrate ft/min)"""
+    if isinstance(flights, FlightBatch):
+        return flights.column_stack(STATE_COLUMNS)
+
+    state = np.empty((len(flights), len(STATE_COLUMNS)), dtype=np.float64)
+    for column, name in enumerate(STATE_COLUMNS):
+        default = np.nan if column in (LAT, LON, ALT) else 0.0
+        state[:, column] = [_field(flight, name, default) for flight in flights]
+    return state
+
+
+def evaluate_pairs(state: np.ndarray, i: np.ndarray, j: np.ndarray,
+                   lookahead_minutes: float = DEFAULT_LOOKAHEAD_MINUTES) -> Tuple[np.ndarray, ...]:
+    """
+    Compute closest point of approach for the pairs (i[k], j[k]).
+
+    Returns (time_to_cpa minutes, horizontal separation NM,
+    vertical separation ft, severity code) arrays, one entry per pair.
+    """
+    a = state[i]
+    b = state[j]
+
+    # Local flat-earth frame centred on each pair, in nautical miles
+    mean_lat = np.radians(0.5 * (a[:, LAT] + b[:, LAT]))
+    dlon = (b[:, LON] - a[:, LON] + 180.0) % 360.0 - 180.0
+    rx = dlon * NM_PER_DEG_LAT * np.cos(mean_lat)
+    ry = (b[:, LAT] - a[:, LAT]) * NM_PER_DEG_LAT
+    rz = b[:, ALT] - a[:, ALT]
+
+    # Relative velocity in NM/min and ft/min
+    track_a = np.radians(a[:, TRACK])
+    track_b = np.radians(b[:, TRACK])
+    vx = (b[:, SPEED] * np.sin(track_b) - a[:, SPEED] * np.sin(track_a)) / 60.0
+    vy = (b[:, SPEED] * np.cos(track_b) - a[:, SPEED] * np.cos(track_a)) / 60.0
+    vz = b[:, VRATE] - a[:, VRATE]
+
+    closing = vx * vx + vy * vy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_cpa = np.where(closing > 1e-12, -(rx * vx + ry * vy) / closing, 0.0)
+    t_cpa = np.clip(t_cpa, 0.0, lookahead_minutes)
+
+    horizontal = np.hypot(rx + vx * t_cpa, ry + vy * t_cpa)
+    vertical = np.abs(rz + vz * t_cpa)
+
+    severity = np.zeros(len(t_cpa), dtype=np.int8)
+    for code, (_, max_nm, max_ft) in zip(range(len(SEVERITY_THRESHOLDS), 0, -1), SEVERITY_THRESHOLDS):
+        hit = (severity == 0) & (horizontal < max_nm) & (vertical < max_ft)
+        severity[hit] = code
+
+    return t_cpa, horizontal, vertical, severity
+
+
+def _row_blocks(n: int, chunk_pairs: int):
+    """Yield (start, stop) row ranges whose upper-triangle pair count stays near chunk_pairs"""
+    start = 0
+    while start < n - 1:
+        stop = start + 1
+        pairs = n - stop
+        while stop < n - 1 and pairs + (n - stop - 1) <= chunk_pairs:
+            pairs += n - stop - 1
+            stop += 1
+        yield start, stop
+        start = stop
+
+
+def detect_conflicts(state: np.ndarray, lookahead_minutes: float = DEFAULT_LOOKAHEAD_MINUTES,
+                     pairs: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                     chunk_pairs: int = DEFAULT_CHUNK_PAIRS) -> Dict[str, np.ndarray]:
+    """
+    Find every conflicting pair in an N x 6 state matrix.
+
+    When pairs is None all N*(N-1)/2 pairs are evaluated in row blocks of
+    roughly chunk_pairs to bound memory. Rows with a NaN position are ignored.
+    """
+    state = np.asarray(state, dtype=np.float64)
+    valid = ~np.isnan(state[:, [LAT, LON, ALT]]).any(axis=1)
+    state = np.where(np.isnan(state), 0.0, state)
+
+    def all_pairs():
+        n = len(state)
+        cols = np.arange(n)
+        for start, stop in _row_blocks(n, chunk_pairs):
+            rows, block_j = np.nonzero(cols[None, :] > np.arange(start, stop)[:, None])
+            yield rows + start, block_j
+
+    if pairs is not None:
+        candidates = [(np.asarray(pairs[0], dtype=np.intp), np.asarray(pairs[1], dtype=np.intp))]
+    else:
+        candidates = all_pairs()
+
+    found = {'i': [], 'j': [], 'time_to_conflict': [], 'min_separation': [],
+             'vertical_separation': [], 'severity': []}
+    for block_i, block_j in candidates:
+        keep = valid[block_i] & valid[block_j]
+        block_i, block_j = block_i[keep], block_j[keep]
+        if not len(block_i):
+            continue
+
+        t_cpa, horizontal, vertical, severity = evaluate_pairs(state, block_i, block_j, lookahead_minutes)
+        hit = severity > 0
+        found['i'].append(block_i[hit])
+        found['j'].append(block_j[hit])
+        found['time_to_conflict'].append(t_cpa[hit])
+        found['min_separation'].append(horizontal[hit])
+        found['vertical_separation'].append(vertical[hit])
+        found['severity'].append(severity[hit])
+
+    dtypes = {'i': np.intp, 'j': np.intp, 'severity': np.int8}
+    return {
+        key: np.concatenate(values) if values else np.empty(0, dtype=dtypes.get(key, np.float64))
+        for key, values in found.items()
+    }
+
+
+class VectorizedConflictDetector:
+    """Drop-in replacement for ConflictDetector that evaluates all pairs at once"""
+
+    def __init__(self, lookahead_minutes: float = DEFAULT_LOOKAHEAD_MINUTES,
+                 chunk_pairs: int = DEFAULT_CHUNK_PAIRS, use_spatial_index: bool = True):
+        self.lookahead_minutes = lookahead_minutes
+        self.chunk_pairs = chunk_pairs
+        self.spatial_index = None
+
+        if use_spatial_index:
+            from utils.spatial_index import SpatialGrid
+            self.spatial_index = SpatialGrid(lookahead_minutes=lookahead_minutes)
+
+    def _airborne(self, flights: Sequence[Any]) -> Sequence[Any]:
+        if isinstance(flights, FlightBatch):
+            return flights.airborne()
+        return [flight for flight in flights if not _field(flight, 'on_ground', False)]
+
+    def _to_conflicts(self, flights: Sequence[Any], result: Dict[str, np.ndarray]) -> List[Dict]:
+        order = np.lexsort((result['time_to_conflict'], -result['severity'].astype(np.int16)))
+        conflicts = []
+        for k in order:
+            conflicts.append({
+                'flight1': flights[result['i'][k]],
+                'flight2': flights[result['j'][k]],
+                'severity': SEVERITY_LEVELS[result['severity'][k]],
+                'time_to_conflict': float(result['time_to_conflict'][k]),
+                'min_separation': float(result['min_separation'][k]),
+                'vertical_separation': float(result['vertical_separation'][k]),
+            })
+        return conflicts
+
+    def detect_all_conflicts(self, flights: Sequence[Any]) -> List[Dict]:
+        """Detect conflicts between all airborne flights, most severe first"""
+        flights = self._airborne(flights)
+        if len(flights) < 2:
+            return []
+
+        state = build_state_matrix(flights)
+        pairs = self._candidate_pairs(flights, state) if self.spatial_index is not None else None
+        result = detect_conflicts(state, self.lookahead_minutes, pairs=pairs, chunk_pairs=self.chunk_pairs)
+        return self._to_conflicts(flights, result)
+
+    def _candidate_pairs(self, flights: Sequence[Any], state: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Sync the spatial index with this snapshot and return neighbouring pairs"""
+        if isinstance(flights, FlightBatch):
+            keys = flights.icao24.tolist()
+        else:
+            keys = [_field(flight, 'icao24') for flight in flights]
+        if not all(keys) or len(set(keys)) != len(keys):
+            # Rows cannot be tracked across ticks without a unique icao24
+            self.spatial_index.clear()
+            keys = list(range(len(flights)))
+
+        valid = ~np.isnan(state[:, [LAT, LON, ALT]]).any(axis=1)
+        self.spatial_index.sync({
+            keys[row]: (state[row, LAT], state[row, LON], state[row, ALT], state[row, VRATE])
+            for row in np.flatnonzero(valid)
+        })
+        return self.spatial_index.candidate_index_pairs({key: row for row, key in enumerate(keys)})
+
+    def check_conflict(self, flight1: Any, flight2: Any) -> Optional[Dict]:
+        """Check a single pair, matching ConflictDetector.check_conflict"""
+        conflicts = self._to_conflicts(
+            [flight1, flight2],
+            detect_conflicts(build_state_matrix([flight1, flight2]), self.lookahead_minutes),
+        )
+        return conflicts[0] if conflicts else None
@@ -0,0 +1,476 @@
+"""
+Delta-Encoded Flight Streaming
+WebSocket broadcast that sends a periodic keyframe of all aircraft and, in
+between, only what was added, removed or changed since the previous tick.
+Positions are quantized to integer steps so small jitter is not re-sent and
+numbers stay short on the wire.
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import websockets
+
+from utils.region_router import TILE_DEGREES, Region, TileIndex
+from utils.stream_clients import POSITION_QUEUE_SIZE, SEND_TIMEOUT, ClientChannel
+from utils.wire_format import BinaryFrameEncoder, records_from_dicts
+
+# Fields carried per aircraft, keyed by icao24
+STREAM_FIELDS = ('callsign', 'latitude', 'longitude', 'baro_altitude', 'velocity', 'true_track',
+                 'vertical_rate', 'on_ground', 'aircraft_type', 'origin', 'destination')
+
+# Quantization step per numeric field; values travel as integer multiples of it
+QUANTIZATION = {
+    'latitude': 1e-4,       # ~11 m
+    'longitude': 1e-4,
+    'baro_altitude': 25.0,  # ft
+    'velocity': 1.0,        # kt
+    'true_track': 1.0,      # degrees
+    'vertical_rate': 64.0,  # ft/min
+}
+
+# Ticks between keyframes
+KEYFRAME_INTERVAL = 30
+
+PROTOCOLS = ('snapshot', 'delta', 'binary')
+
+
+def _env_number(name: str, default: float) -> float:
+    # .env values may carry a trailing "# comment"
+    return float(str(os.getenv(name, default)).split('#')[0].strip())
+
+
+def serialize(message: Dict[str, Any]) -> str:
+    """Compact JSON encoding used for every broadcast message"""
+    return json.dumps(message, separators=(',', ':'))
+
+
+class DeltaEncoder:
+    """
+    Turns successive flight snapshots into keyframe/delta messages.
+
+    Every message carries a sequence number; a delta also names the sequence
+    it applies to (base), so a client that missed one can tell and ask for a
+    resync. keyframe() re-encodes the last state at the current sequence.
+    """
+
+    def __init__(self, fields: Iterable[str] = STREAM_FIELDS, quantization: Optional[Dict[str, float]] = None,
+                 keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.fields = tuple(fields)
+        self.quantization = dict(QUANTIZATION if quantization is None else quantization)
+        self.keyframe_interval = keyframe_interval
+
+        self.seq = 0
+        self.timestamp = 0.0
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._frames = 0
+
+    def quantize(self, flight: Dict[str, Any]) -> Dict[str, Any]:
+        record = {}
+        for field in self.fields:
+            value = flight.get(field)
+            if value is None:
+                continue
+            # NaN and infinity are missing readings, like None
+            step = self.quantization.get(field)
+            if step:
+                value = float(value)
+                if not math.isfinite(value):
+                    continue
+                record[field] = int(round(value / step))
+            elif not (isinstance(value, float) and not math.isfinite(value)):
+                record[field] = value
+        return record
+
+    def _header(self, kind: str) -> Dict[str, Any]:
+        return {'type': kind, 'seq': self.seq, 'timestamp': self.timestamp}
+
+    def keyframe(self) -> Dict[str, Any]:
+        """Full state at the current sequence number"""
+        message = self._header('keyframe')
+        message['quantization'] = self.quantization
+        message['aircraft'] = self._state
+        return message
+
+    def encode(self, flights: Iterable[Dict[str, Any]], timestamp: Optional[float] = None,
+               seq: Optional[int] = None, keyframe: bool = False) -> Dict[str, Any]:
+        """
+        Advance one tick: a keyframe every keyframe_interval ticks (or when
+        asked), otherwise a delta against the previously encoded tick.
+        seq defaults to the previous sequence number plus one.
+        """
+        state = {}
+        for flight in flights:
+            icao24 = flight.get('icao24')
+            if icao24:
+                state[str(icao24).lower()] = self.quantize(flight)
+
+        previous, base = self._state, self.seq
+        self._state = state
+        self.seq = base + 1 if seq is None else seq
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self._frames += 1
+        if keyframe or self._frames % self.keyframe_interval == 1 or self.keyframe_interval == 1:
+            return self.keyframe()
+
+        added, changed = {}, {}
+        for icao24, record in state.items():
+            before = previous.get(icao24)
+            if before is None:
+                added[icao24] = record
+            elif before != record:
+                diff = {field: value for field, value in record.items() if before.get(field) != value}
+                diff.update((field, None) for field in before if field not in record)
+                changed[icao24] = diff
+
+        message = self._header('delta')
+        message['base'] = base
+        message['added'] = added
+        message['changed'] = changed
+        message['removed'] = [icao24 for icao24 in previous if icao24 not in state]
+        return message
+
+
+class DeltaDecoder:
+    """Client-side reassembly of a keyframe/delta stream"""
+
+    def __init__(self):
+        self.seq: Optional[int] = None
+        self.quantization: Dict[str, float] = {}
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self.needs_resync = True
+
+    def apply(self, message: Dict[str, Any]) -> bool:
+        """Apply one message; returns False (and sets needs_resync) when a delta does not follow on"""
+        if message['type'] == 'keyframe':
+            self.quantization = message['quantization']
+            self._state = {icao24: dict(record) for icao24, record in message['aircraft'].items()}
+            self.seq = message['seq']
+            self.needs_resync = False
+            return True
+
+        if message['type'] != 'delta' or self.needs_resync:
+            return False
+        if message['base'] != self.seq:
+            self.needs_resync = True
+            return False
+
+        for icao24 in message['removed']:
+            self._state.pop(icao24, None)
+        for icao24, record in message['added'].items():
+            self._state[icao24] = dict(record)
+        for icao24, diff in message['changed'].items():
+            record = self._state.setdefault(icao24, {})
+            for field, value in diff.items():
+                if value is None:
+                    record.pop(field, None)
+                else:
+                    record[field] = value
+        self.seq = message['seq']
+        return True
+
+    @property
+    def aircraft(self) -> Dict[str, Dict[str, Any]]:
+        """Current state with quantized fields scaled back to their units"""
+        return {icao24: {field: value * self.quantization[field] if field in self.quantization else value
+                         for field, value in record.items()}
+                for icao24, record in self._state.items()}
+
+
+def _request_path(websocket: Any) -> str:
+    request = getattr(websocket, 'request', None)
+    return getattr(request, 'path', None) or getattr(websocket, 'path', '/') or '/'
+
+
+class StreamFeed:
+    """
+    One selection of aircraft (all traffic, or one subscribed region) with
+    the encoders, cached payloads and clients that receive it.
+
+    Only protocols that currently have clients are encoded on publish; a
+    client joining a protocol that was idle gets a keyframe built on demand.
+    """
+
+    def __init__(self, keyframe_interval: int = KEYFRAME_INTERVAL, region: Optional[Region] = None):
+        self.region = region
+        self.encoder = DeltaEncoder(keyframe_interval=keyframe_interval)
+        self.binary = BinaryFrameEncoder(keyframe_interval=keyframe_interval)
+        self.clients: Dict[str, Dict[Any, ClientChannel]] = {protocol: {} for protocol in PROTOCOLS}
+
+        self.seq = 0
+        self.timestamp = 0.0
+        self.flights: List[Dict[str, Any]] = []
+        self._cache: Dict[str, Tuple[int, Any]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(clients) for clients in self.clients.values())
+
+    def channels(self) -> Iterable[Tuple[str, Any, ClientChannel]]:
+        for protocol, clients in self.clients.items():
+            for websocket, channel in clients.items():
+                yield protocol, websocket, channel
+
+    def _cached(self, protocol: str, build: Callable[[], Any]) -> Any:
+        seq, payload = self._cache.get(protocol, (-1, None))
+        if seq != self.seq or payload is None:
+            payload = build()
+            self._cache[protocol] = (self.seq, payload)
+        return payload
+
+    def _delta_keyframe(self) -> str:
+        if self.encoder.seq != self.seq:
+            self.encoder.encode(self.flights, self.timestamp, self.seq, keyframe=True)
+        return serialize(self.encoder.keyframe())
+
+    def _binary_keyframe(self) -> bytes:
+        if self.binary.seq != self.seq:
+            self.binary.encode(records_from_dicts(self.flights), self.seq, self.timestamp, keyframe=True)
+        return self.binary.keyframe()
+
+    def _snapshot(self) -> str:
+        return serialize({'type': 'snapshot', 'seq': self.seq, 'timestamp': self.timestamp, 'flights': self.flights})
+
+    def catch_up(self, protocol: str) -> Any:
+        """Self-contained payload of the current state for a joining or lagging client"""
+        if protocol == 'delta':
+            return self._cached('delta', self._delta_keyframe)
+        if protocol == 'binary':
+            return self._cached('binary', self._binary_keyframe)
+        return self._cached('snapshot', self._snapshot)
+
+    def publish(self, flights: List[Dict[str, Any]], seq: int, timestamp: float):
+        """Encode this tick once per active protocol and queue it for every client"""
+        self.flights, self.seq, self.timestamp = flights, seq, timestamp
+
+        if self.clients['delta']:
+            message = self.encoder.encode(flights, timestamp, seq)
+            payload = serialize(message)
+            if message['type'] == 'keyframe':
+                self._cache['delta'] = (seq, payload)
+            for channel in self.clients['delta'].values():
+                channel.offer(payload)
+        if self.clients['snapshot']:
+            payload = self.catch_up('snapshot')
+            for channel in self.clients['snapshot'].values():
+                channel.offer(payload)
+        if self.clients['binary']:
+            frame = self.binary.encode(records_from_dicts(flights), seq, timestamp)
+            for channel in self.clients['binary'].values():
+                channel.offer(frame)
+
+
+class DeltaStreamer:
+    """
+    WebSocket server broadcasting flight updates on ws://host:port.
+
+    Clients choose a protocol with ?protocol=delta (JSON keyframes/deltas) or
+    ?protocol=binary (the same scheme in packed frames, see wire_format);
+    without it they keep receiving full JSON snapshots as before. Each tick
+    every message is serialized once per protocol and the same payload is
+    queued for all clients of that protocol. Clients send {"type": "resync"}
+    to get a keyframe.
+
+    A client can narrow its feed with {"type": "subscribe", "bbox": [...],
+    "altitude": [min_ft, max_ft]} and widen it again with
+    {"type": "unsubscribe"}. Clients with the same region share one feed, and
+    regions are cut from a per-tick tile index, so encoding work follows what
+    clients view rather than total traffic.
+
+    Every client has its own bounded ClientChannel, so a slow consumer only
+    loses its own intermediate updates; conflict alerts from broadcast_alert
+    are never dropped, and clients stuck in send are disconnected.
+    """
+
+    def __init__(self, fetch_flights: Callable[[], Any], host: str = 'localhost', port: Optional[int] = None,
+                 interval: Optional[float] = None, keyframe_interval: int = KEYFRAME_INTERVAL,
+                 queue_size: int = POSITION_QUEUE_SIZE, send_timeout: float = SEND_TIMEOUT,
+                 tile_degrees: float = TILE_DEGREES):
+        self.fetch_flights = fetch_flights
+        self.host = host
+        self.port = int(_env_number('WEBSOCKET_PORT', 8765)) if port is None else port
+        self.interval = _env_number('UPDATE_INTERVAL', 2) if interval is None else interval
+        self.keyframe_interval = keyframe_interval
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.tile_degrees = tile_degrees
+
+        self.feed = StreamFeed(keyframe_interval)
+        self.regions: Dict[Region, StreamFeed] = {}
+        self._feed_of: Dict[Any, StreamFeed] = {}
+        self._tile_index: Tuple[int, Optional[TileIndex]] = (-1, None)
+
+        self.seq = 0
+        self.stats = {'ticks': 0, 'resyncs': 0, 'alerts': 0, 'subscriptions': 0, 'tick_ms': 0.0}
+        # Counters of clients that have already gone
+        self._retired = {'clients': 0, 'sent': 0, 'bytes_sent': 0, 'dropped': 0, 'slow_disconnects': 0}
+        self._server = None
+
+    def feeds(self) -> List[StreamFeed]:
+        return [self.feed] + list(self.regions.values())
+
+    def _index(self) -> TileIndex:
+        seq, index = self._tile_index
+        if seq != self.seq or index is None:
+            index = TileIndex(self.feed.flights, self.tile_degrees)
+            self._tile_index = (self.seq, index)
+        return index
+
+    def attach(self, websocket: Any, protocol: str) -> ClientChannel:
+        """Register a client on the global feed and start its writer"""
+        channel = ClientChannel(websocket, lambda: self._feed_of[websocket].catch_up(protocol),
+                                self.queue_size, send_timeout=self.send_timeout)
+        if protocol == 'snapshot':
+            channel.catch_up = None  # every snapshot is self-contained
+        self.feed.clients[protocol][websocket] = channel
+        self._feed_of[websocket] = self.feed
+        channel.start()
+        if self.seq:
+            channel.replace(self.feed.catch_up(protocol))
+        return channel
+
+    def detach(self, websocket: Any, protocol: str):
+        feed = self._feed_of.pop(websocket)
+        channel = feed.clients[protocol].pop(websocket)
+        self._drop_if_idle(feed)
+        self._retire(channel)
+
+    def subscribe(self, websocket: Any, protocol: str, region: Optional[Region]):
+        """Move a client to the feed of region (None for all traffic) and send it a keyframe"""
+        previous = self._feed_of[websocket]
+        channel = previous.clients[protocol].pop(websocket)
+        feed = self.feed
+        if region is not None:
+            feed = self.regions.get(region)
+            if feed is None:
+                feed = self.regions[region] = StreamFeed(self.keyframe_interval, region)
+                if self.seq:
+                    feed.flights, feed.seq, feed.timestamp = (self._index().select(region), self.seq,
+                                                              self.feed.timestamp)
+        feed.clients[protocol][websocket] = channel
+        self._feed_of[websocket] = feed
+        self._drop_if_idle(previous)
+        self.stats['subscriptions'] += 1
+        if self.seq:
+            channel.replace(feed.catch_up(protocol))
+
+    def _drop_if_idle(self, feed: StreamFeed):
+        if feed.region is not None and not len(feed):
+            self.regions.pop(feed.region, None)
+
+    async def _handler(self, websocket: Any, *_):
+        query = parse_qs(urlparse(_request_path(websocket)).query)
+        protocol = query.get('protocol', ['snapshot'])[0]
+        if protocol not in PROTOCOLS:
+            await websocket.close(1008, f'Unknown protocol {protocol}')
+            return
+
+        channel = self.attach(websocket, protocol)
+        try:
+            async for raw in websocket:
+                try:
+                    request = json.loads(raw)
+                except (TypeError, ValueError):
+                    continue
+                if not isinstance(request, dict):
+                    continue
+                kind = request.get('type')
+                if kind == 'resync' and protocol != 'snapshot':
+                    self.stats['resyncs'] += 1
+                    channel.replace(self._feed_of[websocket].catch_up(protocol))
+                elif kind in ('subscribe', 'unsubscribe'):
+                    try:
+                        region = Region.from_message(request) if kind == 'subscribe' else None
+                    except (TypeError, ValueError) as e:
+                        channel.offer_alert(serialize({'type': 'error', 'request': kind, 'error': str(e)}))
+                        continue
+                    self.subscribe(websocket, protocol, region)
+        finally:
+            self.detach(websocket, protocol)
+
+    def _retire(self, channel: ClientChannel):
+        slow = channel.closed
+        channel.disconnect('connection closed', abort=False)
+        self._retired['clients'] += 1
+        self._retired['slow_disconnects'] += int(slow)
+        for key in ('sent', 'bytes_sent', 'dropped'):
+            self._retired[key] += channel.metrics[key]
+
+    async def _fetch(self) -> List[Dict[str, Any]]:
+        if asyncio.iscoroutinefunction(self.fetch_flights):
+            result = self.fetch_flights()
+        else:
+            # A blocking fetch runs on a worker thread so client sends keep flowing
+            result = await asyncio.get_running_loop().run_in_executor(None, self.fetch_flights)
+        if asyncio.iscoroutine(result):
+            result = await result
+        if isinstance(result, dict):
+            result = result.get('flights', [])
+        return list(result or [])
+
+    async def tick(self):
+        """Fetch once, then encode each feed once per active protocol and queue it for its clients"""
+        flights = await self._fetch()
+        started = time.perf_counter()
+        self.seq += 1
+        timestamp = time.time()
+
+        self.feed.publish(flights, self.seq, timestamp)
+        if self.regions:
+            index = self._index()
+            for region, feed in self.regions.items():
+                feed.publish(index.select(region), self.seq, timestamp)
+        self.stats['ticks'] += 1
+        self.stats['tick_ms'] = (time.perf_counter() - started) * 1000.0
+
+    def broadcast_alert(self, alert: Dict[str, Any]):
+        """Send a critical alert (e.g. a conflict) to every client; alerts are never dropped"""
+        payload = serialize(dict(alert, type='alert', seq=self.seq, timestamp=time.time()))
+        for feed in self.feeds():
+            for _, _, channel in feed.channels():
+                channel.offer_alert(payload)
+        self.stats['alerts'] += 1
+
+    def client_metrics(self) -> List[Dict[str, Any]]:
+        """Queue depth, drops and send counters of every connected client"""
+        return [dict(channel.snapshot_metrics(), protocol=protocol, region=feed.region,
+                     aircraft=len(feed.flights), remote=str(getattr(websocket, 'remote_address', '')))
+                for feed in self.feeds() for protocol, websocket, channel in feed.channels()]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Server-wide totals including clients that already disconnected"""
+        connected = self.client_metrics()
+        totals = dict(self.stats, connected_clients=len(connected), regions=len(self.regions), **self._retired)
+        for key in ('sent', 'bytes_sent', 'dropped'):
+            totals[key] += sum(client[key] for client in connected)
+        totals['max_queue_depth'] = max((client['queue_depth'] for client in connected), default=0)
+        return totals
+
+    async def start(self):
+        """Start listening; with port 0 the chosen port is stored back in self.port"""
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def run(self):
+        """Serve and tick every interval seconds until cancelled"""
+        await self.start()
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    await self.tick()
+                except Exception as e:
+                    print(f"Streaming tick failed: {e}")
+                await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        finally:
+            await self.stop()
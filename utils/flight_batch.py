@@ -0,0 +1,245 @@
+"""
+Columnar Flight Container
+Holds a whole snapshot of aircraft in contiguous NumPy arrays instead of
+one 17-field FlightData object per aircraft.
+"""
+
+import math
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+# FlightData field order, which is also the OpenSky state vector order
+FLIGHT_FIELDS = (
+    'icao24', 'callsign', 'origin_country', 'time_position', 'last_contact',
+    'longitude', 'latitude', 'baro_altitude', 'on_ground', 'velocity',
+    'true_track', 'vertical_rate', 'sensors', 'geo_altitude', 'squawk',
+    'spi', 'position_source',
+)
+
+FLOAT_FIELDS = ('time_position', 'last_contact', 'longitude', 'latitude', 'baro_altitude',
+                'velocity', 'true_track', 'vertical_rate', 'geo_altitude')
+BOOL_FIELDS = ('on_ground', 'spi')
+OBJECT_FIELDS = ('callsign', 'origin_country', 'sensors', 'squawk')
+
+# Demo and aggregated feeds report the position timestamp under this key
+_FALLBACK_KEYS = {'time_position': 'last_position_update', 'last_contact': 'last_position_update'}
+
+
+def _optional(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class FlightRow:
+    """Lightweight view of one aircraft in a FlightBatch, API-compatible with FlightData"""
+
+    __slots__ = ('_batch', '_index')
+
+    def __init__(self, batch: 'FlightBatch', index: int):
+        self._batch = batch
+        self._index = index
+
+    @property
+    def icao24(self) -> str:
+        return str(self._batch.icao24[self._index])
+
+    @property
+    def callsign(self) -> Optional[str]:
+        return self._batch.callsign[self._index]
+
+    @property
+    def origin_country(self) -> Optional[str]:
+        return self._batch.origin_country[self._index]
+
+    @property
+    def time_position(self) -> Optional[int]:
+        value = self._batch.time_position[self._index]
+        return None if math.isnan(value) else int(value)
+
+    @property
+    def last_contact(self) -> Optional[int]:
+        value = self._batch.last_contact[self._index]
+        return None if math.isnan(value) else int(value)
+
+    @property
+    def longitude(self) -> Optional[float]:
+        return _optional(float(self._batch.longitude[self._index]))
+
+    @property
+    def latitude(self) -> Optional[float]:
+        return _optional(float(self._batch.latitude[self._index]))
+
+    @property
+    def baro_altitude(self) -> Optional[float]:
+        return _optional(float(self._batch.baro_altitude[self._index]))
+
+    @property
+    def on_ground(self) -> bool:
+        return bool(self._batch.on_ground[self._index])
+
+    @property
+    def velocity(self) -> Optional[float]:
+        return _optional(float(self._batch.velocity[self._index]))
+
+    @property
+    def true_track(self) -> Optional[float]:
+        return _optional(float(self._batch.true_track[self._index]))
+
+    @property
+    def vertical_rate(self) -> Optional[float]:
+        return _optional(float(self._batch.vertical_rate[self._index]))
+
+    @property
+    def sensors(self) -> Optional[List[int]]:
+        return self._batch.sensors[self._index]
+
+    @property
+    def geo_altitude(self) -> Optional[float]:
+        return _optional(float(self._batch.geo_altitude[self._index]))
+
+    @property
+    def squawk(self) -> Optional[str]:
+        return self._batch.squawk[self._index]
+
+    @property
+    def spi(self) -> bool:
+        return bool(self._batch.spi[self._index])
+
+    @property
+    def position_source(self) -> int:
+        return int(self._batch.position_source[self._index])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict with the FlightData fields"""
+        return {name: getattr(self, name) for name in FLIGHT_FIELDS}
+
+    def __repr__(self) -> str:
+        return f"FlightRow(icao24={self.icao24!r}, callsign={self.callsign!r})"
+
+
+class FlightBatch:
+    """Snapshot of N aircraft stored as one NumPy array per FlightData field"""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        size = len(columns['icao24'])
+        for name in FLIGHT_FIELDS:
+            column = columns.get(name)
+            if column is None:
+                column = self._empty_column(name, size)
+            elif len(column) != size:
+                raise ValueError(f"Column '{name}' has {len(column)} rows, expected {size}")
+            setattr(self, name, column)
+
+    @staticmethod
+    def _empty_column(name: str, size: int) -> np.ndarray:
+        if name in FLOAT_FIELDS:
+            return np.full(size, np.nan)
+        if name in BOOL_FIELDS:
+            return np.zeros(size, dtype=bool)
+        if name == 'position_source':
+            return np.zeros(size, dtype=np.int8)
+        return np.full(size, None, dtype=object)
+
+    @staticmethod
+    def _column(name: str, values: Sequence[Any]) -> np.ndarray:
+        """Convert raw column values once, with None becoming NaN/False/0 (an empty icao24)"""
+        if name == 'icao24':
+            return np.array(['' if value is None else str(value) for value in values], dtype=str)
+        if name in FLOAT_FIELDS:
+            return np.array(values, dtype=np.float64)
+        if name in BOOL_FIELDS:
+            return np.array([bool(value) for value in values], dtype=bool)
+        if name == 'position_source':
+            return np.array([value or 0 for value in values], dtype=np.int8)
+
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+
+    @classmethod
+    def from_dicts(cls, flights: Sequence[Dict[str, Any]]) -> 'FlightBatch':
+        """Build a batch from flight dicts as returned by the API manager or demo data"""
+        columns = {}
+        for name in FLIGHT_FIELDS:
+            fallback = _FALLBACK_KEYS.get(name)
+            if fallback:
+                values = [flight.get(name, flight.get(fallback)) for flight in flights]
+            else:
+                values = [flight.get(name) for flight in flights]
+            columns[name] = cls._column(name, values)
+        return cls(columns)
+
+    @classmethod
+    def from_flights(cls, flights: Sequence[Any]) -> 'FlightBatch':
+        """Build a batch from FlightData objects"""
+        return cls({name: cls._column(name, [getattr(flight, name, None) for flight in flights])
+                    for name in FLIGHT_FIELDS})
+
+    @classmethod
+    def from_state_vectors(cls, states: Sequence[Sequence[Any]]) -> 'FlightBatch':
+        """
+        Build a batch straight from OpenSky state vectors (FlightData field order);
+        vectors missing trailing optional fields are padded with None
+        """
+        if not states:
+            return cls.empty()
+        width = len(FLIGHT_FIELDS)
+        table = np.full((len(states), width), None, dtype=object)
+        for row, state in enumerate(states):
+            for column, value in enumerate(state[:width]):
+                table[row, column] = value
+        return cls({name: cls._column(name, table[:, position]) for position, name in enumerate(FLIGHT_FIELDS)})
+
+    @classmethod
+    def empty(cls) -> 'FlightBatch':
+        return cls({'icao24': np.empty(0, dtype=str)})
+
+    def __len__(self) -> int:
+        return len(self.icao24)
+
+    def __iter__(self) -> Iterator[FlightRow]:
+        for index in range(len(self)):
+            yield FlightRow(self, index)
+
+    def __getitem__(self, key: Union[int, slice, np.ndarray]) -> Union[FlightRow, 'FlightBatch']:
+        if isinstance(key, (int, np.integer)):
+            index = int(key)
+            if index < 0:
+                index += len(self)
+            if not 0 <= index < len(self):
+                raise IndexError(f"FlightBatch index {key} out of range")
+            return FlightRow(self, index)
+        return FlightBatch({name: getattr(self, name)[key] for name in FLIGHT_FIELDS})
+
+    def select(self, mask: np.ndarray) -> 'FlightBatch':
+        """Subset by boolean mask or index array"""
+        return self[np.asarray(mask)]
+
+    def has_position(self) -> np.ndarray:
+        """Mask of aircraft with latitude, longitude and barometric altitude"""
+        return ~(np.isnan(self.latitude) | np.isnan(self.longitude) | np.isnan(self.baro_altitude))
+
+    def has_icao24(self) -> np.ndarray:
+        """Mask of aircraft reported with an icao24"""
+        return self.icao24 != ''
+
+    def with_position(self) -> 'FlightBatch':
+        """Aircraft that can be placed and told apart: a position and an icao24"""
+        return self.select(self.has_position() & self.has_icao24())
+
+    def airborne(self) -> 'FlightBatch':
+        return self.select(~self.on_ground)
+
+    def column_stack(self, names: Sequence[str], dtype=np.float64) -> np.ndarray:
+        """N x len(names) matrix of numeric columns"""
+        return np.column_stack([getattr(self, name) for name in names]).astype(dtype, copy=False)
+
+    def index_of(self) -> Dict[str, int]:
+        """Map icao24 to row; later rows win on duplicates"""
+        return {icao24: row for row, icao24 in enumerate(self.icao24.tolist())}
+
+    def to_columns(self, names: Sequence[str] = FLIGHT_FIELDS) -> Dict[str, np.ndarray]:
+        """Column dict, e.g. for pd.DataFrame or the Plotly map layer"""
+        return {name: getattr(self, name) for name in names}
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [row.to_dict() for row in self]
@@ -0,0 +1,155 @@
+"""
+Multi-Source Flight Merge
+Collapses overlapping reports of the same aircraft from several providers
+into one record per ICAO24 address and tracks which aircraft changed.
+"""
+
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set
+
+# Most trusted first; descriptive fields are taken from the first source that has them
+SOURCE_PRIORITY = ('OpenSky', 'RapidAPI', 'FlightAware', 'AviationStack', 'Demo')
+
+# Position and motion come as a set from whichever report is freshest
+KINEMATIC_FIELDS = ('latitude', 'longitude', 'baro_altitude', 'geo_altitude', 'velocity', 'true_track',
+                    'vertical_rate', 'on_ground', 'time_position', 'last_contact', 'last_position_update')
+
+# Aircraft not reported by any source for this long are dropped
+STALE_AFTER_SECONDS = 60.0
+
+_NEVER = float('-inf')
+
+
+def report_time(flight: Dict[str, Any]) -> float:
+    """Position timestamp of a report (last_position_update, then time_position, then last_contact)"""
+    for field in ('last_position_update', 'time_position', 'last_contact'):
+        value = flight.get(field)
+        if value is not None:
+            return float(value)
+    return _NEVER
+
+
+def _callsign(flight: Dict[str, Any]) -> Optional[str]:
+    callsign = flight.get('callsign')
+    return callsign.strip().upper() or None if isinstance(callsign, str) else None
+
+
+class MergeUpdate(NamedTuple):
+    """Fused records that changed in one update, and keys of aircraft that expired"""
+    changed: List[Dict[str, Any]]
+    removed: List[str]
+
+
+class FlightMerger:
+    """
+    Incremental ICAO24-keyed merge of provider reports.
+
+    The latest report of every source is kept per aircraft; the fused record
+    takes position and motion from the freshest report and every other field
+    from the highest-priority source that has it. Reports without an ICAO24
+    address (FlightAware) are matched on callsign. update() returns only the
+    aircraft whose fused record actually changed.
+    """
+
+    def __init__(self, source_priority: Sequence[str] = SOURCE_PRIORITY,
+                 stale_after: float = STALE_AFTER_SECONDS):
+        self._rank = {source: rank for rank, source in enumerate(source_priority)}
+        self.stale_after = stale_after
+
+        self.aircraft: Dict[str, Dict[str, Any]] = {}
+        self._reports: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._seen: Dict[str, float] = {}
+        self._callsign_keys: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.aircraft)
+
+    def _source_rank(self, source: Optional[str]) -> int:
+        return self._rank.get(source, len(self._rank))
+
+    def _key(self, flight: Dict[str, Any], removed: List[str], touched: Set[str]) -> Optional[str]:
+        icao24 = flight.get('icao24')
+        callsign = _callsign(flight)
+        if icao24:
+            key = str(icao24).lower()
+            if callsign:
+                # Adopt reports that arrived earlier under the callsign alone
+                orphan = f'callsign:{callsign}'
+                if orphan in self._reports and orphan != key:
+                    self._reports.setdefault(key, {}).update(self._reports.pop(orphan))
+                    self._seen.pop(orphan, None)
+                    touched.discard(orphan)
+                    if self.aircraft.pop(orphan, None) is not None:
+                        removed.append(orphan)
+                self._callsign_keys[callsign] = key
+            return key
+        if callsign:
+            return self._callsign_keys.setdefault(callsign, f'callsign:{callsign}')
+        return None
+
+    def _fuse(self, key: str) -> Dict[str, Any]:
+        reports = self._reports[key]
+        by_priority = sorted(reports, key=self._source_rank)
+        freshest = max(by_priority, key=lambda source: report_time(reports[source]))
+
+        fused: Dict[str, Any] = {}
+        for source in reversed(by_priority):
+            fused.update((field, value) for field, value in reports[source].items() if value is not None)
+        for field in KINEMATIC_FIELDS:
+            if field in reports[freshest]:
+                fused[field] = reports[freshest][field]
+        if not key.startswith('callsign:'):
+            fused['icao24'] = key
+        fused['source'] = freshest
+        fused['sources'] = by_priority
+        return fused
+
+    def update(self, flights: Iterable[Dict[str, Any]], now: Optional[float] = None) -> MergeUpdate:
+        """Fold a batch of reports in; returns the changed fused records and expired keys"""
+        now = time.time() if now is None else now
+        removed: List[str] = []
+        touched: Set[str] = set()
+
+        for flight in flights:
+            key = self._key(flight, removed, touched)
+            if key is None:
+                continue
+            reports = self._reports.setdefault(key, {})
+            source = flight.get('source', 'Unknown')
+            previous = reports.get(source)
+            if previous is not None and report_time(previous) > report_time(flight):
+                continue  # out-of-order report from the same source
+            reports[source] = flight
+            self._seen[key] = now
+            touched.add(key)
+
+        changed = []
+        for key in touched:
+            fused = self._fuse(key)
+            if self.aircraft.get(key) != fused:
+                self.aircraft[key] = fused
+                changed.append(fused)
+
+        for key in [key for key, seen in self._seen.items() if now - seen > self.stale_after]:
+            removed.append(key)
+            self._forget(key)
+        return MergeUpdate(changed, removed)
+
+    def _forget(self, key: str):
+        self.aircraft.pop(key, None)
+        self._reports.pop(key, None)
+        self._seen.pop(key, None)
+        for callsign in [callsign for callsign, target in self._callsign_keys.items() if target == key]:
+            del self._callsign_keys[callsign]
+
+    def flights(self) -> List[Dict[str, Any]]:
+        """Current fused record of every tracked aircraft"""
+        return list(self.aircraft.values())
+
+
+def merge_flights(flights: Iterable[Dict[str, Any]],
+                  source_priority: Sequence[str] = SOURCE_PRIORITY) -> List[Dict[str, Any]]:
+    """One-shot dedup of an aggregated flight list, one fused record per aircraft"""
+    merger = FlightMerger(source_priority)
+    merger.update(flights)
+    return merger.flights()
@@ -0,0 +1,108 @@
+"""
+Vectorized Great-Circle Distances
+Array-broadcasting haversine variants of TrajectoryCalculator.calculate_distance
+and a cached distance table for the static airport set.
+"""
+
+import numpy as np
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+EARTH_RADIUS_NM = 3440.065
+
+# Static airport set used for airport-proximity features and approach sequencing
+AIRPORTS = {
+    'JFK': (40.6413, -73.7781),
+    'LAX': (33.9425, -118.4081),
+    'ORD': (41.9796, -87.9045),
+    'ATL': (33.6407, -84.4277),
+    'DFW': (32.8968, -97.0380),
+    'DEN': (39.8561, -104.6737),
+    'LHR': (51.4700, -0.4543),
+    'CDG': (49.0097, 2.5479),
+    'NRT': (35.7720, 140.3929),
+    'SYD': (-33.9399, 151.1753),
+    'SIN': (1.3644, 103.9915),
+}
+AIRPORT_CODES = tuple(AIRPORTS)
+
+# Positions are snapped to this many steps per degree for the cached table
+# (0.01 deg is about 0.6 NM)
+FIXED_POINT_SCALE = 100
+
+
+class PreparedPoints(NamedTuple):
+    """Positions with radians and cos(latitude) computed once per batch"""
+    lat: np.ndarray
+    lon: np.ndarray
+    cos_lat: np.ndarray
+
+
+def prepare_points(latitudes, longitudes) -> PreparedPoints:
+    """Convert degree arrays once so repeated distance calls skip the trig setup"""
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    return PreparedPoints(lat, lon, np.cos(lat))
+
+
+def _haversine(a: PreparedPoints, b: PreparedPoints) -> np.ndarray:
+    """Haversine on broadcast-compatible prepared points, in nautical miles"""
+    sin_dlat = np.sin((b.lat - a.lat) * 0.5)
+    sin_dlon = np.sin((b.lon - a.lon) * 0.5)
+    h = sin_dlat * sin_dlat + a.cos_lat * b.cos_lat * sin_dlon * sin_dlon
+    return 2.0 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def haversine_paired(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Element-wise distance between two equally shaped position arrays (NM)"""
+    return _haversine(prepare_points(lat1, lon1), prepare_points(lat2, lon2))
+
+
+def haversine_one_to_many(lat, lon, latitudes, longitudes) -> np.ndarray:
+    """Distance from one position to each of many positions (NM)"""
+    return _haversine(prepare_points(lat, lon), prepare_points(latitudes, longitudes))
+
+
+def haversine_pairwise(a: PreparedPoints, b: PreparedPoints = None) -> np.ndarray:
+    """len(a) x len(b) distance matrix (NM); b defaults to a"""
+    b = a if b is None else b
+    column = PreparedPoints(a.lat[:, None], a.lon[:, None], a.cos_lat[:, None])
+    row = PreparedPoints(b.lat[None, :], b.lon[None, :], b.cos_lat[None, :])
+    return _haversine(column, row)
+
+
+_AIRPORT_POINTS = prepare_points([AIRPORTS[code][0] for code in AIRPORT_CODES],
+                                 [AIRPORTS[code][1] for code in AIRPORT_CODES])
+
+
+def airport_distances(latitudes, longitudes) -> np.ndarray:
+    """N x len(AIRPORT_CODES) distances from each position to every airport (NM)"""
+    points = prepare_points(np.atleast_1d(latitudes), np.atleast_1d(longitudes))
+    return haversine_pairwise(points, _AIRPORT_POINTS)
+
+
+def nearest_airport(latitudes, longitudes) -> Tuple[np.ndarray, np.ndarray]:
+    """Index into AIRPORT_CODES and distance (NM) of the closest airport per position"""
+    distances = airport_distances(latitudes, longitudes)
+    index = distances.argmin(axis=1)
+    return index, distances[np.arange(len(index)), index]
+
+
+@lru_cache(maxsize=65536)
+def _fixed_point_airport_distances(lat_key: int, lon_key: int) -> Tuple[float, ...]:
+    distances = airport_distances(lat_key / FIXED_POINT_SCALE, lon_key / FIXED_POINT_SCALE)
+    return tuple(distances[0].tolist())
+
+
+def cached_airport_distances(latitude: float, longitude: float) -> Tuple[float, ...]:
+    """
+    Distances to every airport for a single position, snapped to the
+    fixed-point grid and served from an LRU cache.
+    """
+    return _fixed_point_airport_distances(int(round(latitude * FIXED_POINT_SCALE)),
+                                          int(round(longitude * FIXED_POINT_SCALE)))
+
+
+def airport_distance_cache_info():
+    """Hit/miss statistics of the fixed-point airport table"""
+    return _fixed_point_airport_distances.cache_info()
@@ -0,0 +1,208 @@
+"""
+API Quota Planner
+Token buckets that spread each provider's daily request quota over the
+day, with a reserve kept for regions that currently show conflicts and
+batched weather lookups, so the quota lasts the whole day instead of
+running out by noon.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Sequence
+
+# Requests per UTC day on the free tiers
+DAILY_QUOTAS = {
+    'OpenSky': 400,
+    'OpenWeatherMap': 1000,
+}
+
+# Tokens a bucket can bank, as seconds of its current refill rate
+BURST_SECONDS = 900.0
+
+# Share of the bucket only conflict-priority requests may spend
+CONFLICT_RESERVE = 0.25
+
+# Locations per OpenWeatherMap group request
+WEATHER_BATCH_SIZE = 20
+
+PRIORITY_CONFLICT, PRIORITY_NORMAL = 'conflict', 'normal'
+
+SECONDS_PER_DAY = 86400.0
+
+DECISION_HISTORY = 50
+
+
+class TokenBucket:
+    """
+    Daily quota released at an even pace.
+
+    The refill rate is whatever is left of today's quota divided by the
+    seconds left in the UTC day, so unused requests from a quiet morning are
+    spread over the afternoon instead of being lost. The bucket never holds
+    more than burst_seconds of refill, nor more than what remains today.
+    """
+
+    def __init__(self, daily_quota: int, burst_seconds: float = BURST_SECONDS,
+                 clock: Callable[[], float] = time.time):
+        self.daily_quota = daily_quota
+        self.burst_seconds = burst_seconds
+        self.clock = clock
+
+        now = clock()
+        self.day = int(now // SECONDS_PER_DAY)
+        self.used_today = 0
+        self.updated = now
+        # Start with a full bucket so the first refreshes after startup go through
+        self.tokens = 0.0
+        self.tokens = min(max(1.0, self.rate(now) * burst_seconds), float(daily_quota))
+
+    @property
+    def remaining_today(self) -> int:
+        return max(0, self.daily_quota - self.used_today)
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """Tokens per second at the current pace"""
+        now = self.clock() if now is None else now
+        seconds_left = max(1.0, (self.day + 1) * SECONDS_PER_DAY - now)
+        return max(0.0, self.remaining_today - self.tokens) / seconds_left
+
+    @property
+    def capacity(self) -> float:
+        return max(1.0, self.rate() * self.burst_seconds)
+
+    def refill(self):
+        now = self.clock()
+        day = int(now // SECONDS_PER_DAY)
+        if day != self.day:
+            self.day, self.used_today, self.updated = day, 0, day * SECONDS_PER_DAY
+            self.tokens = 0.0
+        self.tokens = min(self.tokens + self.rate(now) * max(0.0, now - self.updated),
+                          max(1.0, self.rate(now) * self.burst_seconds), float(self.remaining_today))
+        self.updated = now
+
+    def try_take(self, reserve: float = 0.0) -> bool:
+        """Spend one token if at least one is left above reserve"""
+        self.refill()
+        if self.tokens - reserve < 1.0:
+            return False
+        self.tokens -= 1.0
+        self.used_today += 1
+        return True
+
+    def seconds_until_token(self, reserve: float = 0.0) -> float:
+        self.refill()
+        missing = 1.0 + reserve - self.tokens
+        if missing <= 0.0:
+            return 0.0
+        rate = self.rate()
+        return missing / rate if rate > 0.0 else float('inf')
+
+
+def _bbox_overlaps(a: Sequence[float], b: Sequence[float]) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class QuotaPlanner:
+    """
+    Decides which provider requests to spend quota on.
+
+    Providers without a configured quota are always allowed. For the others,
+    normal requests may only use tokens above a reserve, which is left for
+    requests covering a region where conflicts are currently flagged (see
+    mark_conflicts). Every decision is recorded for status().
+    """
+
+    def __init__(self, quotas: Optional[Dict[str, int]] = None, burst_seconds: float = BURST_SECONDS,
+                 conflict_reserve: float = CONFLICT_RESERVE, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.conflict_reserve = conflict_reserve
+        self.buckets = {provider: TokenBucket(quota, burst_seconds, clock)
+                        for provider, quota in dict(DAILY_QUOTAS, **(quotas or {})).items()}
+
+        self.conflict_regions: List[Sequence[float]] = []
+        self.last_fetched: Dict[Hashable, float] = {}
+        self.counters: Dict[str, Dict[str, int]] = {provider: {'allowed': 0, 'denied': 0}
+                                                    for provider in self.buckets}
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=DECISION_HISTORY)
+        self._lock = threading.Lock()
+
+    def mark_conflicts(self, bboxes: Sequence[Sequence[float]]):
+        """Regions (as [min_lat, min_lon, max_lat, max_lon]) that currently contain conflicts"""
+        with self._lock:
+            self.conflict_regions = [tuple(bbox) for bbox in bboxes]
+
+    def priority_for(self, bbox: Optional[Sequence[float]]) -> str:
+        if bbox and any(_bbox_overlaps(bbox, region) for region in self.conflict_regions):
+            return PRIORITY_CONFLICT
+        return PRIORITY_NORMAL
+
+    def allow(self, provider: str, key: Hashable = None, priority: str = PRIORITY_NORMAL) -> bool:
+        """Spend one request of provider's quota on key, if the plan allows it now"""
+        bucket = self.buckets.get(provider)
+        if bucket is None:
+            return True
+        with self._lock:
+            reserve = 0.0 if priority == PRIORITY_CONFLICT else self.conflict_reserve * bucket.capacity
+            allowed = bucket.try_take(reserve)
+            now = self.clock()
+            self.counters[provider]['allowed' if allowed else 'denied'] += 1
+            if allowed:
+                self.last_fetched[(provider, key)] = now
+            self.decisions.append({'time': now, 'provider': provider, 'key': key, 'priority': priority,
+                                   'allowed': allowed, 'tokens': round(bucket.tokens, 2)})
+        return allowed
+
+    def age(self, provider: str, key: Hashable) -> float:
+        """Seconds since key was last fetched from provider (inf if never)"""
+        fetched = self.last_fetched.get((provider, key))
+        return float('inf') if fetched is None else self.clock() - fetched
+
+    def plan_weather(self, locations: Sequence[Any], provider: str = 'OpenWeatherMap',
+                     batch_size: int = WEATHER_BATCH_SIZE,
+                     priorities: Optional[Dict[Any, str]] = None) -> List[List[Any]]:
+        """
+        Batches of locations to fetch now, one request each.
+
+        Locations are ordered conflict-first, then by how long ago they were
+        last fetched, so the oldest data is refreshed first when quota is
+        short. Batches the bucket cannot pay for are left out.
+        """
+        priorities = priorities or {}
+        unique = list(dict.fromkeys(locations))
+        unique.sort(key=lambda location: (priorities.get(location) != PRIORITY_CONFLICT,
+                                          -self.age(provider, location)))
+        batches = []
+        for start in range(0, len(unique), batch_size):
+            batch = unique[start:start + batch_size]
+            priority = PRIORITY_CONFLICT if priorities.get(batch[0]) == PRIORITY_CONFLICT else PRIORITY_NORMAL
+            if not self.allow(provider, tuple(batch), priority):
+                break
+            now = self.clock()
+            for location in batch:
+                self.last_fetched[(provider, location)] = now
+            batches.append(batch)
+        return batches
+
+    def status(self) -> Dict[str, Any]:
+        """Per-provider quota use and pacing plus recent decisions, for the Data Source Status panel"""
+        with self._lock:
+            providers = []
+            for provider, bucket in self.buckets.items():
+                bucket.refill()
+                providers.append({
+                    'provider': provider,
+                    'daily_quota': bucket.daily_quota,
+                    'used_today': bucket.used_today,
+                    'remaining_today': bucket.remaining_today,
+                    'tokens': round(bucket.tokens, 2),
+                    'requests_per_hour': round(bucket.rate() * 3600.0, 1),
+                    'next_request_in_s': round(bucket.seconds_until_token(self.conflict_reserve * bucket.capacity), 1),
+                    'next_conflict_request_in_s': round(bucket.seconds_until_token(), 1),
+                    **self.counters[provider],
+                })
+            return {
+                'providers': providers,
+                'conflict_regions': len(self.conflict_regions),
+                'decisions': list(self.decisions),
+            }
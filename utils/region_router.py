@@ -0,0 +1,126 @@
+"""
+Region Routing for the Flight Stream
+Bounding-box plus altitude-band subscriptions, resolved against a per-tick
+tile index so each region only looks at aircraft in its own tiles.
+"""
+
+import math
+from typing import Any, Dict, List, NamedTuple, Sequence
+
+import numpy as np
+
+# Tile edge in degrees of latitude and longitude
+TILE_DEGREES = 1.0
+
+
+class Region(NamedTuple):
+    """Bounding box [min_lat, min_lon, max_lat, max_lon] with an optional altitude band in ft"""
+    min_lat: float
+    min_lon: float
+    max_lat: float
+    max_lon: float
+    min_altitude: float = -math.inf
+    max_altitude: float = math.inf
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any]) -> 'Region':
+        """Parse {"bbox": [min_lat, min_lon, max_lat, max_lon], "altitude": [min_ft, max_ft]}"""
+        bbox = message.get('bbox')
+        if not isinstance(bbox, (list, tuple)) or len(bbox) != 4:
+            raise ValueError("bbox must be [min_lat, min_lon, max_lat, max_lon]")
+        min_lat, min_lon, max_lat, max_lon = (float(value) for value in bbox)
+        if not -90.0 <= min_lat <= max_lat <= 90.0:
+            raise ValueError("bbox latitudes must satisfy -90 <= min_lat <= max_lat <= 90")
+        if not (-180.0 <= min_lon <= 180.0 and -180.0 <= max_lon <= 180.0):
+            raise ValueError("bbox longitudes must be within [-180, 180]")
+
+        band = message.get('altitude')
+        if band is None:
+            band = (None, None)
+        if not isinstance(band, (list, tuple)) or len(band) != 2:
+            raise ValueError("altitude band must be [min_ft, max_ft]")
+        try:
+            low = -math.inf if band[0] is None else float(band[0])
+            high = math.inf if band[1] is None else float(band[1])
+        except (TypeError, ValueError):
+            raise ValueError("altitude band must be [min_ft, max_ft]") from None
+        if math.isnan(low) or math.isnan(high) or low > high:
+            raise ValueError("altitude band must be [min_ft, max_ft]")
+        return cls(min_lat, min_lon, max_lat, max_lon, low, high)
+
+    @property
+    def crosses_antimeridian(self) -> bool:
+        return self.min_lon > self.max_lon
+
+    def tiles(self, tile_degrees: float = TILE_DEGREES) -> List[int]:
+        """Keys of every tile the box touches"""
+        columns = int(round(360.0 / tile_degrees))
+        rows = range(int(_tile_row(self.min_lat, tile_degrees)), int(_tile_row(self.max_lat, tile_degrees)) + 1)
+        first = math.floor((self.min_lon + 180.0) / tile_degrees)
+        last = math.floor((self.max_lon + 180.0) / tile_degrees)
+        if self.crosses_antimeridian:
+            last += columns
+        span = min(last - first + 1, columns)
+        return [row * columns + (first + step) % columns for row in rows for step in range(span)]
+
+    def contains(self, latitude: np.ndarray, longitude: np.ndarray, altitude: np.ndarray) -> np.ndarray:
+        """Vectorized membership test; aircraft without altitude pass an unbounded band only"""
+        inside = (latitude >= self.min_lat) & (latitude <= self.max_lat)
+        if self.crosses_antimeridian:
+            inside &= (longitude >= self.min_lon) | (longitude <= self.max_lon)
+        else:
+            inside &= (longitude >= self.min_lon) & (longitude <= self.max_lon)
+        if self.min_altitude > -math.inf or self.max_altitude < math.inf:
+            inside &= (altitude >= self.min_altitude) & (altitude <= self.max_altitude)
+        return inside
+
+
+def _tile_row(latitude, tile_degrees: float):
+    return np.floor((np.clip(latitude, -90.0, 90.0 - 1e-9) + 90.0) / tile_degrees).astype(int)
+
+
+def _tile_column(longitude, tile_degrees: float, columns: int):
+    return np.floor((np.asarray(longitude) + 180.0) / tile_degrees).astype(int) % columns
+
+
+class TileIndex:
+    """
+    Aircraft of one tick bucketed by tile.
+
+    Built once per tick with a single argsort; select() then visits only the
+    tiles a region touches and applies the exact box and altitude test to
+    those candidates.
+    """
+
+    def __init__(self, flights: Sequence[Dict[str, Any]], tile_degrees: float = TILE_DEGREES):
+        self.flights = flights
+        self.tile_degrees = tile_degrees
+        self.columns = int(round(360.0 / tile_degrees))
+
+        self.latitude = np.array([flight.get('latitude') for flight in flights], dtype=np.float64)
+        self.longitude = np.array([flight.get('longitude') for flight in flights], dtype=np.float64)
+        self.altitude = np.array([flight.get('baro_altitude') for flight in flights], dtype=np.float64)
+
+        positioned = np.flatnonzero(~(np.isnan(self.latitude) | np.isnan(self.longitude)))
+        keys = (_tile_row(self.latitude[positioned], tile_degrees) * self.columns
+                + _tile_column(self.longitude[positioned], tile_degrees, self.columns))
+        order = np.argsort(keys, kind='stable')
+        self._rows = positioned[order]
+        self._keys, self._starts = np.unique(keys[order], return_index=True)
+        self._ends = np.append(self._starts[1:], len(order))
+
+    def rows(self, region: Region) -> np.ndarray:
+        """Row numbers of the aircraft inside region, in feed order"""
+        wanted = np.asarray(region.tiles(self.tile_degrees))
+        found = np.minimum(np.searchsorted(self._keys, wanted), max(len(self._keys) - 1, 0))
+        found = found[self._keys[found] == wanted] if len(self._keys) else found[:0]
+        if not len(found):
+            return np.zeros(0, dtype=np.intp)
+        candidates = np.concatenate([self._rows[start:end] for start, end in
+                                     zip(self._starts[found], self._ends[found])])
+        inside = region.contains(self.latitude[candidates], self.longitude[candidates], self.altitude[candidates])
+        return np.sort(candidates[inside])
+
+    def select(self, region: Region) -> List[Dict[str, Any]]:
+        """Flights inside region"""
+        return [self.flights[row] for row in self.rows(region).tolist()]
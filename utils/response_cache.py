@@ -0,0 +1,354 @@
+"""
+Provider Response Cache
+TTL cache with stale-while-revalidate for flight and weather provider
+responses, keyed on (provider, bbox tile, endpoint), so dashboard reruns
+reuse recent answers instead of spending daily API quota.
+"""
+
+import hashlib
+import math
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+from utils.quota_planner import WEATHER_BATCH_SIZE
+from utils.weather_schema import StationWeather, decode_weather
+
+# Seconds a response counts as fresh, per provider
+PROVIDER_TTLS = {
+    'OpenSky': 30.0,
+    'RapidAPI': 15.0,
+    'FlightAware': 60.0,
+    'AviationStack': 300.0,
+    'OpenWeatherMap': 600.0,
+}
+DEFAULT_TTL = 30.0
+
+# Past its TTL an entry is still served for this many TTLs while a refresh runs
+STALE_FACTOR = 4.0
+
+# Bounding boxes are widened to this grid so nearby views share entries
+CACHE_TILE_DEGREES = 1.0
+
+# (lat, lon) weather locations are keyed to this many decimals (~110 m)
+LOCATION_DECIMALS = 3
+
+MAX_ENTRIES = 512
+
+FRESH, STALE, MISS = 'fresh', 'stale', 'miss'
+
+# Served past the stale window because the quota planner declined a refetch
+EXPIRED = 'expired'
+
+CacheKey = Tuple[str, Hashable, str]  # (provider, tile, endpoint)
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    stored_at: float
+    ttl: float
+
+
+def snap_bbox(bbox: Optional[Sequence[float]],
+              tile_degrees: float = CACHE_TILE_DEGREES) -> Optional[Tuple[float, float, float, float]]:
+    """Widen [min_lat, min_lon, max_lat, max_lon] outward to whole tiles"""
+    if not bbox:
+        return None
+    min_lat, min_lon, max_lat, max_lon = (float(value) for value in bbox)
+    return (max(-90.0, math.floor(min_lat / tile_degrees) * tile_degrees),
+            max(-180.0, math.floor(min_lon / tile_degrees) * tile_degrees),
+            min(90.0, math.ceil(max_lat / tile_degrees) * tile_degrees),
+            min(180.0, math.ceil(max_lon / tile_degrees) * tile_degrees))
+
+
+def cache_key(provider: str, endpoint: str, bbox: Optional[Sequence[float]] = None,
+              tile_degrees: float = CACHE_TILE_DEGREES) -> CacheKey:
+    """Key of a provider response; requests without a bbox share the 'global' tile"""
+    tile = snap_bbox(bbox, tile_degrees)
+    return provider, 'global' if tile is None else tile, endpoint
+
+
+class ResponseCache:
+    """
+    In-memory LRU of provider responses with an optional on-disk tier.
+
+    lookup() classifies an entry as fresh (younger than its provider's TTL),
+    stale (within STALE_FACTOR further TTLs) or a miss. Stale entries are
+    still returned; the caller, or get_or_fetch() on a background thread,
+    refreshes them. Only one refresh per key runs at a time. With a directory
+    every stored response is also pickled to disk, so a restarted process
+    starts warm.
+
+    Entries past the stale window count as misses but are kept until LRU
+    eviction, so lookup_expired() can still serve them when the quota
+    planner will not pay for a refetch.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, default_ttl: float = DEFAULT_TTL,
+                 stale_factor: float = STALE_FACTOR, max_entries: int = MAX_ENTRIES,
+                 directory: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.ttls = dict(PROVIDER_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.stale_factor = stale_factor
+        self.max_entries = max_entries
+        self.directory = Path(directory) if directory else None
+        self.clock = clock
+
+        self._entries: 'OrderedDict[CacheKey, CacheEntry]' = OrderedDict()
+        self._refreshing: Dict[CacheKey, Future] = {}
+        self._lock = threading.RLock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.counters = {'hits': 0, 'stale_hits': 0, 'disk_hits': 0, 'misses': 0,
+                         'expired_hits': 0, 'refreshes': 0, 'refresh_errors': 0, 'evictions': 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ttl(self, provider: str) -> float:
+        return self.ttls.get(provider, self.default_ttl)
+
+    def _path(self, key: CacheKey) -> Path:
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()[:24]
+        return self.directory / f"{key[0]}_{digest}.pkl"
+
+    def _read_disk(self, key: CacheKey) -> Optional[CacheEntry]:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as handle:
+                stored_key, entry = pickle.load(handle)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        return CacheEntry(*entry) if stored_key == key else None
+
+    def _write_disk(self, key: CacheKey, entry: CacheEntry):
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_suffix('.tmp')
+            with open(temporary, 'wb') as handle:
+                pickle.dump((key, tuple(entry)), handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, path)
+        except OSError as e:
+            print(f"Response cache could not write {path}: {e}")
+
+    def _state(self, entry: CacheEntry) -> str:
+        age = self.clock() - entry.stored_at
+        if age < entry.ttl:
+            return FRESH
+        if age < entry.ttl * (1.0 + self.stale_factor):
+            return STALE
+        return MISS
+
+    def lookup(self, key: CacheKey) -> Tuple[Any, str]:
+        """(value, FRESH | STALE | MISS); the value is None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            from_disk = entry is None
+            if from_disk:
+                entry = self._read_disk(key)
+            state = MISS if entry is None else self._state(entry)
+            if state == MISS:
+                self.counters['misses'] += 1
+                return None, MISS
+
+            if from_disk:
+                self.counters['disk_hits'] += 1
+                self._remember(key, entry)
+            self._entries.move_to_end(key)
+            self.counters['hits' if state == FRESH else 'stale_hits'] += 1
+            return entry.value, state
+
+    def lookup_expired(self, key: CacheKey) -> Optional[Any]:
+        """Last stored value of key whatever its age, or None if there is none"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._read_disk(key)
+                if entry is None:
+                    return None
+                self._remember(key, entry)
+            self._entries.move_to_end(key)
+            self.counters['expired_hits'] += 1
+            return entry.value
+
+    def _remember(self, key: CacheKey, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def store(self, key: CacheKey, value: Any, ttl: Optional[float] = None):
+        entry = CacheEntry(value, self.clock(), self.ttl(key[0]) if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, entry)
+        if self.directory is not None:
+            self._write_disk(key, entry)
+
+    def is_refreshing(self, key: CacheKey) -> bool:
+        with self._lock:
+            return key in self._refreshing
+
+    def begin_refresh(self, key: CacheKey, future: Optional[Future] = None) -> bool:
+        """Claim the refresh of key; False if one is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing[key] = future
+            self.counters['refreshes'] += 1
+            return True
+
+    def end_refresh(self, key: CacheKey, failed: bool = False):
+        with self._lock:
+            self._refreshing.pop(key, None)
+            if failed:
+                self.counters['refresh_errors'] += 1
+
+    def _refresh(self, key: CacheKey, fetch: Callable[[], Any], ttl: Optional[float]):
+        failed = False
+        try:
+            self.store(key, fetch(), ttl)
+        except Exception as e:
+            failed = True
+            print(f"Background refresh of {key[0]} {key[2]} failed: {e}")
+        finally:
+            self.end_refresh(key, failed)
+
+    def get_or_fetch(self, key: CacheKey, fetch: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Cached value of key. A miss calls fetch() inline and stores the result;
+        a stale hit returns the old value and refreshes it on a background
+        thread. Exceptions from an inline fetch propagate and nothing is stored.
+        """
+        value, state = self.lookup(key)
+        if state == MISS:
+            value = fetch()
+            self.store(key, value, ttl)
+        elif state == STALE and self.begin_refresh(key):
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-refresh')
+                self._refreshing[key] = self._executor.submit(self._refresh, key, fetch, ttl)
+        return value
+
+    def wait_for_refreshes(self, timeout: Optional[float] = None):
+        """Block until background refreshes started so far have finished"""
+        with self._lock:
+            futures = [future for future in self._refreshing.values() if future is not None]
+        for future in futures:
+            future.exception(timeout)
+
+    def invalidate(self, provider: Optional[str] = None):
+        """Drop in-memory entries, all of them or only one provider's"""
+        with self._lock:
+            for key in [key for key in self._entries if provider is None or key[0] == provider]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus entry count and hit rate"""
+        with self._lock:
+            stats = dict(self.counters, entries=len(self._entries), refreshing=len(self._refreshing))
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class CachedWeather:
+    """
+    get_weather_data_multiple_sources() over a per-location fetch function,
+    caching each location's response under (provider, location, 'weather').
+
+    Locations are either names or (lat, lon) pairs; pairs are keyed by their
+    own rounded coordinates, not the bbox cache tile, so nearby stations keep
+    separate entries. Every response is decoded into a StationWeather
+    before it is cached, so callers never see provider-specific shapes.
+    With fetch_batch (one provider call for a list
+    of locations, returning {location: weather}) or a QuotaPlanner, locations
+    that are not fresh are fetched together in the batches the planner pays
+    for; the rest keep their stale value until quota allows a refresh.
+    """
+
+    def __init__(self, fetch_location: Optional[Callable[[Any], Any]] = None,
+                 cache: Optional[ResponseCache] = None, provider: str = 'OpenWeatherMap',
+                 fetch_batch: Optional[Callable[[List[Any]], Dict[Any, Any]]] = None, planner: Any = None,
+                 batch_size: int = WEATHER_BATCH_SIZE):
+        self.fetch_location = fetch_location
+        self.fetch_batch = fetch_batch
+        self.cache = ResponseCache() if cache is None else cache
+        self.provider = provider
+        self.planner = planner
+        self.batch_size = batch_size
+
+    def _decode(self, location: Any, value: Any) -> Optional[StationWeather]:
+        station = None if isinstance(location, (tuple, list)) else str(location)
+        return decode_weather(value, station, self.provider)
+
+    def _key(self, location: Any) -> CacheKey:
+        if isinstance(location, (tuple, list)) and len(location) == 2:
+            lat, lon = (round(float(value), LOCATION_DECIMALS) for value in location)
+            return self.provider, (lat, lon), 'weather'
+        return self.provider, str(location), 'weather'
+
+    def _fetch(self, batch: List[Any]) -> Dict[Any, Any]:
+        if self.fetch_batch is not None:
+            return self.fetch_batch(batch)
+        return {location: self.fetch_location(location) for location in batch}
+
+    def get_weather_data_multiple_sources(self, locations: Sequence[Any],
+                                          priorities: Optional[Dict[Any, str]] = None) -> Dict[Any, StationWeather]:
+        """Station record per location; locations whose fetch fails are left out"""
+        if self.fetch_batch is None and self.planner is None:
+            weather = {}
+            for location in locations:
+                try:
+                    value = self.cache.get_or_fetch(self._key(location),
+                                                    lambda location=location: self._decode(location, self.fetch_location(location)))
+                except Exception as e:
+                    print(f"Weather for {location} unavailable: {e}")
+                    continue
+                if value is not None:
+                    weather[location] = value
+            return weather
+
+        weather, due = {}, []
+        for location in dict.fromkeys(locations):
+            value, state = self.cache.lookup(self._key(location))
+            if value is not None:
+                weather[location] = value
+            if state != FRESH:
+                due.append(location)
+
+        if self.planner is not None:
+            batches = self.planner.plan_weather(due, self.provider, self.batch_size, priorities)
+        else:
+            batches = [due[start:start + self.batch_size] for start in range(0, len(due), self.batch_size)]
+        for batch in batches:
+            try:
+                fetched = self._fetch(batch)
+            except Exception as e:
+                print(f"Weather for {len(batch)} locations unavailable: {e}")
+                continue
+            for location, value in fetched.items():
+                value = self._decode(location, value)
+                if value is not None:
+                    self.cache.store(self._key(location), value)
+                    weather[location] = value
+
+        # Locations the planner could not pay for keep their last record, however old
+        for location in due:
+            if location not in weather:
+                value = self.cache.lookup_expired(self._key(location))
+                if value is not None:
+                    weather[location] = value
+        return weather
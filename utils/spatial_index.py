@@ -0,0 +1,187 @@
+"""
+Spatial Index for Conflict Candidate Pairs
+Buckets aircraft into earth-centred (ECEF) cubes and flight-level bands so
+conflict detection only evaluates aircraft that could meet within the lookahead.
+"""
+
+import math
+import numpy as np
+from itertools import product
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from utils.conflict_engine import DEFAULT_LOOKAHEAD_MINUTES, SEVERITY_THRESHOLDS
+from utils.geodesy import EARTH_RADIUS_NM
+
+# Largest (LOW) severity thresholds
+MAX_HORIZONTAL_NM = max(threshold[1] for threshold in SEVERITY_THRESHOLDS)
+MAX_VERTICAL_FT = max(threshold[2] for threshold in SEVERITY_THRESHOLDS)
+
+CellKey = Tuple[int, int, int]
+# ECEF cube plus the lowest and highest altitude band swept within the lookahead
+Placement = Tuple[CellKey, int, int]
+
+# Neighbour offsets in (x, y, z); only the lexicographically positive half
+# is kept so that each pair of cells is visited once
+_HALF_OFFSETS = [offset for offset in product((-1, 0, 1), repeat=3) if offset > (0, 0, 0)]
+
+
+def _bands_overlap(low_a: np.ndarray, high_a: np.ndarray, low_b: np.ndarray, high_b: np.ndarray) -> np.ndarray:
+    """Band ranges that overlap or touch, i.e. may come within band_ft of each other"""
+    return (low_a <= high_b + 1) & (low_b <= high_a + 1)
+
+
+class SpatialGrid:
+    """
+    Incrementally maintained bucket grid over aircraft positions.
+
+    Cubes are sized so that two aircraft that can come within the LOW
+    horizontal threshold inside the lookahead window always sit in the same
+    or in adjacent cubes: the threshold plus the distance both aircraft can
+    close at max_speed_kt.
+
+    Vertically each aircraft covers the altitude bands its own vertical
+    rate sweeps through during the lookahead, so a level aircraft occupies a
+    single band. With bands at least as deep as the LOW vertical threshold,
+    a pair can only come that close if their band ranges overlap or touch.
+    """
+
+    def __init__(self, lookahead_minutes: float = DEFAULT_LOOKAHEAD_MINUTES,
+                 max_speed_kt: float = 600.0, cell_nm: Optional[float] = None, band_ft: Optional[float] = None):
+        self.lookahead_minutes = lookahead_minutes
+        self.cell_nm = cell_nm or MAX_HORIZONTAL_NM + 2 * max_speed_kt * lookahead_minutes / 60.0
+        self.band_ft = band_ft or MAX_VERTICAL_FT
+        if self.band_ft < MAX_VERTICAL_FT:
+            raise ValueError(f"band_ft must be at least {MAX_VERTICAL_FT:.0f} ft")
+
+        self._cells: Dict[CellKey, Set[Hashable]] = {}
+        self._cell_of: Dict[Hashable, Placement] = {}
+
+    def __len__(self) -> int:
+        return len(self._cell_of)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._cell_of
+
+    def cell_for(self, latitude: float, longitude: float, altitude: float,
+                 vertical_rate: float = 0.0) -> Placement:
+        """Cube and band range for a position in degrees and feet and a vertical rate in ft/min"""
+        lat = math.radians(latitude)
+        lon = math.radians(longitude)
+        scale = EARTH_RADIUS_NM / self.cell_nm
+        cube = (
+            math.floor(math.cos(lat) * math.cos(lon) * scale),
+            math.floor(math.cos(lat) * math.sin(lon) * scale),
+            math.floor(math.sin(lat) * scale),
+        )
+        if not math.isfinite(vertical_rate):
+            vertical_rate = 0.0
+        swept = altitude + vertical_rate * self.lookahead_minutes
+        return (cube, math.floor(min(altitude, swept) / self.band_ft),
+                math.floor(max(altitude, swept) / self.band_ft))
+
+    def insert(self, key: Hashable, latitude: float, longitude: float, altitude: float,
+               vertical_rate: float = 0.0):
+        """Add an aircraft; re-inserting an existing key moves it"""
+        self.move(key, latitude, longitude, altitude, vertical_rate)
+
+    def move(self, key: Hashable, latitude: float, longitude: float, altitude: float,
+             vertical_rate: float = 0.0) -> bool:
+        """Update an aircraft position; returns True when its cube or band range changed"""
+        placement = self.cell_for(latitude, longitude, altitude, vertical_rate)
+        previous = self._cell_of.get(key)
+        if previous == placement:
+            return False
+
+        if previous is not None and previous[0] != placement[0]:
+            self._discard(key, previous[0])
+        self._cells.setdefault(placement[0], set()).add(key)
+        self._cell_of[key] = placement
+        return True
+
+    def remove(self, key: Hashable) -> bool:
+        """Remove an aircraft; returns False when it was not indexed"""
+        placement = self._cell_of.pop(key, None)
+        if placement is None:
+            return False
+        self._discard(key, placement[0])
+        return True
+
+    def _discard(self, key: Hashable, cell: CellKey):
+        members = self._cells[cell]
+        members.discard(key)
+        if not members:
+            del self._cells[cell]
+
+    def sync(self, positions: Dict[Hashable, Tuple[float, ...]]) -> Dict[str, int]:
+        """
+        Bring the index in line with a full snapshot of
+        (latitude, longitude, altitude[, vertical_rate]) positions
+        """
+        stats = {'inserted': 0, 'moved': 0, 'removed': 0}
+
+        for key in [key for key in self._cell_of if key not in positions]:
+            self.remove(key)
+            stats['removed'] += 1
+
+        for key, position in positions.items():
+            existed = key in self._cell_of
+            if self.move(key, *position):
+                stats['moved' if existed else 'inserted'] += 1
+        return stats
+
+    def neighbours(self, key: Hashable) -> Set[Hashable]:
+        """All other aircraft in the same or an adjacent cube whose band ranges overlap or touch"""
+        (cx, cy, cz), low, high = self._cell_of[key]
+        found = set()
+        for dx, dy, dz in product((-1, 0, 1), repeat=3):
+            for other in self._cells.get((cx + dx, cy + dy, cz + dz), ()):
+                _, other_low, other_high = self._cell_of[other]
+                if low <= other_high + 1 and other_low <= high + 1:
+                    found.add(other)
+        found.discard(key)
+        return found
+
+    def candidate_index_pairs(self, index_of: Dict[Hashable, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Candidate pairs as (i, j) row-index arrays with i < j"""
+        cells = {}
+        for cell, members in self._cells.items():
+            members = list(members)
+            bands = np.array([self._cell_of[key][1:] for key in members], dtype=np.int64)
+            rows = np.fromiter((index_of[key] for key in members), dtype=np.intp, count=len(members))
+            cells[cell] = (rows, bands[:, 0], bands[:, 1])
+
+        left: List[np.ndarray] = []
+        right: List[np.ndarray] = []
+        for (cx, cy, cz), (rows, low, high) in cells.items():
+            if len(rows) > 1:
+                i, j = np.triu_indices(len(rows), 1)
+                keep = _bands_overlap(low[i], high[i], low[j], high[j])
+                left.append(rows[i[keep]])
+                right.append(rows[j[keep]])
+
+            for dx, dy, dz in _HALF_OFFSETS:
+                other = cells.get((cx + dx, cy + dy, cz + dz))
+                if other is not None:
+                    other_rows, other_low, other_high = other
+                    i = np.repeat(np.arange(len(rows)), len(other_rows))
+                    j = np.tile(np.arange(len(other_rows)), len(rows))
+                    keep = _bands_overlap(low[i], high[i], other_low[j], other_high[j])
+                    left.append(rows[i[keep]])
+                    right.append(other_rows[j[keep]])
+
+        if not left:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        i, j = np.concatenate(left), np.concatenate(right)
+        return np.minimum(i, j), np.maximum(i, j)
+
+    def clear(self):
+        """Drop every indexed aircraft"""
+        self._cells.clear()
+        self._cell_of.clear()
+
+    @property
+    def occupied_cells(self) -> int:
+        return len(self._cells)
+
+    def keys(self) -> Iterable[Hashable]:
+        return self._cell_of.keys()
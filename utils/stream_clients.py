@@ -0,0 +1,147 @@
+"""
+Per-Client Stream Channels
+Bounded send queue and writer task for each WebSocket client, so one slow
+consumer cannot hold up broadcasts to everyone else.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+# Position messages held per client before older ones are dropped
+POSITION_QUEUE_SIZE = 4
+
+# Critical alerts are never dropped; a client this far behind is disconnected
+ALERT_QUEUE_LIMIT = 256
+
+# Seconds a single send may take before the client is considered stuck
+SEND_TIMEOUT = 5.0
+
+
+class ClientChannel:
+    """
+    Outgoing queue of one client, drained by its own writer task.
+
+    Position updates are drop-to-latest: when the queue is full everything
+    queued is discarded in favour of the newest state. For self-contained
+    snapshots that is just the newest message; for a delta stream the
+    replacement comes from catch_up (the current keyframe), since skipping a
+    delta would break the chain. Alerts go in a separate queue that is always
+    drained first and never dropped. A send that takes longer than
+    send_timeout, or an alert backlog past alert_limit, disconnects the client.
+    """
+
+    def __init__(self, websocket: Any, catch_up: Optional[Callable[[], str]] = None,
+                 max_positions: int = POSITION_QUEUE_SIZE, alert_limit: int = ALERT_QUEUE_LIMIT,
+                 send_timeout: float = SEND_TIMEOUT):
+        self.websocket = websocket
+        self.catch_up = catch_up
+        self.max_positions = max_positions
+        self.alert_limit = alert_limit
+        self.send_timeout = send_timeout
+
+        self._positions: Deque[str] = deque()
+        self._alerts: Deque[str] = deque()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self.metrics = {
+            'sent': 0,
+            'bytes_sent': 0,
+            'dropped': 0,
+            'alerts_sent': 0,
+            'max_queue_depth': 0,
+            'last_send_ms': 0.0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._positions) + len(self._alerts)
+
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.ensure_future(self._writer())
+        return self._task
+
+    def _wake(self):
+        self.metrics['max_queue_depth'] = max(self.metrics['max_queue_depth'], self.queue_depth)
+        self._ready.set()
+
+    def offer(self, payload: str) -> bool:
+        """Queue a position update; returns False if older updates had to be dropped"""
+        if self.closed:
+            return False
+        dropped = False
+        if len(self._positions) >= self.max_positions:
+            self.metrics['dropped'] += len(self._positions)
+            self._positions.clear()
+            dropped = True
+            if self.catch_up is not None:
+                payload = self.catch_up()
+        self._positions.append(payload)
+        self._wake()
+        return not dropped
+
+    def replace(self, payload: str):
+        """Discard queued position updates and send this one next (keyframes, resyncs)"""
+        if self.closed:
+            return
+        self.metrics['dropped'] += len(self._positions)
+        self._positions.clear()
+        self._positions.append(payload)
+        self._wake()
+
+    def offer_alert(self, payload: str):
+        """Queue a critical alert; it is never dropped"""
+        if self.closed:
+            return
+        if len(self._alerts) >= self.alert_limit:
+            self.disconnect(f'{len(self._alerts)} undelivered alerts')
+            return
+        self._alerts.append(payload)
+        self._wake()
+
+    def disconnect(self, reason: str, abort: bool = True):
+        """Stop the writer and, with abort, drop the connection without a close handshake"""
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        self._ready.set()
+        transport = getattr(self.websocket, 'transport', None)
+        if abort and transport is not None:
+            transport.abort()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+
+    async def _writer(self):
+        while not self.closed:
+            if not self._alerts and not self._positions:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+
+            alert = bool(self._alerts)
+            payload = self._alerts.popleft() if alert else self._positions.popleft()
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self.websocket.send(payload), self.send_timeout)
+            except asyncio.TimeoutError:
+                self.disconnect(f'send blocked for more than {self.send_timeout:.1f}s')
+                return
+            except Exception as e:
+                self.disconnect(f'send failed: {e}')
+                return
+
+            self.metrics['last_send_ms'] = (time.perf_counter() - started) * 1000.0
+            self.metrics['sent'] += 1
+            self.metrics['bytes_sent'] += len(payload)
+            if alert:
+                self.metrics['alerts_sent'] += 1
+
+    def snapshot_metrics(self) -> Dict[str, Any]:
+        """Counters plus current queue depths"""
+        return dict(self.metrics, queue_depth=len(self._positions), alerts_queued=len(self._alerts),
+                    closed=self.closed, close_reason=self.close_reason)
@@ -0,0 +1,378 @@
+"""
+Track History Store
+Append-only columnar history of aggregated flight snapshots, written as
+time-partitioned segments of memory-mapped NumPy columns with a per-segment
+icao24 index and coarse spatial index, so track and bbox/time queries only
+read the segments and rows they need.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from utils.flight_batch import FlightBatch
+
+DEFAULT_TRACK_DIR = Path(os.getenv('ATC_TRACK_DIR', Path(__file__).parent.parent / 'track_history'))
+
+# One partition directory per hour of data
+PARTITION_SECONDS = 3600
+
+# Buffered rows are written as a new segment once there are this many
+FLUSH_ROWS = 50000
+
+# Size of the spatial index cells in degrees
+CELL_DEGREES = 1.0
+
+# Segments kept memory-mapped at once
+MAX_OPEN_SEGMENTS = 64
+
+MANIFEST = 'manifest.json'
+
+# Stored columns and their on-disk dtypes; strings are fixed width per segment
+COLUMNS = {
+    'time': np.float64,
+    'icao24': str,
+    'callsign': str,
+    'latitude': np.float32,
+    'longitude': np.float32,
+    'baro_altitude': np.float32,
+    'velocity': np.float32,
+    'true_track': np.float32,
+    'vertical_rate': np.float32,
+    'on_ground': bool,
+}
+
+
+def _snapshot_time(snapshot: Any, timestamp: Optional[float], clock: Callable[[], float]) -> float:
+    if timestamp is not None:
+        return float(timestamp)
+    stamp = snapshot.get('timestamp') if isinstance(snapshot, dict) else None
+    if isinstance(stamp, str):
+        try:
+            return datetime.fromisoformat(stamp).timestamp()
+        except ValueError:
+            pass
+    elif isinstance(stamp, (int, float)):
+        return float(stamp)
+    return clock()
+
+
+def _as_batch(snapshot: Any) -> FlightBatch:
+    """FlightBatch from a batch, a list of flight dicts or an aggregated-feed dict"""
+    if isinstance(snapshot, dict):
+        snapshot = snapshot.get('flights', [])
+    if isinstance(snapshot, FlightBatch):
+        return snapshot
+    return FlightBatch.from_dicts(snapshot) if snapshot else FlightBatch.empty()
+
+
+def _empty_columns() -> Dict[str, np.ndarray]:
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+def _concat(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    if not parts:
+        return _empty_columns()
+    return {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+
+
+def _take(columns: Dict[str, np.ndarray], rows) -> Dict[str, np.ndarray]:
+    return {name: np.asarray(values[rows]) for name, values in columns.items() if name in COLUMNS}
+
+
+def _by_time(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    order = np.lexsort((columns['icao24'], columns['time']))
+    return {name: values[order] for name, values in columns.items()}
+
+
+class TrackStore:
+    """
+    Append-only store of every aircraft position seen, queryable by aircraft
+    and by bbox and time.
+
+    Snapshots are buffered and written as immutable segments under a
+    directory per time partition. Within a segment rows are sorted by
+    (icao24, time), so one aircraft's track is a single contiguous slice
+    found by binary search in the segment's icao24 index; a second index
+    lists rows per CELL_DEGREES lat/lon cell for bbox queries. The manifest
+    records every segment's time range and bbox, so queries skip segments
+    that cannot match without opening them. Buffered rows not yet flushed
+    are included in query results.
+    """
+
+    def __init__(self, directory: Optional[str] = None, partition_seconds: int = PARTITION_SECONDS,
+                 flush_rows: int = FLUSH_ROWS, cell_degrees: float = CELL_DEGREES,
+                 clock: Callable[[], float] = time.time):
+        self.directory = Path(directory) if directory else DEFAULT_TRACK_DIR
+        self.partition_seconds = partition_seconds
+        self.flush_rows = flush_rows
+        self.cell_degrees = cell_degrees
+        self.clock = clock
+
+        self.segments: List[Dict[str, Any]] = []
+        manifest = self.directory / MANIFEST
+        if manifest.exists():
+            with open(manifest, 'r', encoding='utf-8') as handle:
+                stored = json.load(handle)
+            if stored.get('cell_degrees', cell_degrees) != cell_degrees:
+                raise ValueError(f"{self.directory} was written with {stored['cell_degrees']}° cells")
+            self.segments = stored.get('segments', [])
+
+        # Rows not yet written, per partition; kept until their segment is in the manifest
+        self._buffers: Dict[int, List[Dict[str, np.ndarray]]] = {}
+        self._buffered_rows = 0
+        self._open: 'OrderedDict[str, Dict[str, np.ndarray]]' = OrderedDict()
+        self._lock = threading.RLock()
+
+    # Writing
+
+    def partition_of(self, timestamp: float) -> int:
+        return int(timestamp // self.partition_seconds) * self.partition_seconds
+
+    def append(self, snapshot: Any, timestamp: Optional[float] = None) -> int:
+        """
+        Record one snapshot (FlightBatch, flight dicts or aggregated-feed dict)
+        at timestamp, defaulting to the snapshot's own timestamp or now.
+        Aircraft without a position are skipped. Returns the rows recorded.
+
+        Rows stay buffered (and queryable) until a flush succeeds; a failed
+        write is reported and retried on the next flush instead of raising.
+        """
+        when = _snapshot_time(snapshot, timestamp, self.clock)
+        batch = _as_batch(snapshot)
+        batch = batch.with_position() if len(batch) else batch
+        if not len(batch):
+            return 0
+
+        rows = len(batch)
+        columns = {
+            'time': np.full(rows, when),
+            'icao24': np.char.lower(np.char.strip(np.asarray(batch.icao24, dtype=str))),
+            'callsign': np.array(['' if value is None else str(value).strip() for value in batch.callsign.tolist()]),
+            'on_ground': np.asarray(batch.on_ground, dtype=bool),
+        }
+        for name in ('latitude', 'longitude', 'baro_altitude'):
+            columns[name] = np.asarray(getattr(batch, name), dtype=np.float32)
+        for name in ('velocity', 'true_track', 'vertical_rate'):
+            # Missing kinematics are stored as 0 rather than NaN
+            columns[name] = np.nan_to_num(np.asarray(getattr(batch, name), dtype=np.float64)).astype(np.float32)
+
+        partition = self.partition_of(when)
+        with self._lock:
+            ready = any(buffered != partition for buffered in self._buffers)
+            self._buffers.setdefault(partition, []).append(columns)
+            self._buffered_rows += rows
+            if ready or self._buffered_rows >= self.flush_rows:
+                try:
+                    self.flush()
+                except OSError as e:
+                    print(f"Track store could not write a segment, keeping {self._buffered_rows} rows buffered: {e}")
+        return rows
+
+    def _cell_rows_columns(self, latitudes, longitudes):
+        rows = np.floor((np.asarray(latitudes, dtype=np.float64) + 90.0) / self.cell_degrees).astype(np.int64)
+        cols = np.floor((np.asarray(longitudes, dtype=np.float64) + 180.0) / self.cell_degrees).astype(np.int64)
+        return (np.clip(rows, 0, int(round(180.0 / self.cell_degrees)) - 1),
+                np.clip(cols, 0, int(round(360.0 / self.cell_degrees)) - 1))
+
+    def _cells(self, latitudes, longitudes) -> np.ndarray:
+        """Spatial index cell key of each position"""
+        rows, cols = self._cell_rows_columns(latitudes, longitudes)
+        return rows * int(round(360.0 / self.cell_degrees)) + cols
+
+    def _cells_in(self, bbox: Sequence[float]) -> np.ndarray:
+        """Every cell key touching [min_lat, min_lon, max_lat, max_lon]"""
+        rows, cols = self._cell_rows_columns([bbox[0], bbox[2]], [bbox[1], bbox[3]])
+        return (np.arange(rows[0], rows[1] + 1)[:, None] * int(round(360.0 / self.cell_degrees))
+                + np.arange(cols[0], cols[1] + 1)[None, :]).ravel()
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Write each partition's buffered rows as a new segment and record it in the manifest"""
+        with self._lock:
+            return [self._flush_partition(partition) for partition in sorted(self._buffers)]
+
+    def _next_segment(self, partition: int) -> str:
+        """
+        Relative path of a new segment in partition, numbered after every segment
+        directory on disk, including ones a crash left out of the manifest
+        """
+        numbers = [int(path.name.split('-')[1]) for path in (self.directory / str(partition)).glob('segment-*')
+                   if path.name.split('-')[1].isdigit()]
+        return f"{partition}/segment-{max(numbers, default=-1) + 1:05d}"
+
+    def _flush_partition(self, partition: int) -> Dict[str, Any]:
+        with self._lock:
+            columns = _concat(self._buffers[partition])
+            order = np.lexsort((columns['time'], columns['icao24']))
+            columns = {name: values[order] for name, values in columns.items()}
+            icao_keys, icao_starts = np.unique(columns['icao24'], return_index=True)
+            cells = self._cells(columns['latitude'], columns['longitude'])
+            cell_rows = np.argsort(cells, kind='stable')
+            cell_keys, cell_starts = np.unique(cells[cell_rows], return_index=True)
+
+            relative = self._next_segment(partition)
+            path = self.directory / relative
+            temporary = path.with_name(path.name + '.tmp')
+            if temporary.exists():
+                shutil.rmtree(temporary)
+            temporary.mkdir(parents=True)
+            arrays = dict(columns, icao_keys=icao_keys, icao_starts=icao_starts.astype(np.int64),
+                          cell_keys=cell_keys, cell_starts=cell_starts.astype(np.int64),
+                          cell_rows=cell_rows.astype(np.int64))
+            for name, values in arrays.items():
+                np.save(temporary / f"{name}.npy", values)
+            os.replace(temporary, path)
+
+            segment = {
+                'path': relative,
+                'partition': partition,
+                'rows': int(len(order)),
+                'start': float(columns['time'].min()),
+                'end': float(columns['time'].max()),
+                'bbox': [float(columns['latitude'].min()), float(columns['longitude'].min()),
+                         float(columns['latitude'].max()), float(columns['longitude'].max())],
+                'aircraft': int(len(icao_keys)),
+            }
+            self._write_manifest(self.segments + [segment])
+            self.segments.append(segment)
+            del self._buffers[partition]
+            self._buffered_rows -= segment['rows']
+            return segment
+
+    def _write_manifest(self, segments: List[Dict[str, Any]]):
+        manifest = self.directory / MANIFEST
+        temporary = manifest.with_suffix('.tmp')
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            json.dump({'cell_degrees': self.cell_degrees, 'segments': segments}, handle)
+        os.replace(temporary, manifest)
+
+    def close(self):
+        self.flush()
+        self._open.clear()
+
+    # Reading
+
+    def _load(self, segment: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Memory-mapped arrays of a segment, keeping at most MAX_OPEN_SEGMENTS open"""
+        key = segment['path']
+        with self._lock:
+            arrays = self._open.get(key)
+            if arrays is None:
+                path = self.directory / key
+                arrays = {file.stem: np.load(file, mmap_mode='r') for file in path.glob('*.npy')}
+                self._open[key] = arrays
+                if len(self._open) > MAX_OPEN_SEGMENTS:
+                    self._open.popitem(last=False)
+            else:
+                self._open.move_to_end(key)
+            return arrays
+
+    def _candidates(self, start: Optional[float], end: Optional[float],
+                    bbox: Optional[Sequence[float]] = None) -> List[Dict[str, Any]]:
+        """Segments whose time range (and bbox) overlap the query"""
+        found = []
+        for segment in self.segments:
+            if start is not None and segment['end'] < start:
+                continue
+            if end is not None and segment['start'] > end:
+                continue
+            if bbox is not None:
+                box = segment['bbox']
+                if box[0] > bbox[2] or bbox[0] > box[2] or box[1] > bbox[3] or bbox[1] > box[3]:
+                    continue
+            found.append(segment)
+        return found
+
+    def _buffered(self) -> Dict[str, np.ndarray]:
+        return _concat([part for partition in sorted(self._buffers) for part in self._buffers[partition]])
+
+    @staticmethod
+    def _in_time(times: np.ndarray, start: Optional[float], end: Optional[float]) -> np.ndarray:
+        mask = np.ones(len(times), dtype=bool)
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times <= end
+        return mask
+
+    def track(self, icao24: str, start: Optional[float] = None, end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Every recorded position of one aircraft between start and end, in time order"""
+        icao24 = icao24.strip().lower()
+        parts = []
+        with self._lock:
+            segments = self._candidates(start, end)
+            buffered = self._buffered()
+        for segment in segments:
+            arrays = self._load(segment)
+            keys = arrays['icao_keys']
+            index = int(np.searchsorted(keys, icao24))
+            if index >= len(keys) or keys[index] != icao24:
+                continue
+            first = int(arrays['icao_starts'][index])
+            last = int(arrays['icao_starts'][index + 1]) if index + 1 < len(keys) else segment['rows']
+            times = arrays['time'][first:last]
+            lo = first + int(np.searchsorted(times, -np.inf if start is None else start, side='left'))
+            hi = first + int(np.searchsorted(times, np.inf if end is None else end, side='right'))
+            if hi > lo:
+                parts.append(_take(arrays, slice(lo, hi)))
+
+        mask = (buffered['icao24'] == icao24) & self._in_time(buffered['time'], start, end)
+        if mask.any():
+            parts.append(_take(buffered, mask))
+        return _by_time(_concat(parts))
+
+    def recent_track(self, icao24: str, seconds: float = 3600.0) -> Dict[str, np.ndarray]:
+        """Track of one aircraft over the last seconds (by default the last hour)"""
+        return self.track(icao24, start=self.clock() - seconds)
+
+    def in_bbox(self, bbox: Sequence[float], start: Optional[float] = None,
+                end: Optional[float] = None) -> Dict[str, np.ndarray]:
+        """Every position inside [min_lat, min_lon, max_lat, max_lon] between start and end, in time order"""
+        min_lat, min_lon, max_lat, max_lon = bbox
+        wanted = self._cells_in(bbox)
+
+        parts = []
+        with self._lock:
+            segments = self._candidates(start, end, bbox)
+            buffered = self._buffered()
+        for segment in segments:
+            arrays = self._load(segment)
+            keys = arrays['cell_keys']
+            hits = np.flatnonzero(np.isin(keys, wanted))
+            if not len(hits):
+                continue
+            starts = np.asarray(arrays['cell_starts'])
+            stops = np.append(starts[1:], segment['rows'])
+            rows = np.sort(np.concatenate([arrays['cell_rows'][starts[k]:stops[k]] for k in hits]))
+            part = _take(arrays, rows)
+            mask = (part['latitude'] >= min_lat) & (part['latitude'] <= max_lat) & \
+                (part['longitude'] >= min_lon) & (part['longitude'] <= max_lon) & \
+                self._in_time(part['time'], start, end)
+            parts.append({name: values[mask] for name, values in part.items()})
+
+        mask = (buffered['latitude'] >= min_lat) & (buffered['latitude'] <= max_lat) & \
+            (buffered['longitude'] >= min_lon) & (buffered['longitude'] <= max_lon) & \
+            self._in_time(buffered['time'], start, end)
+        if mask.any():
+            parts.append(_take(buffered, mask))
+        return _by_time(_concat(parts))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'segments': len(self.segments),
+                'partitions': len({segment['partition'] for segment in self.segments}),
+                'rows': sum(segment['rows'] for segment in self.segments),
+                'buffered_rows': self._buffered_rows,
+                'start': min((segment['start'] for segment in self.segments), default=None),
+                'end': max((segment['end'] for segment in self.segments), default=None),
+                'open_segments': len(self._open),
+            }
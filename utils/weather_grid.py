@@ -0,0 +1,141 @@
+"""
+Gridded Weather Field
+Inverse-distance-weighted interpolation of station weather onto a fixed
+lat/lon grid, rebuilt only when station data changes, so every aircraft's
+weather is one vectorized array lookup.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from utils.geodesy import AIRPORTS, haversine_pairwise, prepare_points
+from utils.weather_schema import CLEAR, FOG, HIGH_WIND_KMH, LOW_VISIBILITY_KM, RAIN, STORM, StationWeather, \
+    decode_all
+
+# Runway delay in minutes per condition category
+WEATHER_DELAYS = {CLEAR: 0.0, RAIN: 5.0, FOG: 10.0, STORM: 30.0}
+
+# Collision-model weather_factor per category (1.0 is benign, 2.0 the worst)
+WEATHER_FACTORS = {CLEAR: 1.0, RAIN: 1.3, FOG: 1.6, STORM: 2.0}
+MAX_WEATHER_FACTOR = 2.0
+
+GRID_DEGREES = 0.5
+
+# Station influence fades into clear weather at about this distance
+INFLUENCE_NM = 250.0
+IDW_POWER = 2.0
+
+# Grid rows interpolated per step, to bound the size of temporary arrays
+ROWS_PER_CHUNK = 32
+
+FIELDS = ('weather_factor', 'delay_minutes', 'visibility', 'wind_speed')
+
+# Value of each field far from every station
+BASELINE = {'weather_factor': 1.0, 'delay_minutes': 0.0, 'visibility': 10.0, 'wind_speed': 0.0}
+
+
+def station_weather_factor(record: StationWeather) -> float:
+    """Weather impact score of one station: category, then low visibility and strong wind"""
+    factor = WEATHER_FACTORS.get(record.category, 1.0)
+    if record.visibility is not None and record.visibility < LOW_VISIBILITY_KM:
+        factor += 0.3 * (1.0 - record.visibility / LOW_VISIBILITY_KM)
+    if record.wind_speed is not None and record.wind_speed > HIGH_WIND_KMH:
+        factor += 0.2
+    return min(factor, MAX_WEATHER_FACTOR)
+
+
+def _station_values(record: StationWeather) -> Tuple[float, ...]:
+    return (station_weather_factor(record), WEATHER_DELAYS.get(record.category, 0.0),
+            BASELINE['visibility'] if record.visibility is None else record.visibility,
+            BASELINE['wind_speed'] if record.wind_speed is None else record.wind_speed)
+
+
+class WeatherGrid:
+    """
+    Global weather field on a regular lat/lon grid.
+
+    Each cell holds the inverse-distance-weighted mix of every station's
+    values plus a clear-weather baseline that carries the weight of a station
+    INFLUENCE_NM away, so weather fades out with distance instead of one
+    station covering a continent. Stations without coordinates are placed at
+    the airport of the same code when there is one.
+    """
+
+    def __init__(self, degrees: float = GRID_DEGREES, influence_nm: float = INFLUENCE_NM,
+                 power: float = IDW_POWER):
+        self.degrees = degrees
+        self.influence_nm = influence_nm
+        self.power = power
+        self.rows = int(round(180.0 / degrees))
+        self.columns = int(round(360.0 / degrees))
+
+        self.fields: Dict[str, np.ndarray] = {field: np.full((self.rows, self.columns), BASELINE[field])
+                                              for field in FIELDS}
+        self.stations: Dict[str, StationWeather] = {}
+        self.builds = 0
+        self._signature: Optional[Tuple] = None
+
+    def _located(self, records: Iterable[StationWeather]):
+        for record in records:
+            if record.latitude is not None and record.longitude is not None:
+                yield record
+            elif record.station.upper() in AIRPORTS:
+                latitude, longitude = AIRPORTS[record.station.upper()]
+                yield record._replace(latitude=latitude, longitude=longitude)
+
+    def update(self, weather_data: Any) -> bool:
+        """Take new station data (any shape decode_all accepts); rebuilds only if it changed"""
+        stations = {record.station: record for record in self._located(decode_all(weather_data).values())}
+        signature = tuple(sorted((station, record.latitude, record.longitude) + _station_values(record)
+                                 for station, record in stations.items()))
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        self.stations = stations
+        self._rebuild()
+        return True
+
+    def _rebuild(self):
+        records = list(self.stations.values())
+        values = np.array([_station_values(record) for record in records], dtype=np.float64).reshape(-1, len(FIELDS))
+        baseline = np.array([BASELINE[field] for field in FIELDS])
+        stations = prepare_points([record.latitude for record in records], [record.longitude for record in records])
+        baseline_weight = self.influence_nm ** -self.power
+
+        centers_lat = -90.0 + (np.arange(self.rows) + 0.5) * self.degrees
+        centers_lon = -180.0 + (np.arange(self.columns) + 0.5) * self.degrees
+        grids = np.empty((self.rows, self.columns, len(FIELDS)))
+        for start in range(0, self.rows, ROWS_PER_CHUNK):
+            lat, lon = np.meshgrid(centers_lat[start:start + ROWS_PER_CHUNK], centers_lon, indexing='ij')
+            weights = np.maximum(haversine_pairwise(prepare_points(lat.ravel(), lon.ravel()), stations),
+                                 1.0) ** -self.power
+            mixed = (weights @ values + baseline_weight * baseline) / (weights.sum(axis=1) + baseline_weight)[:, None]
+            grids[start:start + lat.shape[0]] = mixed.reshape(lat.shape + (len(FIELDS),))
+
+        self.fields = {field: np.ascontiguousarray(grids[..., index]) for index, field in enumerate(FIELDS)}
+        self.builds += 1
+
+    def cells(self, latitudes, longitudes) -> Tuple[np.ndarray, np.ndarray]:
+        """Grid row and column of each position; positions without coordinates map to -1"""
+        latitudes = np.atleast_1d(np.asarray(latitudes, dtype=np.float64))
+        longitudes = np.atleast_1d(np.asarray(longitudes, dtype=np.float64))
+        missing = np.isnan(latitudes) | np.isnan(longitudes)
+        rows = np.clip(((np.nan_to_num(latitudes) + 90.0) // self.degrees).astype(np.intp), 0, self.rows - 1)
+        columns = ((np.nan_to_num(longitudes) + 180.0) // self.degrees).astype(np.intp) % self.columns
+        rows[missing] = -1
+        return rows, columns
+
+    def sample(self, field: str, latitudes, longitudes) -> np.ndarray:
+        """Value of field at every position in one gather; baseline where the position is unknown"""
+        rows, columns = self.cells(latitudes, longitudes)
+        values = self.fields[field][rows, columns]
+        return np.where(rows < 0, BASELINE[field], values)
+
+    def weather_factor(self, latitudes, longitudes) -> np.ndarray:
+        """Per-aircraft weather_factor for the collision model features"""
+        return self.sample('weather_factor', latitudes, longitudes)
+
+    def delay_minutes(self, latitudes, longitudes) -> np.ndarray:
+        """Expected weather delay in minutes for runways at these positions"""
+        return self.sample('delay_minutes', latitudes, longitudes)
@@ -0,0 +1,163 @@
+"""
+Canonical Weather Records
+One compact, typed station record that every weather source is decoded
+into once at ingest, in fixed units, so renders and hazard checks read
+fields directly instead of reshaping provider dicts on every rerun.
+"""
+
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+KMH_PER_MS = 3.6
+
+# Condition categories, also used for runway weather delays
+CLEAR, RAIN, FOG, STORM = 'clear', 'rain', 'fog', 'storm'
+
+# Checked in this order; the first category with a matching keyword wins
+CONDITION_KEYWORDS = (
+    (STORM, ('thunder', 'storm', 'squall', 'tornado', 'hail')),
+    (FOG, ('fog', 'mist', 'haze', 'smoke')),
+    (RAIN, ('rain', 'drizzle', 'shower', 'snow', 'sleet')),
+)
+
+# Below this visibility in km conditions count as fog whatever the description says
+FOG_VISIBILITY_KM = 1.0
+
+# Hazard thresholds
+LOW_VISIBILITY_KM = 5.0
+HIGH_WIND_KMH = 50.0
+
+
+class StationWeather(NamedTuple):
+    """Weather at one station; temperature in °C, wind in km/h, visibility in km"""
+    station: str
+    temperature: Optional[float] = None
+    humidity: Optional[float] = None
+    pressure: Optional[float] = None
+    wind_speed: Optional[float] = None
+    wind_direction: Optional[float] = None
+    visibility: Optional[float] = None
+    conditions: str = ''
+    category: str = CLEAR
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    observed_at: Optional[float] = None
+    source: Optional[str] = None
+
+
+def _number(value: Any, scale: float = 1.0) -> Optional[float]:
+    try:
+        return None if value is None else float(value) * scale
+    except (TypeError, ValueError):
+        return None
+
+
+def condition_category(conditions: str, visibility: Optional[float] = None) -> str:
+    """CLEAR, RAIN, FOG or STORM from a free-text description and visibility in km"""
+    text = (conditions or '').lower()
+    for category, keywords in CONDITION_KEYWORDS:
+        if any(keyword in text for keyword in keywords):
+            return category
+    if visibility is not None and visibility < FOG_VISIBILITY_KM:
+        return FOG
+    return CLEAR
+
+
+def _record(station: str, conditions: str, visibility: Optional[float], **fields) -> StationWeather:
+    return StationWeather(station=station, conditions=conditions, visibility=visibility,
+                          category=condition_category(conditions, visibility), **fields)
+
+
+def from_flat(item: Dict[str, Any], station: Optional[str] = None,
+              source: Optional[str] = None) -> StationWeather:
+    """Flat dicts as produced by demo_data.get_demo_weather (already in °C, km/h and km)"""
+    return _record(
+        station or str(item.get('station') or item.get('location') or ''),
+        str(item.get('conditions') or ''),
+        _number(item.get('visibility')),
+        temperature=_number(item.get('temperature')),
+        humidity=_number(item.get('humidity')),
+        pressure=_number(item.get('pressure')),
+        wind_speed=_number(item.get('wind_speed')),
+        wind_direction=_number(item.get('wind_direction')),
+        latitude=_number(item.get('latitude')),
+        longitude=_number(item.get('longitude')),
+        observed_at=_number(item.get('observed_at', item.get('timestamp'))),
+        source=source or item.get('source'),
+    )
+
+
+def from_openweathermap(payload: Dict[str, Any], station: Optional[str] = None,
+                        source: str = 'OpenWeatherMap') -> StationWeather:
+    """OpenWeatherMap current-weather payloads (metric units: °C, m/s, visibility in m)"""
+    main = payload.get('main') or {}
+    wind = payload.get('wind') or {}
+    coord = payload.get('coord') or {}
+    described = payload.get('weather') or [{}]
+    return _record(
+        station or str(payload.get('name') or ''),
+        str(described[0].get('description') or described[0].get('main') or ''),
+        _number(payload.get('visibility'), 0.001),
+        temperature=_number(main.get('temp')),
+        humidity=_number(main.get('humidity')),
+        pressure=_number(main.get('pressure')),
+        wind_speed=_number(wind.get('speed'), KMH_PER_MS),
+        wind_direction=_number(wind.get('deg')),
+        latitude=_number(coord.get('lat')),
+        longitude=_number(coord.get('lon')),
+        observed_at=_number(payload.get('dt')),
+        source=source,
+    )
+
+
+def decode_weather(item: Any, station: Optional[str] = None, source: Optional[str] = None) -> Optional[StationWeather]:
+    """
+    Decode one report of any supported shape; StationWeather passes through.
+
+    Supported are flat dicts, OpenWeatherMap payloads and the nested
+    {'weather': <OpenWeatherMap payload>} records the dashboard used to build.
+    Anything else decodes to None.
+    """
+    if isinstance(item, StationWeather):
+        return item
+    if not isinstance(item, dict):
+        return None
+    if isinstance(item.get('weather'), dict):
+        return from_openweathermap(item['weather'], station, source or item.get('source') or 'OpenWeatherMap')
+    if 'main' in item:
+        return from_openweathermap(item, station, source or 'OpenWeatherMap')
+    return from_flat(item, station, source)
+
+
+def decode_all(weather_data: Any, source: Optional[str] = None) -> Dict[str, StationWeather]:
+    """Station records keyed by station from a list of reports or a {location: report} dict"""
+    if not weather_data:
+        return {}
+    if isinstance(weather_data, dict):
+        if all(isinstance(record, StationWeather) for record in weather_data.values()):
+            return weather_data  # decoded at ingest already
+        items: Iterable = weather_data.items()
+    elif isinstance(weather_data, (list, tuple)):
+        items = ((None, item) for item in weather_data)
+    else:
+        return {}
+
+    records = {}
+    for location, item in items:
+        record = decode_weather(item, None if location is None else str(location), source)
+        if record is not None:
+            station = record.station or f'Station_{len(records)}'
+            records[station] = record if record.station else record._replace(station=station)
+    return records
+
+
+def hazards(record: StationWeather) -> List[str]:
+    """Conditions at a station that affect operations"""
+    found = []
+    if record.category in (STORM, FOG):
+        found.append(record.category)
+    if record.visibility is not None and record.visibility < LOW_VISIBILITY_KM:
+        found.append('low_visibility')
+    if record.wind_speed is not None and record.wind_speed > HIGH_WIND_KMH:
+        found.append('high_wind')
+    return found
+
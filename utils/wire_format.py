@@ -0,0 +1,216 @@
+"""
+Binary Flight Frames
+Fixed-layout little-endian records (29 bytes per aircraft) packed straight
+from NumPy arrays, as an opt-in alternative to JSON on the flight stream.
+"""
+
+import struct
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from utils.flight_batch import FlightBatch
+
+MAGIC = b'ATCF'
+VERSION = 1
+
+KEYFRAME, DELTA = 1, 2
+
+# magic, version, kind, seq, base, timestamp, record count, removed count
+HEADER = struct.Struct('<4sBBIIdII')
+
+RECORD_DTYPE = np.dtype([
+    ('icao24', '<u4'),
+    ('latitude', '<i4'),       # 1e-5 degrees
+    ('longitude', '<i4'),      # 1e-5 degrees
+    ('baro_altitude', '<i2'),  # 25 ft steps
+    ('velocity', '<u2'),       # kt
+    ('true_track', '<u2'),     # 0.01 degrees
+    ('vertical_rate', '<i2'),  # ft/min
+    ('flags', 'u1'),
+    ('callsign', 'S8'),
+])
+
+SCALES = {'latitude': 1e-5, 'longitude': 1e-5, 'baro_altitude': 25.0, 'velocity': 1.0,
+          'true_track': 0.01, 'vertical_rate': 1.0}
+
+# Values that do not fit a field's range (or are missing) travel as its sentinel
+SENTINELS = {'latitude': np.iinfo(np.int32).min, 'longitude': np.iinfo(np.int32).min,
+             'baro_altitude': np.iinfo(np.int16).min, 'velocity': np.iinfo(np.uint16).max,
+             'true_track': np.iinfo(np.uint16).max, 'vertical_rate': np.iinfo(np.int16).min}
+
+ON_GROUND = 1
+
+
+class Frame(NamedTuple):
+    """A decoded binary frame"""
+    kind: int
+    seq: int
+    base: int
+    timestamp: float
+    records: np.ndarray
+    removed: np.ndarray
+
+
+def _hex_ids(values: Sequence[Any]) -> np.ndarray:
+    ids = np.empty(len(values), dtype=np.int64)
+    for row, value in enumerate(values):
+        try:
+            ids[row] = int(value, 16)
+        except (TypeError, ValueError):
+            ids[row] = -1
+    return ids
+
+
+def _pack(records: np.ndarray, field: str, values: np.ndarray):
+    info = np.iinfo(RECORD_DTYPE[field])
+    scaled = np.round(values / SCALES[field])
+    valid = np.isfinite(scaled) & (scaled >= info.min) & (scaled <= info.max)
+    records[field] = SENTINELS[field]
+    records[field][valid] = scaled[valid]
+
+
+def pack_columns(icao24: Sequence[Any], columns: Dict[str, np.ndarray], on_ground: np.ndarray,
+                 callsign: Sequence[Any]) -> np.ndarray:
+    """Record array from per-field columns; rows whose icao24 is not hex are dropped"""
+    ids = _hex_ids(icao24)
+    keep = ids >= 0
+    records = np.zeros(int(keep.sum()), dtype=RECORD_DTYPE)
+    records['icao24'] = ids[keep]
+    for field in SCALES:
+        _pack(records, field, np.asarray(columns[field], dtype=np.float64)[keep])
+    records['flags'] = np.where(np.asarray(on_ground, dtype=bool)[keep], ON_GROUND, 0)
+    names = [(name or '').strip().encode('ascii', 'replace')[:8] if isinstance(name, str) else b''
+             for name, kept in zip(callsign, keep) if kept]
+    records['callsign'] = names
+    return records
+
+
+def records_from_batch(batch: FlightBatch) -> np.ndarray:
+    """Records built directly from a FlightBatch's columns"""
+    return pack_columns(batch.icao24, {field: getattr(batch, field) for field in SCALES},
+                        batch.on_ground, batch.callsign)
+
+
+def records_from_dicts(flights: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """Records from flight dicts, reading only the fields that go on the wire"""
+    columns = {field: np.array([flight.get(field) for flight in flights], dtype=np.float64) for field in SCALES}
+    return pack_columns([flight.get('icao24') for flight in flights], columns,
+                        [bool(flight.get('on_ground')) for flight in flights],
+                        [flight.get('callsign') for flight in flights])
+
+
+def encode_frame(kind: int, seq: int, base: int, timestamp: float, records: np.ndarray,
+                 removed: Optional[np.ndarray] = None) -> bytes:
+    removed = np.zeros(0, dtype='<u4') if removed is None else removed.astype('<u4', copy=False)
+    header = HEADER.pack(MAGIC, VERSION, kind, seq, base, timestamp, len(records), len(removed))
+    return b''.join((header, records.tobytes(), removed.tobytes()))
+
+
+def decode_frame(payload: bytes) -> Frame:
+    """Parse a frame without copying the record bytes"""
+    magic, version, kind, seq, base, timestamp, count, removed_count = HEADER.unpack_from(payload)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a version {VERSION} flight frame")
+    offset = HEADER.size
+    records = np.frombuffer(payload, dtype=RECORD_DTYPE, count=count, offset=offset)
+    offset += count * RECORD_DTYPE.itemsize
+    removed = np.frombuffer(payload, dtype='<u4', count=removed_count, offset=offset)
+    return Frame(kind, seq, base, timestamp, records, removed)
+
+
+def records_to_dicts(records: np.ndarray) -> List[Dict[str, Any]]:
+    """Flight dicts (same field names and units as the JSON feed) from records"""
+    columns = {}
+    for field, scale in SCALES.items():
+        values = records[field].astype(np.float64) * scale
+        values[records[field] == SENTINELS[field]] = np.nan
+        columns[field] = values.tolist()
+    icao24 = [f'{value:06x}' for value in records['icao24'].tolist()]
+    callsigns = [name.decode('ascii') or None for name in records['callsign'].tolist()]
+    on_ground = (records['flags'] & ON_GROUND).astype(bool).tolist()
+
+    flights = []
+    for row in range(len(records)):
+        flight = {'icao24': icao24[row], 'callsign': callsigns[row], 'on_ground': on_ground[row]}
+        for field in SCALES:
+            value = columns[field][row]
+            flight[field] = None if value != value else value
+        flights.append(flight)
+    return flights
+
+
+def _latest_per_id(records: np.ndarray) -> np.ndarray:
+    # Last occurrence of each icao24, sorted by icao24
+    reversed_ids = records['icao24'][::-1]
+    _, first = np.unique(reversed_ids, return_index=True)
+    return records[::-1][first]
+
+
+class BinaryFrameEncoder:
+    """
+    Keyframe/delta encoder over record arrays.
+
+    State is kept sorted by icao24 so each delta is found with one
+    searchsorted and a record-wise comparison; a delta frame carries the full
+    record of every added or changed aircraft plus the removed addresses.
+    """
+
+    def __init__(self, keyframe_interval: int = 30):
+        self.keyframe_interval = keyframe_interval
+        self.seq = 0
+        self.timestamp = 0.0
+        self._records = np.zeros(0, dtype=RECORD_DTYPE)
+        self._frames = 0
+
+    def keyframe(self) -> bytes:
+        return encode_frame(KEYFRAME, self.seq, self.seq, self.timestamp, self._records)
+
+    def encode(self, records: np.ndarray, seq: Optional[int] = None, timestamp: float = 0.0,
+               keyframe: bool = False) -> bytes:
+        records = _latest_per_id(records)
+        previous, base = self._records, self.seq
+        self._records = records
+        self.seq = base + 1 if seq is None else seq
+        self.timestamp = timestamp
+        self._frames += 1
+        if keyframe or self._frames % self.keyframe_interval == 1 or self.keyframe_interval == 1:
+            return self.keyframe()
+
+        ids, previous_ids = records['icao24'], previous['icao24']
+        position = np.minimum(np.searchsorted(previous_ids, ids), max(len(previous) - 1, 0))
+        if len(previous):
+            unchanged = (previous_ids[position] == ids) & (previous[position] == records)
+        else:
+            unchanged = np.zeros(len(records), dtype=bool)
+        removed = previous_ids[~np.isin(previous_ids, ids, assume_unique=True)]
+        return encode_frame(DELTA, self.seq, base, timestamp, records[~unchanged], removed)
+
+
+class BinaryDecoder:
+    """Client-side state for a binary keyframe/delta stream"""
+
+    def __init__(self):
+        self.seq: Optional[int] = None
+        self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        self.needs_resync = True
+
+    def apply(self, payload: bytes) -> bool:
+        """Apply one frame; returns False (and sets needs_resync) when a delta does not follow on"""
+        frame = decode_frame(payload)
+        if frame.kind == KEYFRAME:
+            self.records = frame.records.copy()
+        elif self.needs_resync or frame.base != self.seq:
+            self.needs_resync = True
+            return False
+        else:
+            kept = self.records[~np.isin(self.records['icao24'], frame.removed)
+                                & ~np.isin(self.records['icao24'], frame.records['icao24'])]
+            self.records = np.sort(np.concatenate([kept, frame.records]), order='icao24')
+        self.seq = frame.seq
+        self.needs_resync = False
+        return True
+
+    @property
+    def aircraft(self) -> Dict[str, Dict[str, Any]]:
+        return {flight['icao24']: flight for flight in records_to_dicts(self.records)}